@@ -1,6 +1,9 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import banks, branches
+from app.api.v1.endpoints import banks, branches, batch, changes, pincodes
 
 api_router = APIRouter()
 api_router.include_router(banks.router, prefix="/banks", tags=["banks"])
 api_router.include_router(branches.router, prefix="/branches", tags=["branches"])
+api_router.include_router(batch.router, prefix="/batch", tags=["batch"])
+api_router.include_router(changes.router, prefix="/changes", tags=["changes"])
+api_router.include_router(pincodes.router, prefix="/pincodes", tags=["pincodes"])
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.admission import admitted_db
+from app.core.config import settings
 from app.services.bank_service import BankService
-from app.schemas.bank import Bank, BankList, BankDetail
+from app.schemas.bank import Bank, BankCode, BankCreate, BankList, BankDetail
+from app.schemas.bulk import BulkResponse
 from app.utils.pagination import PaginatedResponse
+from app.utils.bulk import read_record_chunks, run_bulk
 
 router = APIRouter()
 
@@ -13,7 +16,7 @@ async def get_banks(
     q: Optional[str] = Query(None, description="Search in bank name"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(admitted_db("search"))
 ):
     """Get all banks with branch counts"""
     banks_with_counts = await BankService.get_all_banks(db)
@@ -45,10 +48,34 @@ async def get_banks(
         limit=limit
     )
 
+@router.get("/by-code/{code}", response_model=BankCode)
+async def get_bank_by_code(
+    code: str = Path(..., pattern=r"^[A-Za-z]{4}$", description="IFSC bank code, e.g. HDFC"),
+    db: AsyncSession = Depends(admitted_db("lookup"))
+):
+    """Resolve the bank code in the first four characters of an IFSC"""
+    bank_code = await BankService.get_bank_by_code(db, code)
+    if not bank_code:
+        raise HTTPException(status_code=404, detail="Bank code not found")
+    return bank_code._asdict()
+
 @router.get("/{bank_id}", response_model=BankDetail)
-async def get_bank(bank_id: int, db: AsyncSession = Depends(get_db)):
+async def get_bank(bank_id: int, db: AsyncSession = Depends(admitted_db("expensive"))):
     """Get bank by ID with branches"""
     bank = await BankService.get_bank_by_id(db, bank_id)
     if not bank:
         raise HTTPException(status_code=404, detail="Bank not found")
     return bank
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_upsert_banks(request: Request, db: AsyncSession = Depends(admitted_db("expensive"))):
+    """Insert or update banks from a JSON array or an NDJSON stream
+    
+    Valid rows of a JSON array are written in one transaction, NDJSON
+    streams in one per BULK_CHUNK_ROWS records; every row gets an outcome.
+    """
+    chunks = read_record_chunks(request, settings.bulk_max_rows, settings.bulk_chunk_rows)
+    return await run_bulk(
+        chunks, BankCreate, lambda bank: bank.id,
+        lambda rows: BankService.bulk_upsert_banks(db, rows)
+    )
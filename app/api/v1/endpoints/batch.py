@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+from app.core.config import settings
+from app.core.admission import admission
+from app.core.database import get_session_factory
+from app.api.v1.endpoints.branches import known_ifsc, parse_fields
+from app.services.bank_service import BankService
+from app.services.branch_service import BranchService
+from app.schemas.bank import BankList
+from app.schemas.batch import (
+    BankListParams,
+    BatchItemResult,
+    BatchRequest,
+    BatchResponse,
+    BatchSubRequest,
+    LookupParams,
+    SearchParams,
+)
+from app.schemas.branch import Branch, BranchDetail
+from app.utils.pagination import PaginatedResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Sub-requests call the services directly and return the JSON body of the
+# equivalent endpoint; HTTPException becomes the item's status.
+
+async def _search(db, params: SearchParams) -> Any:
+    fields = parse_fields(params.fields)
+    rows, total = await BranchService.search_branches(
+        db,
+        query=params.q,
+        city=params.city,
+        state=params.state,
+        district=params.district,
+        bank_id=params.bank_id,
+        skip=params.skip,
+        limit=params.limit,
+        fields=fields,
+        pincode=params.pincode,
+        ifsc_prefix=params.ifsc_prefix,
+        sort=params.sort,
+        order=params.order
+    )
+    page = {"total": total, "skip": params.skip, "limit": params.limit}
+    if fields:
+        items = [dict(zip(fields, row)) for row in rows]
+        return PaginatedResponse[Dict[str, Any]](items=items, **page).model_dump(mode="json")
+    return PaginatedResponse[Branch].model_validate(
+        {"items": rows, **page}, from_attributes=True
+    ).model_dump(mode="json")
+
+async def _lookup(db, params: LookupParams) -> Any:
+    ifsc = known_ifsc(params.ifsc)
+    fields = parse_fields(params.fields)
+    branch = await BranchService.get_branch_by_ifsc(db, ifsc, fields=fields)
+    if not branch:
+        raise HTTPException(status_code=404, detail="Branch not found")
+    if fields:
+        return dict(zip(fields, branch))
+    return BranchDetail.model_validate(branch, from_attributes=True).model_dump(mode="json")
+
+async def _banks(db, params: BankListParams) -> Any:
+    banks_with_counts = await BankService.get_all_banks(db)
+    if params.q:
+        banks_with_counts = [
+            (bank, branch_count) for bank, branch_count in banks_with_counts
+            if params.q.upper() in bank.name.upper()
+        ]
+    items = [
+        BankList(id=bank.id, name=bank.name, branch_count=branch_count)
+        for bank, branch_count in banks_with_counts[params.skip:params.skip + params.limit]
+    ]
+    return PaginatedResponse[BankList](
+        items=items, total=len(banks_with_counts), skip=params.skip, limit=params.limit
+    ).model_dump(mode="json")
+
+# op -> (parameter model, handler returning the response body)
+OPERATIONS: Dict[str, Tuple[Type[BaseModel], Callable[..., Awaitable[Any]]]] = {
+    "search": (SearchParams, _search),
+    "lookup": (LookupParams, _lookup),
+    "banks": (BankListParams, _banks),
+}
+
+async def _run(
+    sub_request: BatchSubRequest,
+    session_factory: async_sessionmaker,
+    semaphore: asyncio.Semaphore
+) -> BatchItemResult:
+    params_model, handler = OPERATIONS[sub_request.op]
+    try:
+        params = params_model(**sub_request.params)
+    except ValidationError as e:
+        return BatchItemResult(status=422, detail=json.loads(e.json(include_url=False)))
+
+    async with semaphore:
+        try:
+            async with session_factory() as db:
+                body = await handler(db, params)
+        except HTTPException as e:
+            return BatchItemResult(status=e.status_code, detail=e.detail)
+        except Exception:
+            logger.exception(f"Batch sub-request {sub_request.op!r} failed")
+            return BatchItemResult(status=500, detail="Internal Server Error")
+    return BatchItemResult(status=200, body=body)
+
+@router.post("", response_model=BatchResponse, dependencies=[Depends(admission("expensive"))])
+async def run_batch(
+    batch: BatchRequest,
+    session_factory: async_sessionmaker = Depends(get_session_factory)
+):
+    """Run several searches, lookups and bank listings concurrently
+
+    Each sub-request gets its own session; results come back in request
+    order with a per-item status, so one failure does not fail the batch.
+    """
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+    results = await asyncio.gather(
+        *(_run(sub_request, session_factory, semaphore) for sub_request in batch.requests)
+    )
+    return BatchResponse(results=results)
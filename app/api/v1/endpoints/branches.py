@@ -1,31 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from app.core.database import get_db
-from app.services.branch_service import BranchService
-from app.schemas.branch import Branch, BranchDetail
+from typing import Any, Dict, List, Optional, Tuple
+from app.core import metrics
+from app.core.admission import admitted_db
+from app.core.config import settings
+from app.core.ifsc_filter import might_exist
+from app.services.branch_service import BranchService, BRANCH_FIELDS
+from app.schemas.branch import Branch, BranchCreate, BranchDetail, BranchSort, SortOrder
+from app.schemas.bulk import BulkResponse
 from app.utils.pagination import PaginatedResponse
+from app.utils.ifsc import IFSC_PREFIX_PATTERN, is_valid_ifsc
+from app.utils.pincode import PINCODE_PATTERN
+from app.utils.bulk import read_record_chunks, run_bulk
+from app.utils.formats import ARROW_STREAM_TYPE, MSGPACK_TYPE, binary_page, negotiate_format
 
 router = APIRouter()
 
+def parse_fields(
+    fields: Optional[str] = Query(
+        None, description=f"Comma-separated fields to return: {', '.join(BRANCH_FIELDS)}"
+    )
+) -> Optional[List[str]]:
+    """Parse a sparse fieldset such as ``fields=ifsc,bank_name,city``"""
+    if fields is None:
+        return None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in BRANCH_FIELDS]
+    if not requested or unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid fields: {', '.join(unknown) or fields!r}. Allowed: {', '.join(BRANCH_FIELDS)}"
+        )
+    return requested
+
+# Arrow column types of branch fields that are not strings
+BRANCH_ARROW_TYPES = {"bank_id": "int64"}
+
+# OpenAPI: branch listings can also be answered in these formats
+BINARY_PAGE_RESPONSES = {200: {"content": {MSGPACK_TYPE: {}, ARROW_STREAM_TYPE: {}}}}
+
+def page_format(request: Request) -> Optional[str]:
+    """Binary media type negotiated from ``Accept``, None for JSON"""
+    return negotiate_format(request.headers.get("accept", ""))
+
+def page_fields(
+    fields: Optional[List[str]] = Depends(parse_fields),
+    media_type: Optional[str] = Depends(page_format)
+) -> Optional[List[str]]:
+    """Sparse fieldset of a listing; binary formats always read rows, so default to every field"""
+    if fields is None and media_type is not None:
+        return list(BRANCH_FIELDS)
+    return fields
+
+def sparse_page(
+    rows: list, fields: List[str], total: int, skip: int, limit: int, media_type: Optional[str] = None
+):
+    """Paginated response for a sparse fieldset, bypassing the full response model"""
+    if media_type is not None:
+        return binary_page(rows, fields, total, skip, limit, media_type, BRANCH_ARROW_TYPES)
+    page = PaginatedResponse[Dict[str, Any]](
+        items=[dict(zip(fields, row)) for row in rows],
+        total=total,
+        skip=skip,
+        limit=limit
+    )
+    return JSONResponse(page.model_dump())
+
+def sort_param(
+    sort: BranchSort = Query("ifsc", description="Sort by ifsc, branch, city or state (then district, city)"),
+    order: SortOrder = Query("asc", description="asc or desc")
+) -> Tuple[str, str]:
+    """Sort order of a branch listing; every order ends in the IFSC, so pages are stable"""
+    return sort, order
+
+def known_ifsc(ifsc: str) -> str:
+    """Reject malformed or definitely unknown IFSC codes before opening a session"""
+    if not is_valid_ifsc(ifsc):
+        metrics.increment("ifsc.rejected_format")
+        raise HTTPException(status_code=404, detail="Branch not found")
+    if not might_exist(ifsc):
+        metrics.increment("ifsc.rejected_bloom")
+        raise HTTPException(status_code=404, detail="Branch not found")
+    return ifsc
+
+def search_route_class(request: Request) -> str:
+    """Free-text and unfiltered searches scan the table; filtered ones are narrow"""
+    params = request.query_params
+    filters = ("city", "state", "district", "bank_id", "pincode", "ifsc_prefix")
+    if params.get("q") or not any(params.get(name) for name in filters):
+        return "expensive"
+    return "search"
+
 @router.get("/{ifsc}", response_model=BranchDetail)
-async def get_branch_by_ifsc(ifsc: str, db: AsyncSession = Depends(get_db)):
+async def get_branch_by_ifsc(
+    ifsc: str = Depends(known_ifsc),
+    fields: Optional[List[str]] = Depends(parse_fields),
+    db: AsyncSession = Depends(admitted_db("lookup"))
+):
     """Get branch details by IFSC code"""
-    branch = await BranchService.get_branch_by_ifsc(db, ifsc)
+    branch = await BranchService.get_branch_by_ifsc(db, ifsc, fields=fields)
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
+    if fields:
+        return JSONResponse(dict(zip(fields, branch)))
     return branch
 
-@router.get("/", response_model=PaginatedResponse[Branch])
+@router.get("/", response_model=PaginatedResponse[Branch], responses=BINARY_PAGE_RESPONSES)
 async def search_branches(
     q: Optional[str] = Query(None, description="Search in IFSC, branch name, address, or bank name"),
     city: Optional[str] = Query(None, description="Filter by city"),
     state: Optional[str] = Query(None, description="Filter by state"),
     district: Optional[str] = Query(None, description="Filter by district"),
     bank_id: Optional[int] = Query(None, description="Filter by bank ID"),
+    pincode: Optional[str] = Query(None, pattern=PINCODE_PATTERN, description="Filter by 6-digit PIN code"),
+    ifsc_prefix: Optional[str] = Query(
+        None, pattern=IFSC_PREFIX_PATTERN, description="Filter by leading IFSC characters, e.g. a bank code"
+    ),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[List[str]] = Depends(page_fields),
+    media_type: Optional[str] = Depends(page_format),
+    sorting: Tuple[str, str] = Depends(sort_param),
+    db: AsyncSession = Depends(admitted_db(search_route_class))
 ):
     """Search branches with multiple filters"""
     branches, total = await BranchService.search_branches(
@@ -36,8 +133,15 @@ async def search_branches(
         district=district, 
         bank_id=bank_id,
         skip=skip, 
-        limit=limit
+        limit=limit,
+        fields=fields,
+        pincode=pincode,
+        ifsc_prefix=ifsc_prefix,
+        sort=sorting[0],
+        order=sorting[1]
     )
+    if fields:
+        return sparse_page(branches, fields, total, skip, limit, media_type)
     return PaginatedResponse(
         items=branches,
         total=total,
@@ -45,17 +149,24 @@ async def search_branches(
         limit=limit
     )
 
-@router.get("/bank/{bank_id}", response_model=PaginatedResponse[Branch])
+@router.get("/bank/{bank_id}", response_model=PaginatedResponse[Branch], responses=BINARY_PAGE_RESPONSES)
 async def get_branches_by_bank(
     bank_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    fields: Optional[List[str]] = Depends(page_fields),
+    media_type: Optional[str] = Depends(page_format),
+    sorting: Tuple[str, str] = Depends(sort_param),
+    db: AsyncSession = Depends(admitted_db("search"))
 ):
     """Get all branches for a specific bank"""
-    branches, total = await BranchService.get_branches_by_bank_id(db, bank_id, skip, limit)
+    branches, total = await BranchService.get_branches_by_bank_id(
+        db, bank_id, skip, limit, fields=fields, sort=sorting[0], order=sorting[1]
+    )
     if not branches:
         raise HTTPException(status_code=404, detail="Bank not found or no branches found")
+    if fields:
+        return sparse_page(branches, fields, total, skip, limit, media_type)
     return PaginatedResponse(
         items=branches,
         total=total,
@@ -65,3 +176,16 @@ async def get_branches_by_bank(
     if total == 0:
         raise HTTPException(status_code=404, detail="No branches found for this bank")
     return branches
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_upsert_branches(request: Request, db: AsyncSession = Depends(admitted_db("expensive"))):
+    """Insert or update branches from a JSON array or an NDJSON stream
+    
+    Valid rows of a JSON array are written in one transaction, NDJSON
+    streams in one per BULK_CHUNK_ROWS records; every row gets an outcome.
+    """
+    chunks = read_record_chunks(request, settings.bulk_max_rows, settings.bulk_chunk_rows)
+    return await run_bulk(
+        chunks, BranchCreate, lambda branch: branch.ifsc.upper(),
+        lambda rows: BranchService.bulk_upsert_branches(db, rows)
+    )
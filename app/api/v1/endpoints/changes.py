@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.admission import admitted_db
+from app.services.change_service import ChangeService
+from app.schemas.change import ChangeFeed
+
+router = APIRouter()
+
+@router.get("", response_model=ChangeFeed)
+async def get_changes(
+    since: int = Query(..., ge=0, description="Version the client last synced to"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum change log entries to read"),
+    db: AsyncSession = Depends(admitted_db("search"))
+):
+    """Branches upserted or deleted since a change log version
+    
+    Follow ``version`` while ``has_more`` is set. ``resync`` means the log
+    no longer reaches back to ``since``: download the full directory again
+    and continue from ``version``.
+    """
+    return await ChangeService.get_changes(db, since, limit)
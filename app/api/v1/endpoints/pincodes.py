@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from app.core.admission import admitted_db
+from app.services.branch_service import BranchService
+from app.schemas.branch import Branch
+from app.utils.pagination import PaginatedResponse
+from app.utils.pincode import PINCODE_PATTERN
+from app.api.v1.endpoints.branches import (
+    BINARY_PAGE_RESPONSES, page_fields, page_format, sort_param, sparse_page
+)
+
+router = APIRouter()
+
+@router.get("/{pincode}/branches", response_model=PaginatedResponse[Branch], responses=BINARY_PAGE_RESPONSES)
+async def get_branches_by_pincode(
+    pincode: str = Path(..., pattern=PINCODE_PATTERN, description="6-digit PIN code"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[List[str]] = Depends(page_fields),
+    media_type: Optional[str] = Depends(page_format),
+    sorting: Tuple[str, str] = Depends(sort_param),
+    db: AsyncSession = Depends(admitted_db("search"))
+):
+    """Get all branches whose address carries a PIN code"""
+    branches, total = await BranchService.search_branches(
+        db, pincode=pincode, skip=skip, limit=limit, fields=fields, sort=sorting[0], order=sorting[1]
+    )
+    if total == 0:
+        raise HTTPException(status_code=404, detail="No branches found for this PIN code")
+    if fields:
+        return sparse_page(branches, fields, total, skip, limit, media_type)
+    return PaginatedResponse(
+        items=branches,
+        total=total,
+        skip=skip,
+        limit=limit
+    )
@@ -0,0 +1,151 @@
+"""Per-route admission control with bounded wait queues
+
+Each route class (IFSC lookups, narrow searches, expensive reads) gets its
+own concurrency budget in front of the database, so a burst of scans cannot
+queue up cheap lookups behind it. A request that finds its class saturated
+waits in a short queue; once the queue is full or the wait times out it is
+shed with a fast ``503`` and a ``Retry-After`` header instead of piling onto
+the SQLite engine.
+"""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Union
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import get_db
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed by its admission gate"""
+
+    def __init__(self, gate: str, reason: str):
+        super().__init__(f"{gate} admission gate is saturated ({reason})")
+        self.gate = gate
+        self.reason = reason
+
+
+class AdmissionGate:
+    """Counting semaphore with a bounded FIFO queue and a queue timeout
+
+    Waiters are plain futures of the running loop, so a gate is not bound to
+    any one event loop.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        metrics.register_gauge(f"admission.{name}.in_flight", lambda: self.in_flight)
+        metrics.register_gauge(f"admission.{name}.queued", lambda: len(self._waiters))
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _shed(self, reason: str) -> Overloaded:
+        metrics.increment("admission.shed")
+        metrics.increment(f"admission.{self.name}.shed.{reason}")
+        return Overloaded(self.name, reason)
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            metrics.increment(f"admission.{self.name}.admitted")
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._shed("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._shed("timeout") from None
+        metrics.increment(f"admission.{self.name}.admitted")
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest waiter, if any
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_queue_timeout = settings.admission_queue_timeout_ms / 1000
+
+GATES: Dict[str, AdmissionGate] = {
+    "lookup": AdmissionGate(
+        "lookup", settings.admission_lookup_limit, settings.admission_lookup_queue, _queue_timeout
+    ),
+    "search": AdmissionGate(
+        "search", settings.admission_search_limit, settings.admission_search_queue, _queue_timeout
+    ),
+    "expensive": AdmissionGate(
+        "expensive", settings.admission_expensive_limit, settings.admission_expensive_queue, _queue_timeout
+    ),
+}
+
+# A fixed route class, or a function choosing one from the request
+RouteClass = Union[str, Callable[[Request], str]]
+
+
+def admission(route_class: RouteClass):
+    """Dependency holding a slot of ``route_class`` for the rest of the request"""
+
+    async def dependency(request: Request) -> AsyncIterator[None]:
+        if not settings.admission_enabled:
+            yield
+            return
+        name = route_class(request) if callable(route_class) else route_class
+        try:
+            await GATES[name].acquire()
+        except Overloaded as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is overloaded, retry later",
+                headers={"Retry-After": str(settings.admission_retry_after)},
+            ) from e
+        try:
+            yield
+        finally:
+            GATES[name].release()
+
+    return dependency
+
+
+def admitted_db(route_class: RouteClass):
+    """``get_db`` behind the admission gate of ``route_class``"""
+
+    async def dependency(
+        _admitted: None = Depends(admission(route_class)),
+        db: AsyncSession = Depends(get_db)
+    ) -> AsyncSession:
+        return db
+
+    return dependency
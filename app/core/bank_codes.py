@@ -0,0 +1,61 @@
+"""In-memory map of IFSC bank codes to banks
+
+The first four characters of an IFSC identify the bank. The map is derived
+from the branches table for every dataset version, so resolving a code is a
+dictionary lookup; while it is missing or stale, callers fall back to SQL.
+"""
+from typing import Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dataset import get_dataset_version
+from app.models.bank import Bank
+from app.models.branch import Branch
+
+BANK_CODE_LENGTH = 4
+
+
+class BankCode(NamedTuple):
+    code: str
+    bank_id: int
+    bank_name: str
+    branch_count: int
+
+
+_codes: Optional[Dict[str, BankCode]] = None
+_codes_version: Optional[int] = None
+
+
+async def build_bank_codes(db: AsyncSession) -> Callable[[int], None]:
+    """Build the map from the branches table; return a publisher for it"""
+    code = func.substr(Branch.ifsc, 1, BANK_CODE_LENGTH)
+    result = await db.execute(
+        select(code, Branch.bank_id, Bank.name, func.count())
+        .join(Bank, Branch.bank_id == Bank.id)
+        .group_by(code, Branch.bank_id)
+        .order_by(func.count())
+    )
+    # Ordered by count, so a code shared by several banks goes to the largest
+    codes = {
+        code.upper(): BankCode(code.upper(), bank_id, name, count)
+        for code, bank_id, name, count in result.all()
+    }
+
+    def publish(version: int):
+        global _codes, _codes_version
+        _codes, _codes_version = codes, version
+
+    return publish
+
+
+def get_bank_codes() -> Optional[Dict[str, BankCode]]:
+    """The map for the current dataset version, or None if there is none"""
+    if _codes is None or _codes_version != get_dataset_version():
+        return None
+    return _codes
+
+
+def clear_bank_codes() -> None:
+    global _codes, _codes_version
+    _codes, _codes_version = None, None
@@ -0,0 +1,67 @@
+"""Process-wide registry of bank names
+
+The banks table has a couple of hundred rows, so branch queries do not
+join it: they select from ``branches`` alone and attach ``bank_name`` from
+this registry, and bank-name search becomes a ``bank_id IN (...)`` filter.
+The registry is a dataset index, built at startup and after every dataset
+change with the others. While it is stale (a write by this or another
+worker, a reload or a hot swap) the first caller re-reads it, so it is
+never served stale. Bank codes (the first four IFSC characters) are in
+``app.core.bank_codes``.
+
+Without the join, a branch whose bank row is missing is returned with a
+null ``bank_name`` instead of being left out. The foreign key, the
+loader's ``foreign_key_check`` and the bulk writes' bank check keep such
+rows out of the database.
+"""
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.dataset import dataset_namespace, get_dataset_version, is_current
+from app.models.bank import Bank
+
+_names: Dict[int, str] = {}
+_names_version: Optional[int] = None
+_names_namespace: Optional[str] = None
+
+
+async def _read_names(db: AsyncSession) -> Dict[int, str]:
+    result = await db.execute(select(Bank.id, Bank.name))
+    metrics.increment("bank_registry.loads")
+    return dict(result.all())
+
+
+def _publish(names: Dict[int, str], version: int, namespace: Optional[str]) -> None:
+    global _names, _names_version, _names_namespace
+    _names, _names_version, _names_namespace = names, version, namespace
+
+
+async def build_bank_registry(db: AsyncSession) -> Callable[[int], None]:
+    """Read the bank names; return a publisher for them"""
+    namespace = dataset_namespace()
+    names = await _read_names(db)
+    return lambda version: _publish(names, version, namespace)
+
+
+async def get_bank_names(db: AsyncSession) -> Dict[int, str]:
+    """Bank id -> name for the current dataset, read through ``db`` if stale"""
+    if _names_version is not None and is_current(_names_version, _names_namespace):
+        return _names
+    # Taken first, so a write during the read leaves the registry stale
+    version, namespace = get_dataset_version(), dataset_namespace()
+    names = await _read_names(db)
+    _publish(names, version, namespace)
+    return names
+
+
+async def find_bank_ids(db: AsyncSession, name: str) -> List[int]:
+    """Ids of the banks whose name contains ``name`` (case-insensitive)"""
+    needle = name.lower()
+    return [bank_id for bank_id, bank_name in (await get_bank_names(db)).items() if needle in bank_name.lower()]
+
+
+def clear_bank_registry() -> None:
+    _publish({}, None, None)
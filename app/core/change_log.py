@@ -0,0 +1,17 @@
+"""Change log version of a database, shared by the change feed and snapshots"""
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.change import FLOOR_KEY, BranchChange, ChangeLogMeta
+
+
+async def change_log_floor(db: AsyncSession) -> int:
+    """Oldest version a delta can start from; older clients must resync"""
+    result = await db.execute(select(ChangeLogMeta.value).where(ChangeLogMeta.key == FLOOR_KEY))
+    return result.scalar() or 0
+
+
+async def change_log_version(db: AsyncSession) -> int:
+    """Change log version of the database behind ``db``, read without any cache"""
+    latest = (await db.execute(select(func.max(BranchChange.version)))).scalar()
+    return latest if latest is not None else await change_log_floor(db)
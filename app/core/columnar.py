@@ -0,0 +1,141 @@
+"""In-process columnar branch filtering on NumPy arrays
+
+The branches table is held as columns: sorted IFSC bytes, an int bank_id
+array and dictionary-encoded city/district/state codes. Filters become
+boolean masks and pages are slices of the matching row numbers, so simple
+bank/location searches never build or run SQL. Free-text ``q`` searches are
+left to the SQL path.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dataset import get_dataset_version
+from app.models.bank import Bank
+from app.models.branch import Branch
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+class _Categorical:
+    """Dictionary-encoded text column; code -1 stands for NULL"""
+
+    def __init__(self, values: Sequence[Optional[str]]):
+        lookup: Dict[str, int] = {}
+        codes = np.empty(len(values), dtype=np.int32)
+        for position, value in enumerate(values):
+            if value is None:
+                codes[position] = -1
+            else:
+                codes[position] = lookup.setdefault(value, len(lookup))
+        self.codes = codes
+        self.dictionary: List[str] = list(lookup)
+        self._upper = [value.upper() for value in self.dictionary]
+
+    def contains(self, needle: str):
+        """Mask of rows whose value contains ``needle`` (case-insensitive)"""
+        needle = needle.upper()
+        matching = [code for code, value in enumerate(self._upper) if needle in value]
+        return np.isin(self.codes, matching)
+
+    def value(self, position: int) -> Optional[str]:
+        code = self.codes[position]
+        return None if code < 0 else self.dictionary[code]
+
+
+class ColumnarBranches:
+    """Column arrays for the branches table, ordered by IFSC"""
+
+    def __init__(self, rows: Sequence[tuple], bank_names: Dict[int, str]):
+        rows = sorted(rows, key=lambda row: row[0])
+        ifsc, bank_id, branch, address, city, district, state = (
+            zip(*rows) if rows else ((),) * 7
+        )
+        self.ifsc = np.array([code.encode("ascii") for code in ifsc], dtype="S11")
+        self.bank_id = np.array(bank_id, dtype=np.int64)
+        self.branch = np.array(branch, dtype=object)
+        self.address = np.array(address, dtype=object)
+        self.city = _Categorical(city)
+        self.district = _Categorical(district)
+        self.state = _Categorical(state)
+        self.bank_names = bank_names
+        self.dataset_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.ifsc)
+
+    def search(
+        self,
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        district: Optional[str] = None,
+        bank_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Branch], int]:
+        """Filter with boolean masks and materialize one page"""
+        mask = np.ones(len(self), dtype=bool)
+        if city:
+            mask &= self.city.contains(city)
+        if state:
+            mask &= self.state.contains(state)
+        if district:
+            mask &= self.district.contains(district)
+        if bank_id:
+            mask &= self.bank_id == bank_id
+        matches = np.flatnonzero(mask)
+        return [self._branch(position) for position in matches[skip:skip + limit]], len(matches)
+
+    def _branch(self, position: int) -> Branch:
+        bank_id = int(self.bank_id[position])
+        branch = Branch(
+            ifsc=self.ifsc[position].decode("ascii"),
+            bank_id=bank_id,
+            branch=self.branch[position],
+            address=self.address[position],
+            city=self.city.value(position),
+            district=self.district.value(position),
+            state=self.state.value(position),
+        )
+        branch.bank_name = self.bank_names.get(bank_id)
+        return branch
+
+
+_columnar: Optional[ColumnarBranches] = None
+
+
+async def build_columnar_index(db: AsyncSession) -> Callable[[int], None]:
+    """Load the branches table into columns; return a publisher for it"""
+    if np is None:
+        raise RuntimeError(
+            "The columnar search engine requires numpy: pip install 'indian-bank-api[columnar]'"
+        )
+    bank_result = await db.execute(select(Bank.id, Bank.name))
+    branch_result = await db.execute(
+        select(Branch.ifsc, Branch.bank_id, Branch.branch, Branch.address,
+               Branch.city, Branch.district, Branch.state)
+    )
+    columns = ColumnarBranches(branch_result.all(), dict(bank_result.all()))
+
+    def publish(version: int):
+        global _columnar
+        columns.dataset_version = version
+        _columnar = columns
+
+    return publish
+
+
+def get_columnar_index() -> Optional[ColumnarBranches]:
+    """Return the columnar index if it is built and still current"""
+    if _columnar is not None and _columnar.dataset_version == get_dataset_version():
+        return _columnar
+    return None
+
+
+def clear_columnar_index() -> None:
+    global _columnar
+    _columnar = None
@@ -0,0 +1,206 @@
+"""Response compression with a cache of pre-compressed payloads
+
+Responses are compressed with the best encoding the client accepts
+(brotli, zstd or gzip, depending on what is installed). For cacheable
+routes the compressed bytes are kept per dataset version, so repeated hits
+are answered from memory without running the handler or the compressor.
+The cache is dropped when the dataset moves on in any worker (see
+``app.core.dataset.is_current``), and entries expire after ``cache_ttl``
+seconds in any case.
+"""
+import gzip
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core import metrics
+from app.core.dataset import dataset_namespace, get_dataset_version, is_current
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+_COMPRESSIBLE_TYPES = (
+    "application/json", "text/", "application/x-ndjson", "application/msgpack",
+    "application/vnd.apache.arrow.stream",
+)
+
+
+def _compressors() -> Dict[str, Tuple]:
+    """Encoding -> (fast compressor, thorough compressor for cached variants)"""
+    available = {}
+    if brotli is not None:
+        available["br"] = (
+            lambda data: brotli.compress(data, quality=4),
+            lambda data: brotli.compress(data, quality=9),
+        )
+    if zstandard is not None:
+        available["zstd"] = (
+            lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+            lambda data: zstandard.ZstdCompressor(level=12).compress(data),
+        )
+    available["gzip"] = (
+        lambda data: gzip.compress(data, compresslevel=6, mtime=0),
+        lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+    )
+    return available
+
+
+def negotiate_encoding(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """Pick the accepted encoding with the highest q-value (server order breaks ties)"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compress GET responses and serve cacheable ones pre-compressed"""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        cacheable: Sequence[str] = (),
+        cache_max_bytes: int = 64 * 1024 * 1024,
+        cache_ttl: float = 60.0
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cacheable = [re.compile(pattern) for pattern in cacheable]
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_ttl = cache_ttl
+        self.compressors = _compressors()
+        # key -> (status, headers, body, monotonic expiry)
+        self._cache: "OrderedDict[tuple, Tuple[int, List, bytes, float]]" = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_version = get_dataset_version()
+        self._cache_namespace = dataset_namespace()
+        metrics.register_gauge("compression.cache_bytes", lambda: self._cache_bytes)
+        metrics.register_gauge("compression.cache_entries", lambda: len(self._cache))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get("accept-encoding", ""), list(self.compressors))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cache_key = None
+        if any(pattern.match(scope["path"]) for pattern in self.cacheable):
+            if not is_current(self._cache_version, self._cache_namespace):
+                # Variants of older datasets (written by any worker) can never be served again
+                self.clear()
+                self._cache_version = get_dataset_version()
+                self._cache_namespace = dataset_namespace()
+            version = self._cache_version
+            cache_key = (
+                version,
+                scope["path"],
+                scope["query_string"],
+                request_headers.get("accept", ""),
+                encoding,
+            )
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                metrics.increment("compression.cache_hits")
+                status, headers, body, _ = cached
+                await send({"type": "http.response.start", "status": status, "headers": headers})
+                await send({"type": "http.response.body", "body": body})
+                return
+            metrics.increment("compression.cache_misses")
+
+        start_message = None
+        chunks = []
+
+        async def buffered_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._respond(send, start_message, b"".join(chunks), encoding, cache_key)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _respond(self, send, start_message, body: bytes, encoding: str, cache_key) -> None:
+        headers = MutableHeaders(raw=list(start_message.get("headers", [])))
+        content_type = headers.get("content-type", "")
+        compress = (
+            len(body) >= self.minimum_size
+            and "content-encoding" not in headers
+            and content_type.startswith(_COMPRESSIBLE_TYPES)
+        )
+        if compress:
+            cacheable = cache_key is not None and start_message["status"] == 200
+            fast, thorough = self.compressors[encoding]
+            body = (thorough if cacheable else fast)(body)
+            metrics.increment(f"compression.{encoding}")
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            if cacheable:
+                expires = time.monotonic() + self.cache_ttl
+                self._cache_put(cache_key, (start_message["status"], headers.raw, body, expires))
+        await send({**start_message, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[3] <= time.monotonic():
+            self._cache_bytes -= len(self._cache.pop(key)[2])
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    def _cache_put(self, key, entry) -> None:
+        size = len(entry[2])
+        if size > self.cache_max_bytes:
+            return
+        if key in self._cache:
+            self._cache_bytes -= len(self._cache.pop(key)[2])
+        self._cache[key] = entry
+        self._cache_bytes += size
+        while self._cache_bytes > self.cache_max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted[2])
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._cache_bytes = 0
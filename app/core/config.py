@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     project_name: str = "Indian Bank API"
@@ -7,6 +7,82 @@ class Settings(BaseSettings):
     api_v1_prefix: str = "/api/v1"
     database_url: str = "sqlite+aiosqlite:///./indian_banks.db"
     
+    # Slow-query log (disabled when no threshold is set)
+    slow_query_threshold_ms: Optional[float] = None
+    slow_query_redact_params: bool = False
+    
+    # Opt-in request profiling (disabled when no token is set)
+    profile_token: Optional[str] = None
+    profile_sample_rate: float = 1.0
+    profile_dir: str = "./profiles"
+    
+    # Memory-mapped directory snapshot written by the loader (optional)
+    snapshot_path: Optional[str] = None
+    
+    # Branch search engine: "sql" or "columnar" (in-process NumPy columns)
+    branch_search_engine: Literal["sql", "columnar"] = "sql"
+    
+    # Share one query among identical concurrent reads
+    singleflight_enabled: bool = True
+    
+    # Response compression (gzip, plus brotli/zstd when installed)
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_cache_max_bytes: int = 64 * 1024 * 1024
+    compression_cache_ttl: float = 60
+    
+    # Sub-requests of POST /batch that may run at the same time
+    batch_max_concurrency: int = 8
+    
+    # Bloom filter of known IFSC codes for rejecting lookups without the DB
+    ifsc_bloom_enabled: bool = True
+    ifsc_bloom_fp_rate: float = 0.01
+    
+    # Admission control: concurrent requests and queue slots per route class
+    admission_enabled: bool = True
+    admission_lookup_limit: int = 32
+    admission_lookup_queue: int = 64
+    admission_search_limit: int = 8
+    admission_search_queue: int = 16
+    admission_expensive_limit: int = 2
+    admission_expensive_queue: int = 4
+    admission_queue_timeout_ms: float = 1000
+    admission_retry_after: int = 1
+    
+    # Records accepted by one POST /banks/bulk or /branches/bulk request, and
+    # NDJSON records decoded and written per transaction
+    bulk_max_rows: int = 10000
+    bulk_chunk_rows: int = 1000
+    
+    # Group commit for single-row creates: flush every N rows or after a delay
+    group_commit_enabled: bool = True
+    group_commit_max_rows: int = 256
+    group_commit_max_delay_ms: float = 2
+    
+    # Branch change log entries kept for GET /changes (older clients resync)
+    change_log_retention: int = 500000
+    
+    # Seconds between checks for a reloaded database file (0 disables hot swap)
+    database_watch_interval: float = 2.0
+    
+    # Result cache for service reads: in-process LRU plus an optional shared disk tier
+    result_cache_enabled: bool = True
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_ttl: float = 300
+    result_cache_path: Optional[str] = None
+    result_cache_disk_max_bytes: int = 512 * 1024 * 1024
+    result_cache_stat_interval: float = 1.0
+    
+    # Warm pages, statements and caches at startup before GET /ready reports ready
+    warmup_enabled: bool = True
+    
+    # Request tracing with head-based sampling (disabled at a sample rate of 0);
+    # spans go to stdout unless a trace file is set. Inbound traceparent
+    # sampled flags are only trusted when enabled (behind a trusted proxy)
+    trace_sample_rate: float = 0.0
+    trace_file: Optional[str] = None
+    trace_honor_traceparent: bool = False
+    
     class Config:
         env_file = ".env"
 
@@ -1,29 +1,83 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from pathlib import Path
+from typing import Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from app.core import metrics
 from app.core.config import settings
+from app.core.query_log import SlowQueryLog
+from app.core.profiling import install_db_timing
+from app.core.session import LazySession
+from app.core.tracing import install_sql_spans
+from app.core.write_fence import install_write_fence
 
-# Create async engine for SQLite
-engine = create_async_engine(
-    settings.database_url,
-    echo=False,  # Set to True for SQL query logging
-    future=True,
-    pool_pre_ping=True
-)
+def create_database_engine(url: str) -> AsyncEngine:
+    """Create an async engine with the configured instrumentation installed"""
+    engine = create_async_engine(
+        url,
+        echo=False,  # Set to True for SQL query logging
+        future=True,
+        pool_pre_ping=True
+    )
+    
+    # Log slow statements with their query plan when a threshold is configured
+    if settings.slow_query_threshold_ms is not None:
+        SlowQueryLog(
+            settings.slow_query_threshold_ms,
+            redact_params=settings.slow_query_redact_params
+        ).install(engine)
+    
+    # Attribute statement time to profiled requests
+    if settings.profile_token:
+        install_db_timing(engine)
+    
+    # Record a span per statement of sampled requests
+    if settings.trace_sample_rate > 0:
+        install_sql_spans(engine)
+    
+    # Never commit into a file that scripts/load_data.py has renamed over
+    database_file = sqlite_file(url)
+    if database_file is not None:
+        install_write_fence(engine, database_file)
+    
+    return engine
+
+def create_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        engine,
+        class_=LazySession,
+        expire_on_commit=False
+    )
+
+def sqlite_file(url: str) -> Optional[Path]:
+    """Path of the SQLite database file behind ``url`` (None for in-memory or other databases)"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    return Path(parsed.database)
+
+# Create async engine for SQLite. Both globals are replaced when the database
+# file is hot-swapped (see app.core.hot_swap), so look them up at call time.
+engine = create_database_engine(settings.database_url)
 
 # Create async session factory
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+AsyncSessionLocal = create_session_factory(engine)
 
 class Base(DeclarativeBase):
     pass
 
-# Dependency to get database session
+# Dependency for handlers that open several sessions of their own
+def get_session_factory() -> async_sessionmaker:
+    return AsyncSessionLocal
+
+# Dependency to get database session. The session only takes a connection
+# from the pool when it first runs SQL (see app.core.session).
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
+            metrics.increment("db.sessions")
+            if not session.used:
+                metrics.increment("db.sessions.unused")
@@ -0,0 +1,142 @@
+"""Process-wide dataset version and derived-index registry
+
+Derived, in-process copies of the data (snapshots, indexes, caches) record
+the version they were built from and are ignored once it moves on. Every
+write path bumps the version after committing, which schedules a rebuild of
+the registered indexes in the background.
+
+The version only counts this process's writes. Derived data also records
+the shared namespace of the database (see ``app.core.result_cache``), which
+moves when another worker writes; ``is_current`` checks both.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# An index builder reads what it needs through ``db`` and returns a callable
+# that publishes the result as current for a given dataset version, so
+# several indexes can be swapped in together.
+Publisher = Callable[[int], None]
+IndexBuilder = Callable[[AsyncSession], Awaitable[Publisher]]
+
+_version = 0
+_indexes: Dict[str, IndexBuilder] = {}
+_rebuild_task: Optional[asyncio.Task] = None
+_rebuild_pending = False
+_rebuild_namespace: Optional[str] = None
+
+
+def get_dataset_version() -> int:
+    """Return the current dataset version"""
+    return _version
+
+
+def bump_dataset_version() -> int:
+    """Mark the dataset as changed and return the new version"""
+    global _version
+    _version += 1
+    schedule_index_rebuild()
+    return _version
+
+
+def dataset_namespace(restat: bool = False) -> Optional[str]:
+    """Cross-process identity of the dataset, None for in-memory databases"""
+    from app.core.result_cache import shared_namespace  # imports this module
+    return shared_namespace(restat)
+
+
+def is_current(version: Optional[int], namespace: Optional[str], restat: bool = False) -> bool:
+    """Whether data derived at ``version`` and ``namespace`` still describes the dataset
+
+    A moved namespace means another worker wrote to (or replaced) the
+    database: the registered indexes are rebuilt in the background, once per
+    namespace, and callers fall back to SQL meanwhile. The namespace is
+    polled, so other workers' writes show up a stat interval late unless
+    ``restat`` is given; use it before trusting a negative answer.
+    """
+    global _rebuild_namespace
+    if version != _version:
+        return False
+    current = dataset_namespace(restat)
+    if namespace == current:
+        return True
+    if current != _rebuild_namespace:
+        _rebuild_namespace = current
+        schedule_index_rebuild()
+    return False
+
+
+def register_dataset_index(name: str, builder: IndexBuilder) -> None:
+    """Register an in-process index to (re)build for every dataset version"""
+    _indexes[name] = builder
+
+
+def unregister_dataset_index(name: str) -> None:
+    _indexes.pop(name, None)
+
+
+async def build_dataset_indexes(session_factory=None) -> List[Publisher]:
+    """Build every registered index and return their publishers"""
+    if session_factory is None:
+        from app.core import database
+        session_factory = database.AsyncSessionLocal
+    publishers = []
+    if not _indexes:
+        return publishers
+    async with session_factory() as db:
+        for name, builder in list(_indexes.items()):
+            try:
+                publishers.append(await builder(db))
+            except Exception:
+                # Readers fall back to SQL while an index is missing or stale
+                logger.exception(f"Building dataset index {name!r} failed")
+    return publishers
+
+
+async def rebuild_dataset_indexes(session_factory=None) -> None:
+    """Build every registered index, then publish them all at once"""
+    # A write during the build leaves the indexes stale, not silently incomplete
+    version = _version
+    for publish in await build_dataset_indexes(session_factory):
+        publish(version)
+
+
+def advance_dataset_version(publishers: Sequence[Publisher] = ()) -> int:
+    """Move to a new version whose indexes are already built and publish them
+
+    Used when the whole dataset is replaced: everything derived from the old
+    version goes stale and the prebuilt indexes go live in the same step.
+    """
+    global _version
+    _version += 1
+    for publish in publishers:
+        publish(_version)
+    return _version
+
+
+def schedule_index_rebuild() -> None:
+    """Rebuild indexes in the background, coalescing bursts of writes"""
+    global _rebuild_task, _rebuild_pending
+    if not _indexes:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _rebuild_task is not None and not _rebuild_task.done():
+        _rebuild_pending = True
+        return
+    _rebuild_task = loop.create_task(_rebuild_in_background())
+
+
+async def _rebuild_in_background() -> None:
+    global _rebuild_pending
+    while True:
+        _rebuild_pending = False
+        await rebuild_dataset_indexes()
+        if not _rebuild_pending:
+            return
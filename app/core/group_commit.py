@@ -0,0 +1,168 @@
+"""Group commit for single-row writes
+
+Concurrent ``create_bank``/``create_branch`` calls are queued and written
+together: the queue flushes once ``group_commit_max_rows`` rows are waiting
+or ``group_commit_max_delay_ms`` after the first one arrived, and every
+caller resumes only after the shared transaction has committed. With
+SQLite serializing writers and every commit paying for its own fsync, this
+turns N commits into one.
+
+If a grouped commit fails (for example on a duplicate key), the group is
+rolled back and its rows are committed one at a time, so each caller sees
+exactly the error its own row would have raised. Any other failure of a
+flush (opening the session, a rollback) is raised to every caller of the
+group instead, and a flusher that stops early fails the rows still queued,
+so no caller waits forever.
+"""
+import asyncio
+import weakref
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.dataset import bump_dataset_version
+
+# Adds one row to the session it is given and returns it
+AddRow = Callable[[AsyncSession], Any]
+
+
+class GroupCommitQueue:
+    """Write-behind queue flushing rows in grouped transactions on one engine"""
+
+    def __init__(self, bind: AsyncEngine, max_rows: int, max_delay: float):
+        self.bind = bind
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._pending: List[Tuple[AddRow, asyncio.Future]] = []
+        self._full: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, add_row: AddRow) -> Any:
+        """Queue a row and wait until it has been committed"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((add_row, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_pending())
+        elif len(self._pending) >= self.max_rows and self._full is not None:
+            self._full.set()
+        # A caller cancelled before its group is taken is simply dropped
+        return await future
+
+    async def _flush_pending(self) -> None:
+        self._full = asyncio.Event()
+        try:
+            if len(self._pending) < self.max_rows:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            while self._pending:
+                group = self._pending[:self.max_rows]
+                del self._pending[:self.max_rows]
+                group = [(add_row, future) for add_row, future in group if not future.done()]
+                if group:
+                    try:
+                        await self._commit(group)
+                    except Exception as e:
+                        metrics.increment("group_commit.failures")
+                        _fail(group, e)
+        except BaseException:
+            # Nothing else will flush the rows still queued; the next submit starts a new flusher
+            pending, self._pending = self._pending, []
+            for _, future in pending:
+                future.cancel()
+            raise
+        finally:
+            self._full = None
+
+    async def _commit(self, group: List[Tuple[AddRow, asyncio.Future]]) -> None:
+        async with AsyncSession(self.bind, expire_on_commit=False) as db:
+            try:
+                rows = [add_row(db) for add_row, _ in group]
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                failed = True
+            else:
+                failed = False
+        if failed:
+            metrics.increment("group_commit.fallbacks")
+            await self._commit_each(group)
+            return
+        metrics.increment("group_commit.flushes")
+        metrics.increment("group_commit.rows", len(group))
+        bump_dataset_version()
+        for (_, future), row in zip(group, rows):
+            if not future.done():
+                future.set_result(row)
+
+    async def _commit_each(self, group: List[Tuple[AddRow, asyncio.Future]]) -> None:
+        committed = 0
+        for add_row, future in group:
+            # A session per row, so a rollback cannot expire rows already written
+            async with AsyncSession(self.bind, expire_on_commit=False) as db:
+                try:
+                    row = add_row(db)
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+            committed += 1
+            if not future.done():
+                future.set_result(row)
+        if committed:
+            metrics.increment("group_commit.rows", committed)
+            bump_dataset_version()
+
+
+def _fail(group: List[Tuple[AddRow, asyncio.Future]], error: BaseException) -> None:
+    for _, future in group:
+        if not future.done():
+            future.set_exception(error)
+
+
+_queues: "weakref.WeakKeyDictionary[AsyncEngine, GroupCommitQueue]" = weakref.WeakKeyDictionary()
+metrics.register_gauge("group_commit.queued", lambda: sum(len(queue) for queue in list(_queues.values())))
+
+
+def reset_group_commit() -> None:
+    """Forget the per-engine queues, so new ones pick up the current settings"""
+    _queues.clear()
+
+
+def _queue_for(bind: AsyncEngine) -> GroupCommitQueue:
+    queue = _queues.get(bind)
+    if queue is None:
+        queue = _queues[bind] = GroupCommitQueue(
+            bind, settings.group_commit_max_rows, settings.group_commit_max_delay_ms / 1000
+        )
+    return queue
+
+
+async def write_row(db: AsyncSession, add_row: AddRow, group: Optional[bool] = None) -> Any:
+    """Add one row and commit it, grouped with concurrent writers when enabled
+
+    ``group`` overrides ``group_commit_enabled`` for this call. Grouped rows
+    are written through a session of their own on the engine behind ``db``
+    and then merged into ``db`` (without a query), so the caller gets an
+    instance of its own session either way. A session that already holds
+    unflushed changes is committed directly instead, so those changes are
+    written along with the row as before.
+    """
+    if group is None:
+        group = settings.group_commit_enabled
+    if not group or db.bind is None or db.new or db.dirty or db.deleted:
+        row = add_row(db)
+        await db.commit()
+        await db.refresh(row)
+        bump_dataset_version()
+        return row
+    row = await _queue_for(db.bind).submit(add_row)
+    return await db.merge(row, load=False)
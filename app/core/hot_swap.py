@@ -0,0 +1,83 @@
+"""Zero-downtime switch to a reloaded database file
+
+``scripts/load_data.py`` builds the new dataset in a separate file, checks
+it and atomically renames it over the live one. The API notices the new
+file and swaps the engine and session factory in ``app.core.database``:
+
+1. open an engine on the new file and build every dataset index (and the
+   directory snapshot) from it while requests keep using the old engine;
+2. in one synchronous step, switch ``database.engine`` and
+   ``database.AsyncSessionLocal`` and publish the prebuilt indexes under a
+   new dataset version, which also retires every cache of the old one;
+3. dispose of the old engine. Sessions that already hold a connection
+   finish on the old (now unlinked) file, which closes when they return it.
+
+Until then, reads on the old engine keep seeing the old dataset, but its
+writes are refused (``app.core.write_fence``), so nothing is committed to a
+file that has already been replaced.
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.core import database, metrics
+from app.core.config import settings
+from app.core.change_log import change_log_version
+from app.core.dataset import advance_dataset_version, build_dataset_indexes
+from app.core.snapshot import SnapshotError, stage_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+async def swap_database(url: Optional[str] = None) -> int:
+    """Switch the app to the database at ``url`` and return the new dataset version"""
+    engine = database.create_database_engine(url or settings.database_url)
+    session_factory = database.create_session_factory(engine)
+    try:
+        publishers = await build_dataset_indexes(session_factory)
+        if settings.snapshot_path and Path(settings.snapshot_path).exists():
+            try:
+                async with session_factory() as db:
+                    change_version = await change_log_version(db)
+                publishers.append(stage_snapshot(settings.snapshot_path, change_version))
+            except SnapshotError as e:
+                logger.warning(f"Ignoring directory snapshot: {e}")
+    except BaseException:
+        await engine.dispose()
+        raise
+
+    previous = database.engine
+    database.engine, database.AsyncSessionLocal = engine, session_factory
+    version = advance_dataset_version(publishers)
+
+    await previous.dispose()
+    metrics.increment("database.swaps")
+    logger.info(f"Switched to the reloaded database (dataset version {version})")
+    return version
+
+
+def _inode(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+async def watch_database_file(path: Path, interval: float) -> None:
+    """Swap to ``path`` whenever a new file is renamed over it"""
+    current = _inode(path)
+    while True:
+        await asyncio.sleep(interval)
+        inode = _inode(path)
+        if inode is None or inode == current:
+            continue
+        try:
+            await swap_database()
+        except Exception:
+            # Retry on the next tick; the old database keeps serving meanwhile
+            logger.exception("Switching to the reloaded database failed")
+            metrics.increment("database.swap_failures")
+            continue
+        current = inode
@@ -0,0 +1,53 @@
+"""In-memory Bloom filter of known IFSC codes
+
+Lets the IFSC endpoint reject codes that definitely do not exist without a
+database round trip. The filter is rebuilt for every dataset version and is
+ignored while stale, so a freshly inserted branch is never rejected: it
+records the dataset version and the shared namespace it was built from,
+and a write by this or any other worker moves one of them.
+"""
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.dataset import dataset_namespace, is_current
+from app.models.branch import Branch
+from app.utils.bloom import BloomFilter
+
+_filter: Optional[BloomFilter] = None
+_filter_version: Optional[int] = None
+_filter_namespace: Optional[str] = None
+
+
+async def build_ifsc_filter(db: AsyncSession) -> Callable[[int], None]:
+    """Build the filter from the branches table; return a publisher for it"""
+    # Taken first, so a write by another worker during the scan leaves it stale
+    namespace = dataset_namespace()
+    count = (await db.execute(select(func.count(Branch.ifsc)))).scalar()
+    bloom = BloomFilter(count, settings.ifsc_bloom_fp_rate)
+    result = await db.stream_scalars(select(Branch.ifsc))
+    async for ifsc in result:
+        bloom.add(ifsc.upper())
+
+    def publish(version: int):
+        global _filter, _filter_version, _filter_namespace
+        _filter, _filter_version, _filter_namespace = bloom, version, namespace
+
+    return publish
+
+
+def might_exist(ifsc: str) -> bool:
+    """False only if ``ifsc`` is definitely not in the current dataset"""
+    if _filter is None or not is_current(_filter_version, _filter_namespace):
+        return True
+    if ifsc.upper() in _filter:
+        return True
+    # Another worker may have inserted it since the namespace was last polled
+    return not is_current(_filter_version, _filter_namespace, restat=True)
+
+
+def clear_ifsc_filter() -> None:
+    global _filter, _filter_version, _filter_namespace
+    _filter, _filter_version, _filter_namespace = None, None, None
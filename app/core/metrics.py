@@ -0,0 +1,33 @@
+"""Minimal in-process metrics registry exposed by ``GET /metrics``"""
+from collections import defaultdict
+from typing import Callable, Dict
+
+_counters: Dict[str, int] = defaultdict(int)
+_gauges: Dict[str, Callable[[], float]] = {}
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Add ``value`` to the counter ``name``"""
+    _counters[name] += value
+
+
+def register_gauge(name: str, read: Callable[[], float]) -> None:
+    """Expose a value computed on demand, e.g. a queue depth"""
+    _gauges[name] = read
+
+
+def get_counter(name: str) -> int:
+    return _counters.get(name, 0)
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """Current counter and gauge values"""
+    return {
+        "counters": dict(sorted(_counters.items())),
+        "gauges": {name: read() for name, read in sorted(_gauges.items())},
+    }
+
+
+def reset() -> None:
+    """Zero every counter (gauges are left registered)"""
+    _counters.clear()
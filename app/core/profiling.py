@@ -0,0 +1,161 @@
+import cProfile
+import hmac
+import json
+import pstats
+import random
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+# Profile of the request currently running in this context, if any
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+# Self-time buckets, matched against "filename:function" (first match wins)
+_CATEGORIES = (
+    ("route_handler", ("/app/api/", "/app/main.py")),
+    ("service", ("/app/services/",)),
+    ("sqlalchemy_compile", ("/sqlalchemy/sql/",)),
+    ("sqlalchemy_orm", ("/sqlalchemy/",)),
+    ("aiosqlite", ("/aiosqlite/",)),
+    ("serialization", ("/pydantic", "pydantic_core", "/fastapi/encoders.py", "/json/")),
+    ("io_wait", ("'select.", "'selectors.")),
+)
+
+
+class RequestProfile:
+    """Profile state for a single request"""
+
+    def __init__(self):
+        self.profile_id = uuid.uuid4().hex
+        self.profiler = cProfile.Profile()
+        self.db_execute_ms = 0.0
+        self.statements = 0
+
+    def breakdown(self, total_ms: float) -> Dict[str, float]:
+        """Group profiler self-time into request phases (milliseconds)"""
+        buckets = {name: 0.0 for name, _ in _CATEGORIES}
+        buckets["other"] = 0.0
+        for (filename, _, funcname), (_, _, tottime, _, _) in pstats.Stats(self.profiler).stats.items():
+            location = filename.replace("\\", "/") + ":" + funcname
+            for name, patterns in _CATEGORIES:
+                if any(pattern in location for pattern in patterns):
+                    buckets[name] += tottime * 1000
+                    break
+            else:
+                buckets["other"] += tottime * 1000
+        # aiosqlite runs statements on its own thread, so use wall-clock time
+        buckets["db_execute"] = self.db_execute_ms
+        buckets["total"] = total_ms
+        return {name: round(value, 3) for name, value in buckets.items()}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profile.get() is not None:
+        conn.info.setdefault("profile_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    starts = conn.info.get("profile_start_time")
+    if profile is not None and starts:
+        profile.db_execute_ms += (time.perf_counter() - starts.pop()) * 1000
+        profile.statements += 1
+
+
+def install_db_timing(engine) -> None:
+    """Record statement wall time for profiled requests"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def remove_db_timing(engine) -> None:
+    """Detach the listeners added by ``install_db_timing``"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.remove(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+    """Profile requests that opt in with ``X-Profile: 1`` or ``?profile=1``
+
+    The caller must also send ``X-Profile-Token`` matching the configured
+    token. Only ``sample_rate`` of such requests are profiled and only one at
+    a time, because cProfile observes every coroutine on the event loop
+    thread. The pstats file and a JSON phase breakdown are written to
+    ``output_dir``; the breakdown is also returned as ``Server-Timing``.
+    """
+
+    def __init__(self, app, token: str, sample_rate: float = 1.0, output_dir: str = "profiles"):
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.output_dir = Path(output_dir)
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope) or not self._admit():
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _active_profile.set(profile)
+        self._busy = True
+        started = time.perf_counter()
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if not finished:
+                profile.profiler.disable()
+                finished = True
+            return profile.breakdown((time.perf_counter() - started) * 1000)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                breakdown = finish()
+                timing = ", ".join(f"{name};dur={value}" for name, value in breakdown.items())
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.profile_id.encode()))
+                headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profile.profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            breakdown = finish()
+            _active_profile.reset(token)
+            self._busy = False
+            # Keep file I/O off the event loop
+            await run_in_threadpool(self._save, profile, scope, breakdown)
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        query = scope.get("query_string", b"").split(b"&")
+        if headers.get(b"x-profile") != b"1" and b"profile=1" not in query:
+            return False
+        supplied = headers.get(b"x-profile-token", b"")
+        return hmac.compare_digest(supplied, self.token.encode())
+
+    def _admit(self) -> bool:
+        return not self._busy and random.random() < self.sample_rate
+
+    def _save(self, profile: RequestProfile, scope, breakdown: Dict[str, float]) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        profile.profiler.dump_stats(self.output_dir / f"{profile.profile_id}.pstats")
+        summary = {
+            "profile_id": profile.profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "statements": profile.statements,
+            "breakdown_ms": breakdown,
+        }
+        with open(self.output_dir / f"{profile.profile_id}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
@@ -0,0 +1,116 @@
+import functools
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, List, Optional
+
+from sqlalchemy import event
+
+from app.core.tracing import span
+
+logger = logging.getLogger("app.slow_query")
+
+# Qualified name of the service method currently issuing SQL
+current_operation: ContextVar[Optional[str]] = ContextVar("current_operation", default=None)
+
+_MAX_PARAM_LENGTH = 64
+
+
+def track_operation(func):
+    """Tag every statement issued inside ``func`` with its qualified name
+
+    The call gets its own span in sampled traces.
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_operation.set(name)
+        try:
+            with span(name):
+                return await func(*args, **kwargs)
+        finally:
+            current_operation.reset(token)
+
+    return wrapper
+
+
+class SlowQueryLog:
+    """Log statements slower than a threshold as structured JSON"""
+
+    def __init__(self, threshold_ms: float, redact_params: bool = False):
+        self.threshold_ms = threshold_ms
+        self.redact_params = redact_params
+
+    def install(self, engine) -> None:
+        """Attach the timing listeners to an (async) engine"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+
+    def remove(self, engine) -> None:
+        """Detach the timing listeners from an (async) engine"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.remove(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append((context, time.perf_counter()))
+
+    def _handle_error(self, exception_context):
+        """Drop the start time of a failed statement, which never reaches after_cursor_execute"""
+        connection = exception_context.connection
+        starts = connection.info.get("query_start_time") if connection is not None else None
+        if starts and starts[-1][0] is exception_context.execution_context:
+            starts.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        _, started = conn.info["query_start_time"].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+
+        record = {
+            "event": "slow_query",
+            "duration_ms": round(duration_ms, 3),
+            "threshold_ms": self.threshold_ms,
+            "operation": current_operation.get(),
+            "sql": statement,
+            "params": None if executemany else self._format_params(parameters),
+            "executemany": executemany,
+            "plan": None if executemany else self._explain(conn, statement, parameters),
+        }
+        logger.warning(json.dumps(record, default=str))
+
+    def _format_params(self, parameters) -> Any:
+        if parameters is None:
+            return None
+        if isinstance(parameters, dict):
+            return {key: self._format_value(value) for key, value in parameters.items()}
+        return [self._format_value(value) for value in parameters]
+
+    def _format_value(self, value: Any) -> Any:
+        if self.redact_params:
+            return f"<{type(value).__name__}>"
+        if isinstance(value, str) and len(value) > _MAX_PARAM_LENGTH:
+            return value[:_MAX_PARAM_LENGTH] + "..."
+        return value
+
+    @staticmethod
+    def _explain(conn, statement: str, parameters) -> Optional[List[str]]:
+        """Capture ``EXPLAIN QUERY PLAN`` for SELECT statements on SQLite"""
+        if conn.dialect.name != "sqlite":
+            return None
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return None
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return [row[-1] for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"unavailable: {e}"]
+        finally:
+            cursor.close()
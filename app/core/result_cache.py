@@ -0,0 +1,317 @@
+"""Two-tier cache for service read results
+
+``@cached`` read methods are answered from:
+
+1. an in-process LRU with a byte budget and a TTL, and
+2. an optional SQLite file on local disk (``result_cache_path``) shared by
+   every worker on the host and kept across restarts, with its own byte
+   budget.
+
+Keys are namespaced by the dataset: the in-process dataset version, which
+moves on every local write or hot swap; the identity (inode, mtime, size)
+of the database file, which moves when any process writes to it or the
+file is replaced; and a generation counter in the disk tier that every
+worker advances when its own dataset version moves. The shared parts are
+re-read at most every ``result_cache_stat_interval`` seconds, so a write by
+another worker is picked up within that interval.
+
+Values are stored pickled in both tiers and every hit unpickles a private,
+detached copy, so callers never share ORM instances. The disk tier must
+only ever be written by this application; it is only touched from its own
+thread, as its lock waits would otherwise stall the event loop.
+"""
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import sqlite_file
+from app.core.dataset import get_dataset_version
+from app.core.singleflight import call_key
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryTier:
+    """LRU of pickled values with a byte budget"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.nbytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        data, expires = entry
+        if expires <= time.monotonic():
+            self._remove(key)
+            metrics.increment("result_cache.memory.expired")
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (data, time.monotonic() + self.ttl)
+        self.nbytes += len(data)
+        while self.nbytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            metrics.increment("result_cache.memory.evictions")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        data, _ = self._entries.pop(key)
+        self.nbytes -= len(data)
+
+
+class DiskTier:
+    """Pickled results in a SQLite file, trimmed oldest-first to a byte budget"""
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._written = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=1, isolation_level=None, check_same_thread=False)
+        # WAL lets every worker read while one of them writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key BLOB PRIMARY KEY, namespace TEXT NOT NULL, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (1, 0)")
+
+    def generation(self) -> int:
+        return self._conn.execute("SELECT value FROM generation WHERE id = 1").fetchone()[0]
+
+    def advance_generation(self) -> int:
+        """Retire every worker's entries, e.g. after this worker wrote to the dataset"""
+        return self._conn.execute(
+            "UPDATE generation SET value = value + 1 WHERE id = 1 RETURNING value"
+        ).fetchone()[0]
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT value FROM results WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: bytes, namespace: str, data: bytes) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, namespace, value, size, expires) VALUES (?, ?, ?, ?, ?)",
+            (key, namespace, data, len(data), time.time() + self.ttl)
+        )
+        self._written += len(data)
+        if self._written > self.max_bytes // 16:
+            self.trim(namespace)
+
+    def trim(self, namespace: str) -> None:
+        """Drop expired and other-namespace entries, then the oldest until within budget"""
+        self._written = 0
+        evicted = self._conn.execute(
+            "DELETE FROM results WHERE namespace != ? OR expires <= ?", (namespace, time.time())
+        ).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self._conn.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY rowid LIMIT 64) "
+                "RETURNING size"
+            ).fetchall()
+            if not rows:
+                break
+            total -= sum(size for size, in rows)
+            evicted += len(rows)
+        if evicted:
+            metrics.increment("result_cache.disk.evictions", evicted)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_memory = MemoryTier(settings.result_cache_max_bytes, settings.result_cache_ttl)
+_memory_version: Optional[int] = None
+_disk: Optional[DiskTier] = None
+_disk_opened = False
+# One thread, so the disk tier's connection is never used concurrently
+_disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+
+# Shared namespace, re-read at most every stat interval or after a local write
+_database_file = sqlite_file(settings.database_url)
+_namespace: Optional[str] = None
+_namespace_at = 0.0
+_namespace_version: Optional[int] = None
+_generation = 0
+_generation_at = 0.0
+_generation_version: Optional[int] = None
+
+metrics.register_gauge("result_cache.memory.bytes", lambda: _memory.nbytes)
+metrics.register_gauge("result_cache.memory.entries", lambda: len(_memory))
+
+
+async def _on_disk(fn: Callable[..., Any], *args) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(_disk_executor, fn, *args)
+
+
+async def _refresh_generation(version: int) -> None:
+    """Re-read the disk tier's generation, advancing it if this worker's dataset moved"""
+    global _generation, _generation_at, _generation_version
+    now = time.monotonic()
+    changed_here = _generation_version is not None and version != _generation_version
+    if not changed_here and now - _generation_at < settings.result_cache_stat_interval:
+        return
+    _generation_at, _generation_version = now, version
+
+    def read() -> Optional[int]:
+        disk = _disk_tier()
+        if disk is None:
+            return None
+        return disk.advance_generation() if changed_here else disk.generation()
+
+    try:
+        generation = await _on_disk(read)
+    except sqlite3.Error:
+        metrics.increment("result_cache.disk.errors")
+        return
+    if generation is not None:
+        _generation = generation
+
+
+def _shared_namespace(version: int, restat: bool = False) -> Optional[str]:
+    global _namespace, _namespace_at, _namespace_version
+    if _database_file is None:
+        return None
+    now = time.monotonic()
+    changed_here = _namespace_version is not None and version != _namespace_version
+    if changed_here or now - _namespace_at >= settings.result_cache_stat_interval:
+        _namespace_at, _namespace_version = now, version
+        restat = True
+    if restat:
+        try:
+            stat = os.stat(_database_file)
+            _namespace = f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}:{_generation}"
+        except FileNotFoundError:
+            _namespace = None
+    return _namespace
+
+
+def shared_namespace(restat: bool = False) -> Optional[str]:
+    """Identity of the dataset shared by every worker; None for in-memory databases
+
+    It moves when any process writes to or replaces the database file and
+    when this worker's own dataset version moves. Derived in-process data
+    records it to notice writes made by other workers. ``restat`` re-reads
+    the file's identity now instead of up to a stat interval late.
+    """
+    return _shared_namespace(get_dataset_version(), restat)
+
+
+def _disk_tier() -> Optional[DiskTier]:
+    global _disk, _disk_opened
+    if not _disk_opened and settings.result_cache_path:
+        _disk_opened = True
+        try:
+            _disk = DiskTier(
+                settings.result_cache_path, settings.result_cache_disk_max_bytes, settings.result_cache_ttl
+            )
+        except sqlite3.Error:
+            logger.exception(f"Cannot open the result cache at {settings.result_cache_path}")
+    return _disk
+
+
+def clear_result_cache() -> None:
+    """Empty the in-process tier and close the disk tier (reopened on next use)"""
+    global _disk, _disk_opened, _namespace, _namespace_at, _namespace_version
+    global _generation, _generation_at, _generation_version
+    _memory.clear()
+    if _disk is not None:
+        _disk_executor.submit(_disk.close).result()
+    _disk, _disk_opened = None, False
+    _namespace, _namespace_at, _namespace_version = None, 0.0, None
+    _generation, _generation_at, _generation_version = 0, 0.0, None
+
+
+def cached(func):
+    """Serve a read method from the result cache, filling it on a miss
+
+    The first parameter (the session) is not part of the key. Each hit
+    gets its own unpickled copy of the result, detached from any session.
+    """
+    make_key = call_key(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        global _memory_version
+        if not settings.result_cache_enabled:
+            return await func(*args, **kwargs)
+        version = get_dataset_version()
+        if version != _memory_version:
+            _memory.clear()
+            _memory_version = version
+        if _database_file is not None:
+            await _refresh_generation(version)
+        namespace = _shared_namespace(version)
+        key = (namespace, make_key(*args, **kwargs))
+
+        data = _memory.get(key)
+        if data is not None:
+            metrics.increment("result_cache.memory.hits")
+            return pickle.loads(data)
+        metrics.increment("result_cache.memory.misses")
+
+        disk = _disk if namespace is not None else None
+        disk_key = hashlib.blake2b(repr(key).encode(), digest_size=16).digest() if disk else None
+        if disk is not None:
+            try:
+                data = await _on_disk(disk.get, disk_key)
+            except sqlite3.Error:
+                metrics.increment("result_cache.disk.errors")
+                data = None
+            if data is not None:
+                metrics.increment("result_cache.disk.hits")
+                _memory.put(key, data)
+                return pickle.loads(data)
+            metrics.increment("result_cache.disk.misses")
+
+        value = await func(*args, **kwargs)
+        if get_dataset_version() != version:
+            # The data changed while we were reading it
+            return value
+        try:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            metrics.increment("result_cache.unpicklable")
+            return value
+        _memory.put(key, data)
+        if disk is not None:
+            try:
+                await _on_disk(disk.put, disk_key, namespace, data)
+            except sqlite3.Error:
+                metrics.increment("result_cache.disk.errors")
+        return value
+
+    return wrapper
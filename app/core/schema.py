@@ -0,0 +1,176 @@
+"""Schema bootstrap: declared indexes, in-place upgrades and planner statistics
+
+The models declare every index the query shapes need. ``Base.metadata``
+creates them with the tables, but the loader drops them for the bulk load
+and builds them afterwards with ``create_indexes`` followed by ``analyze``.
+
+At startup ``upgrade_schema`` brings a database written by an older loader
+up to date: missing tables (such as the change log) are created, missing
+branch columns are added (``scripts/backfill_pincodes.py`` fills in the
+values) and missing indexes are reported and created.
+"""
+import logging
+from typing import List, Sequence
+
+from sqlalchemy import Index, Table, bindparam, inspect, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.schema import CreateIndex, CreateTable, DropIndex
+
+from app.core.database import Base
+from app.models.bank import Bank  # noqa: F401 - registers the table
+from app.models.branch import Branch
+from app.models.change import BranchChange  # noqa: F401 - registers the table
+from app.utils.pincode import extract_pincode
+
+logger = logging.getLogger(__name__)
+
+
+def _missing_tables(sync_conn) -> List[Table]:
+    inspector = inspect(sync_conn)
+    return [table for table in Base.metadata.sorted_tables if not inspector.has_table(table.name)]
+
+
+async def create_tables(conn: AsyncConnection) -> List[str]:
+    """Create every declared table the database lacks; return their names
+
+    Like ``Base.metadata.create_all(checkfirst=True)``, but with ``IF NOT
+    EXISTS`` so several workers can run it at the same time. The indexes of
+    the new tables are left to ``create_indexes``.
+    """
+    created = []
+    for table in await conn.run_sync(_missing_tables):
+        await conn.execute(CreateTable(table, if_not_exists=True))
+        created.append(table.name)
+    return created
+
+
+def _missing_columns(sync_conn) -> List[str]:
+    inspector = inspect(sync_conn)
+    if not inspector.has_table(Branch.__tablename__):
+        return []
+    present = {column["name"] for column in inspector.get_columns(Branch.__tablename__)}
+    return [column.name for column in Branch.__table__.columns if column.name not in present]
+
+
+def _missing_indexes(sync_conn) -> List[Index]:
+    inspector = inspect(sync_conn)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        # A missing table is missing all of its indexes too
+        present = (
+            {index["name"] for index in inspector.get_indexes(table.name)}
+            if inspector.has_table(table.name) else set()
+        )
+        missing.extend(index for index in table.indexes if index.name not in present)
+    return missing
+
+
+async def missing_indexes(conn: AsyncConnection) -> List[str]:
+    """Names of declared indexes absent from the database, including those of absent tables"""
+    return [index.name for index in await conn.run_sync(_missing_indexes)]
+
+
+async def create_indexes(conn: AsyncConnection) -> List[str]:
+    """Create every declared index the database lacks; return their names
+
+    Absent tables are created first. ``IF NOT EXISTS`` lets several workers
+    run this at the same time.
+    """
+    await create_tables(conn)
+    created = []
+    for index in await conn.run_sync(_missing_indexes):
+        await conn.execute(CreateIndex(index, if_not_exists=True))
+        created.append(index.name)
+    return created
+
+
+async def drop_indexes(conn: AsyncConnection, tables: Sequence[Table]) -> None:
+    """Drop the declared indexes of ``tables``, e.g. before a bulk load"""
+    for table in tables:
+        for index in table.indexes:
+            await conn.execute(DropIndex(index, if_exists=True))
+
+
+async def analyze(conn: AsyncConnection, full: bool = False) -> None:
+    """Refresh the statistics the query planner chooses indexes by
+
+    ``full`` runs ``ANALYZE`` over everything, as needed after a bulk load
+    or new indexes; otherwise ``PRAGMA optimize`` re-analyzes only what it
+    considers out of date.
+    """
+    if full:
+        await conn.exec_driver_sql("ANALYZE")
+    await conn.exec_driver_sql("PRAGMA optimize")
+
+
+def _has_branches(sync_conn) -> bool:
+    return inspect(sync_conn).has_table(Branch.__tablename__)
+
+
+def _has_statistics(sync_conn) -> bool:
+    return inspect(sync_conn).has_table("sqlite_stat1")
+
+
+async def upgrade_schema(conn: AsyncConnection) -> List[str]:
+    """Add missing tables, branch columns and indexes to an existing database
+
+    Returns the names of the added columns.
+    """
+    created = await create_tables(conn)
+    if created:
+        logger.warning(f"Created tables {', '.join(created)}")
+    added = []
+    for name in await conn.run_sync(_missing_columns):
+        column = Branch.__table__.c[name]
+        try:
+            await conn.exec_driver_sql(
+                f"ALTER TABLE {Branch.__tablename__} ADD COLUMN {name} "
+                f"{column.type.compile(conn.dialect)}"
+            )
+        except OperationalError as e:
+            # Another worker starting at the same time added it first
+            if "duplicate column name" not in str(e.orig):
+                raise
+            continue
+        added.append(name)
+        logger.warning(f"Added column branches.{name}; run scripts/backfill_pincodes.py to fill it")
+    absent = await missing_indexes(conn)
+    if absent:
+        logger.warning(f"Database is missing indexes {', '.join(absent)}; creating them")
+        await create_indexes(conn)
+    if await conn.run_sync(_has_branches):
+        await analyze(conn, full=bool(absent) or not await conn.run_sync(_has_statistics))
+    return added
+
+
+async def backfill_pincodes(db: AsyncSession, batch_size: int = 5000) -> int:
+    """Fill ``Branch.pincode`` for rows that have an address but no PIN yet"""
+    updated = 0
+    last_ifsc = ""
+    while True:
+        result = await db.execute(
+            select(Branch.ifsc, Branch.address)
+            .where(Branch.pincode.is_(None), Branch.address.is_not(None), Branch.ifsc > last_ifsc)
+            .order_by(Branch.ifsc)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return updated
+        last_ifsc = rows[-1].ifsc
+        values = [
+            {"row_ifsc": ifsc, "pincode": pincode}
+            for ifsc, address in rows
+            if (pincode := extract_pincode(address)) is not None
+        ]
+        if values:
+            table = Branch.__table__
+            await db.execute(
+                table.update()
+                .where(table.c.ifsc == bindparam("row_ifsc"))
+                .values(pincode=bindparam("pincode")),
+                values
+            )
+        await db.commit()
+        updated += len(values)
@@ -0,0 +1,99 @@
+"""Request sessions that hold a pooled connection only while SQL is running
+
+A session checks out a connection for its first statement, not when it is
+created, so a request answered from the result cache, the snapshot or an
+in-process index never touches the pool. Service methods decorated with
+``releases_connection`` call ``release`` when the outermost one returns: if
+the transaction only read, it is ended there and then and the connection
+goes back to the pool instead of being held until the response has been
+sent. A later call on the same session simply checks out a connection
+again.
+"""
+import functools
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+
+
+class TrackedSession(Session):
+    """Sync session recording whether it used a connection and whether it wrote"""
+
+    used = False
+    wrote = False
+
+
+@event.listens_for(TrackedSession, "after_begin")
+def _after_begin(session, transaction, connection):
+    session.used = True
+
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.wrote = True
+
+
+@event.listens_for(TrackedSession, "after_flush")
+def _after_flush(session, flush_context):
+    session.wrote = True
+
+
+@event.listens_for(TrackedSession, "after_transaction_end")
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.wrote = False
+
+
+class LazySession(AsyncSession):
+    sync_session_class = TrackedSession
+
+    @property
+    def used(self) -> bool:
+        """Whether any statement has run on this session"""
+        return self.sync_session.used
+
+    async def release(self) -> None:
+        """End a read-only transaction so its connection returns to the pool
+
+        Sessions with pending or executed writes are left alone; whoever
+        made them commits or rolls back. Loaded objects stay attached and
+        unexpired, so sessions that expire on commit are not released.
+        """
+        sync_session = self.sync_session
+        if not self.in_transaction() or sync_session.wrote or sync_session.expire_on_commit:
+            return
+        if sync_session.new or sync_session.dirty or sync_session.deleted:
+            return
+        await self.commit()
+        metrics.increment("db.connections.released_early")
+
+
+# Whether a ``releases_connection`` call is running in this task
+_in_call: ContextVar[bool] = ContextVar("in_releasing_call", default=False)
+
+
+def releases_connection(func):
+    """Release the session passed as the first argument when the outermost call returns
+
+    Nested calls share their caller's transaction, so only the outermost
+    one ends it. Sessions without ``release`` are left alone.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _in_call.get():
+            return await func(*args, **kwargs)
+        token = _in_call.set(True)
+        try:
+            result = await func(*args, **kwargs)
+        finally:
+            _in_call.reset(token)
+        release = getattr(args[0], "release", None) if args else None
+        if release is not None:
+            await release()
+        return result
+
+    return wrapper
@@ -0,0 +1,152 @@
+"""Coalesce identical concurrent reads into a single in-flight call"""
+import asyncio
+import functools
+import inspect
+import pickle
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The leader was cancelled, not us: run the call ourselves
+                if not future.cancelled():
+                    raise
+                return await self.do(key, fn)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved even when nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+_group = SingleFlight()
+metrics.register_gauge("singleflight.in_flight", _group.in_flight)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+# Arguments the services treat case-insensitively
+_NORMALIZE = {"ifsc": str.upper, "ifsc_prefix": str.upper}
+
+
+def _normalize(param: str, value: Any) -> Any:
+    if isinstance(value, str) and param in _NORMALIZE:
+        return _NORMALIZE[param](value)
+    return value
+
+
+def call_key(func) -> Callable[..., Hashable]:
+    """Build a key function identifying a call of ``func`` by its arguments
+
+    The first parameter (the session) is left out. Arguments are bound to
+    the signature with defaults applied, so ``f(db, 1)`` and
+    ``f(db, bank_id=1)`` get the same key, and IFSC arguments are
+    upper-cased, as the services look them up.
+    """
+    name = func.__qualname__
+    signature = inspect.signature(func)
+    session_param = next(iter(signature.parameters))
+
+    def key(*args, **kwargs) -> Hashable:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return (name,) + tuple(
+            (param, _freeze(_normalize(param, value)))
+            for param, value in bound.arguments.items()
+            if param != session_param
+        )
+
+    return key
+
+
+class _Shared:
+    """A leader's result, handed to each follower as a private copy
+
+    ORM instances in the result belong to the leader's session; an
+    unpickled copy is detached, so followers cannot load through (or
+    mutate the state of) a session they do not own. The result is pickled
+    once, when the first follower asks for it.
+    """
+
+    __slots__ = ("value", "_data")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self._data = None
+
+    def copy(self) -> Any:
+        if self.value is None:
+            return None
+        if self._data is None:
+            try:
+                self._data = pickle.dumps(self.value, pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                metrics.increment("singleflight.uncopyable")
+                return self.value
+        return pickle.loads(self._data)
+
+
+def coalesce(func):
+    """Share one execution of a read method among identical concurrent calls
+
+    The first parameter (the session) is not part of the key: followers get
+    a copy of the leader's result and never touch their own session.
+    """
+    name = func.__qualname__
+    make_key = call_key(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not settings.singleflight_enabled:
+            return await func(*args, **kwargs)
+        key = make_key(*args, **kwargs)
+
+        led = False
+
+        async def call():
+            nonlocal led
+            led = True
+            return _Shared(await func(*args, **kwargs))
+
+        shared = await _group.do(key, call)
+        outcome = "executed" if led else "coalesced"
+        metrics.increment(f"singleflight.{outcome}")
+        metrics.increment(f"singleflight.{name}.{outcome}")
+        return shared.value if led else shared.copy()
+
+    return wrapper
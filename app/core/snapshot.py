@@ -0,0 +1,320 @@
+"""Memory-mapped, read-only binary snapshot of the branch directory
+
+The loader writes the snapshot next to the database; every worker maps the
+same file, so lookups share the OS page cache instead of per-worker copies.
+Every branch write appends to the change log, so a snapshot whose recorded
+change log version differs from the database's is stale and is refused.
+
+Layout (little-endian)::
+
+    header    magic, format version, counts, section offsets and the change
+              log version of the database it was built from
+    keys      n_branches x 11-byte IFSC codes, sorted
+    rows      n_branches x (bank_id, branch, address, city, district, state)
+              where text columns are offsets into the string table
+    strings   deduplicated u16-length-prefixed UTF-8 strings
+    banks     n_banks x (bank_id, name, posting start, posting count)
+    states    n_states x (name, posting start, posting count)
+    postings  u32 row numbers, ascending (i.e. IFSC order) per bank/state
+"""
+import bisect
+import mmap
+import os
+import struct
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.change_log import change_log_version
+from app.core.dataset import dataset_namespace, get_dataset_version, is_current
+from app.models.bank import Bank
+from app.models.branch import Branch
+
+MAGIC = b"BNKSNAP\0"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<8sIIII8Q")
+_ROW = struct.Struct("<IIIIII")
+_BANK = struct.Struct("<IIII")
+_STATE = struct.Struct("<III")
+_KEY_WIDTH = 11
+_NULL = 0xFFFFFFFF
+
+BranchRow = Tuple[str, int, Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, corrupt or of another format"""
+
+
+def write_snapshot(
+    path: str,
+    banks: Iterable[Tuple[int, str]],
+    branches: Iterable[BranchRow],
+    change_version: int = 0
+) -> None:
+    """Write a snapshot of ``banks`` and ``branches`` atomically to ``path``"""
+    bank_names = dict(banks)
+    rows = sorted(branches, key=lambda row: row[0])
+
+    strings = bytearray()
+    string_offsets: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return _NULL
+        if value not in string_offsets:
+            encoded = value.encode("utf-8")
+            string_offsets[value] = len(strings)
+            strings.extend(struct.pack("<H", len(encoded)))
+            strings.extend(encoded)
+        return string_offsets[value]
+
+    keys = bytearray()
+    row_data = bytearray()
+    by_bank: Dict[int, List[int]] = {bank_id: [] for bank_id in bank_names}
+    by_state: Dict[str, List[int]] = {}
+    for position, (ifsc, bank_id, branch, address, city, district, state) in enumerate(rows):
+        keys.extend(ifsc.encode("ascii").ljust(_KEY_WIDTH, b"\0"))
+        row_data.extend(_ROW.pack(
+            bank_id, intern(branch), intern(address), intern(city), intern(district), intern(state)
+        ))
+        by_bank.setdefault(bank_id, []).append(position)
+        if state is not None:
+            by_state.setdefault(state, []).append(position)
+
+    postings = bytearray()
+    bank_data = bytearray()
+    for bank_id in sorted(by_bank):
+        members = by_bank[bank_id]
+        bank_data.extend(_BANK.pack(bank_id, intern(bank_names.get(bank_id)), len(postings) // 4, len(members)))
+        postings.extend(struct.pack(f"<{len(members)}I", *members))
+    state_data = bytearray()
+    for state in sorted(by_state):
+        members = by_state[state]
+        state_data.extend(_STATE.pack(intern(state), len(postings) // 4, len(members)))
+        postings.extend(struct.pack(f"<{len(members)}I", *members))
+
+    sections = [keys, row_data, strings, bank_data, state_data, postings]
+    offsets = []
+    position = _HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(rows), len(by_bank), len(by_state),
+        *offsets, len(strings), change_version
+    )
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+async def build_snapshot(db: AsyncSession, path: str) -> int:
+    """Write a snapshot of the database behind ``db``; return the branch count"""
+    change_version = await change_log_version(db)
+    bank_result = await db.execute(select(Bank.id, Bank.name))
+    branch_result = await db.execute(
+        select(Branch.ifsc, Branch.bank_id, Branch.branch, Branch.address,
+               Branch.city, Branch.district, Branch.state)
+    )
+    rows = [tuple(row) for row in branch_result.all()]
+    write_snapshot(path, [tuple(row) for row in bank_result.all()], rows, change_version)
+    return len(rows)
+
+
+class _Keys(Sequence):
+    """Sequence view over the fixed-width IFSC key array, for bisect"""
+
+    def __init__(self, buffer, offset: int, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = self._offset + index * _KEY_WIDTH
+        return self._buffer[start:start + _KEY_WIDTH]
+
+
+class DirectorySnapshot:
+    """Read-only view over a memory-mapped snapshot file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise SnapshotError(f"Empty snapshot file: {path}") from e
+        if len(self._mm) < _HEADER.size:
+            raise SnapshotError(f"Truncated snapshot file: {path}")
+        (magic, version, self.branch_count, bank_count, state_count,
+         keys_off, self._rows_off, self._strings_off, banks_off, states_off,
+         self._postings_off, _, self.change_version) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format in {path}")
+
+        self._keys = _Keys(self._mm, keys_off, self.branch_count)
+        # Bank and state directories are tiny; decode them once
+        self._banks: Dict[int, Tuple[Optional[str], int, int]] = {}
+        for index in range(bank_count):
+            bank_id, name_off, start, count = _BANK.unpack_from(self._mm, banks_off + index * _BANK.size)
+            self._banks[bank_id] = (self._string(name_off), start, count)
+        self._states: List[Tuple[str, int, int]] = []
+        for index in range(state_count):
+            name_off, start, count = _STATE.unpack_from(self._mm, states_off + index * _STATE.size)
+            self._states.append((self._string(name_off), start, count))
+        # Derived data is only valid for the dataset it was opened at
+        self.dataset_version = get_dataset_version()
+        self.dataset_namespace = dataset_namespace()
+
+    def check(self, change_version: Optional[int]) -> None:
+        """Refuse the snapshot unless it was built at ``change_version`` (None skips the check)"""
+        if change_version is not None and change_version != self.change_version:
+            self.close()
+            raise SnapshotError(
+                f"Stale snapshot {self.path}: built at change log version {self.change_version}, "
+                f"the database is at {change_version}"
+            )
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _string(self, offset: int) -> Optional[str]:
+        if offset == _NULL:
+            return None
+        start = self._strings_off + offset
+        (length,) = struct.unpack_from("<H", self._mm, start)
+        return self._mm[start + 2:start + 2 + length].decode("utf-8")
+
+    def _postings(self, start: int, count: int) -> Tuple[int, ...]:
+        return struct.unpack_from(f"<{count}I", self._mm, self._postings_off + start * 4)
+
+    def _branch(self, position: int) -> Branch:
+        bank_id, branch_off, address_off, city_off, district_off, state_off = _ROW.unpack_from(
+            self._mm, self._rows_off + position * _ROW.size
+        )
+        branch = Branch(
+            ifsc=self._keys[position].rstrip(b"\0").decode("ascii"),
+            bank_id=bank_id,
+            branch=self._string(branch_off),
+            address=self._string(address_off),
+            city=self._string(city_off),
+            district=self._string(district_off),
+            state=self._string(state_off),
+        )
+        bank = self._banks.get(bank_id)
+        branch.bank_name = bank[0] if bank else None
+        return branch
+
+    def get_branch(self, ifsc: str) -> Optional[Branch]:
+        """Look up a branch by IFSC with a binary search over the key array"""
+        try:
+            key = ifsc.upper().encode("ascii").ljust(_KEY_WIDTH, b"\0")
+        except UnicodeEncodeError:
+            return None
+        if len(key) != _KEY_WIDTH:
+            return None
+        position = bisect.bisect_left(self._keys, key)
+        if position < self.branch_count and self._keys[position] == key:
+            return self._branch(position)
+        return None
+
+    def search_branches(
+        self,
+        bank_id: Optional[int] = None,
+        state: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Branch], int]:
+        """Filter by bank and/or state (case-insensitive substring) using posting lists"""
+        if state is None:
+            if bank_id is None:
+                page = range(skip, min(skip + limit, self.branch_count))
+                return [self._branch(position) for position in page], self.branch_count
+            bank = self._banks.get(bank_id)
+            if bank is None:
+                return [], 0
+            _, start, count = bank
+            if skip >= count:
+                return [], count
+            page = self._postings(start + skip, min(limit, count - skip))
+            return [self._branch(position) for position in page], count
+
+        needle = state.upper()
+        matching = [(start, count) for name, start, count in self._states if needle in name.upper()]
+        if len(matching) == 1 and bank_id is None:
+            start, count = matching[0]
+            if skip >= count:
+                return [], count
+            page = self._postings(start + skip, min(limit, count - skip))
+            return [self._branch(position) for position in page], count
+
+        positions = set()
+        for start, count in matching:
+            positions.update(self._postings(start, count))
+        if bank_id is not None:
+            bank = self._banks.get(bank_id)
+            positions.intersection_update(self._postings(bank[1], bank[2]) if bank else ())
+        ordered = sorted(positions)
+        return [self._branch(position) for position in ordered[skip:skip + limit]], len(ordered)
+
+
+_snapshot: Optional[DirectorySnapshot] = None
+
+
+def open_snapshot(path: str, change_version: Optional[int] = None) -> DirectorySnapshot:
+    """Map the snapshot at ``path`` and make it the active one
+
+    ``change_version`` is the database's (see ``change_log_version``); a
+    snapshot built at another version raises ``SnapshotError``.
+    """
+    snapshot = DirectorySnapshot(path)
+    snapshot.check(change_version)
+    _activate(snapshot)
+    return snapshot
+
+
+def stage_snapshot(path: str, change_version: Optional[int] = None) -> Callable[[int], None]:
+    """Map and check the snapshot at ``path``; return a publisher activating it for a version"""
+    snapshot = DirectorySnapshot(path)
+    snapshot.check(change_version)
+
+    def publish(version: int):
+        snapshot.dataset_version = version
+        snapshot.dataset_namespace = dataset_namespace()
+        _activate(snapshot)
+
+    return publish
+
+
+def _activate(snapshot: DirectorySnapshot) -> None:
+    global _snapshot
+    previous, _snapshot = _snapshot, snapshot
+    if previous is not None:
+        previous.close()
+
+
+def close_snapshot() -> None:
+    """Unmap the active snapshot"""
+    global _snapshot
+    if _snapshot is not None:
+        _snapshot.close()
+        _snapshot = None
+
+
+def get_snapshot() -> Optional[DirectorySnapshot]:
+    """Return the active snapshot if it still matches the dataset (in every worker)"""
+    if _snapshot is not None and is_current(_snapshot.dataset_version, _snapshot.dataset_namespace):
+        return _snapshot
+    return None
@@ -0,0 +1,385 @@
+"""Request tracing: spans for the request, service calls, SQL and serialization
+
+A sampled request gets a trace made of these spans:
+
+- a root span per request (``GET /api/v1/branches/``),
+- one span per tracked service call (see ``track_operation``); cache hits
+  never reach the service method, so they have no service span,
+- one span per SQL statement, with ``db.compile_ms`` (compilation,
+  statement cache lookup and parameter processing) split from
+  ``db.execute_ms`` (the cursor execute),
+- ``serialize_response`` (response model validation; recent FastAPI
+  versions also encode the JSON there) and ``json_encode`` (rendering a
+  ``JSONResponse``).
+
+The sampling decision is made once, when a request arrives (head-based).
+An incoming W3C ``traceparent`` header is joined, but its sampled flag only
+decides when the middleware is told to trust callers; otherwise any client
+could have every one of its requests traced. Requests that are not sampled
+skip every hook after a single context variable lookup. A finished trace is
+queued and written by a background thread as JSON lines, one span per
+line, in OpenTelemetry field names, to stdout or a local file.
+"""
+import functools
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO
+
+from sqlalchemy import event
+
+from app.core import metrics
+
+# Span the current task is running in, if its request is sampled
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_MAX_STATEMENT_LENGTH = 2000
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ("trace", "span_id", "parent_span_id", "name", "attributes", "start_ns", "end_ns", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "OK"
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        self.trace.spans.append(self)
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """Finished spans of one sampled request, exported together"""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: List[Span] = []
+
+
+class SpanExporter:
+    """Write finished traces as JSON lines, one span per line
+
+    ``export`` only queues the trace, so requests never wait on encoding or
+    I/O. A background thread drains the queue in batches of up to
+    ``max_batch`` traces, one write each. Traces arriving while
+    ``max_queue`` are waiting are dropped (``tracing.traces_dropped``).
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        path: Optional[str] = None,
+        max_queue: int = 2048,
+        max_batch: int = 256,
+    ):
+        self.stream = stream
+        self.path = path
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        metrics.register_gauge("tracing.queued", self._queue.qsize)
+
+    def export(self, trace: Trace) -> None:
+        self._start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            metrics.increment("tracing.traces_dropped")
+
+    def flush(self) -> None:
+        """Block until every queued trace has been written"""
+        if self._worker is not None:
+            self._queue.join()
+
+    def shutdown(self) -> None:
+        """Write what is queued and stop the thread (a later export restarts it)"""
+        with self._lock:
+            if self._worker is not None:
+                self._queue.put(None)
+                self._worker.join()
+                self._worker = None
+
+    def _start(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            traces = [trace for trace in batch if trace is not None]
+            try:
+                if traces:
+                    self._write(traces)
+            except Exception:
+                metrics.increment("tracing.export_failures")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _write(self, traces: List[Trace]) -> None:
+        lines = "".join(
+            json.dumps(span.to_dict(), default=str) + "\n" for trace in traces for span in trace.spans
+        )
+        if self.path is not None:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        else:
+            stream = self.stream or sys.stdout
+            stream.write(lines)
+            stream.flush()
+        metrics.increment("tracing.traces_exported", len(traces))
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Child span of the current one; a no-op outside a sampled request"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced(name: str):
+    """Run an async function inside ``span(name)``"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_execute(conn, clauseelement, multiparams, params, execution_options):
+    parent = _current_span.get()
+    if parent is not None:
+        sql_span = Span(parent.trace, "sql", parent.span_id, {"db.system": conn.dialect.name})
+        conn.info.setdefault("trace_spans", []).append([sql_span, time.perf_counter(), None])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    pending = conn.info.get("trace_spans")
+    if _current_span.get() is not None and pending:
+        sql_span, started, _ = pending[-1]
+        now = time.perf_counter()
+        pending[-1][2] = now
+        sql_span.attributes["db.statement"] = statement[:_MAX_STATEMENT_LENGTH]
+        sql_span.attributes["db.compile_ms"] = round((now - started) * 1000, 3)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    pending = conn.info.get("trace_spans")
+    if _current_span.get() is not None and pending and pending[-1][2] is not None:
+        sql_span, _, cursor_started = pending[-1]
+        sql_span.attributes["db.execute_ms"] = round((time.perf_counter() - cursor_started) * 1000, 3)
+        if executemany:
+            sql_span.attributes["db.executemany"] = True
+
+
+def _after_execute(conn, clauseelement, multiparams, params, execution_options, result):
+    pending = conn.info.get("trace_spans")
+    if _current_span.get() is not None and pending:
+        pending.pop()[0].end()
+
+
+def _handle_error(context):
+    pending = context.connection.info.get("trace_spans") if context.connection is not None else None
+    if _current_span.get() is not None and pending:
+        sql_span = pending.pop()[0]
+        sql_span.record_exception(context.original_exception)
+        sql_span.end()
+
+
+_SQL_LISTENERS = {
+    "before_execute": _before_execute,
+    "before_cursor_execute": _before_cursor_execute,
+    "after_cursor_execute": _after_cursor_execute,
+    "after_execute": _after_execute,
+    "handle_error": _handle_error,
+}
+
+
+def install_sql_spans(engine) -> None:
+    """Record a span per statement executed on an (async) engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    for name, listener in _SQL_LISTENERS.items():
+        event.listen(sync_engine, name, listener)
+
+
+def remove_sql_spans(engine) -> None:
+    """Undo ``install_sql_spans``"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    for name, listener in _SQL_LISTENERS.items():
+        event.remove(sync_engine, name, listener)
+
+
+# Originals replaced by ``install_serialization_spans``, for uninstalling
+_serialization_originals: Dict[str, Callable] = {}
+
+
+def install_serialization_spans() -> None:
+    """Trace response model validation and JSON encoding (idempotent)
+
+    Wraps ``fastapi.routing.serialize_response``, which route handlers look
+    up at call time, and ``JSONResponse.render``.
+    """
+    if _serialization_originals:
+        return
+    import fastapi.routing
+    from starlette.responses import JSONResponse
+
+    _serialization_originals["serialize_response"] = fastapi.routing.serialize_response
+    _serialization_originals["render"] = JSONResponse.render
+    fastapi.routing.serialize_response = traced("serialize_response")(fastapi.routing.serialize_response)
+    render = JSONResponse.render
+
+    @functools.wraps(render)
+    def traced_render(self, content: Any) -> bytes:
+        if _current_span.get() is None:
+            return render(self, content)
+        with span("json_encode") as encode_span:
+            body = render(self, content)
+            encode_span.attributes["http.response_content_length"] = len(body)
+            return body
+
+    JSONResponse.render = traced_render
+
+
+def uninstall_serialization_spans() -> None:
+    """Undo ``install_serialization_spans``"""
+    if not _serialization_originals:
+        return
+    import fastapi.routing
+    from starlette.responses import JSONResponse
+
+    fastapi.routing.serialize_response = _serialization_originals.pop("serialize_response")
+    JSONResponse.render = _serialization_originals.pop("render")
+
+
+class TracingMiddleware:
+    """Open a root span for sampled requests and export the finished trace
+
+    ``sample_rate`` of the requests are traced. A sampled request with a
+    valid ``traceparent`` header joins that trace; the header's sampled flag
+    replaces the coin flip only with ``honor_traceparent`` (for callers
+    behind a trusted proxy). Sampled responses carry ``traceparent`` so
+    callers can find the trace.
+    """
+
+    def __init__(self, app, sample_rate: float, exporter: SpanExporter, honor_traceparent: bool = False):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.honor_traceparent = honor_traceparent
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace_id, parent_span_id, sampled = self._head(scope)
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id)
+        root = Span(trace, f"{scope['method']} {scope['path']}", parent_span_id, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        query = scope.get("query_string", b"")
+        if query:
+            root.attributes["http.query"] = query.decode("latin-1")
+        token = _current_span.set(root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", f"00-{trace.trace_id}-{root.span_id}-01".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            root.end()
+            self.exporter.export(trace)
+
+    def _head(self, scope):
+        """(trace id, parent span id, sampled) for an incoming request"""
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                match = _TRACEPARENT.match(value.decode("latin-1").strip())
+                if match:
+                    trace_id, parent_span_id, flags = match.groups()
+                    if self.honor_traceparent:
+                        return trace_id, parent_span_id, bool(int(flags, 16) & 1)
+                    return trace_id, parent_span_id, random.random() < self.sample_rate
+                break
+        return None, None, random.random() < self.sample_rate
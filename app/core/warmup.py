@@ -0,0 +1,123 @@
+"""Startup warm-up and the readiness flag behind ``GET /ready``
+
+Right after a deploy the SQLite pages are cold, SQLAlchemy has compiled no
+statements yet and no result is cached. ``warm_up`` runs once in the
+background at startup, before ``/ready`` reports ready:
+
+1. ``pages``: scan every declared index, pulling its pages into the OS
+   page cache,
+2. ``statements``: run each hot service read once with representative
+   arguments, which compiles its statements into the engine's cache and
+   fills the result cache (including the per-bank branch counts),
+3. ``responses``: render those results through the response models of
+   their endpoints.
+
+The in-process dataset indexes (Bloom filter, bank codes, columnar index)
+are built by the lifespan just before. Each step is timed; a failing step
+is logged and skipped, since serving cold beats never becoming ready.
+"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core import metrics
+from app.models.bank import Bank
+from app.models.branch import Branch
+from app.schemas.bank import BankList
+from app.schemas.branch import Branch as BranchSchema, BranchDetail
+from app.services.bank_service import BankService
+from app.services.branch_service import BRANCH_SORTS, BranchService
+from app.utils.pagination import PaginatedResponse
+
+logger = logging.getLogger(__name__)
+
+_ready = False
+_duration: Optional[float] = None
+
+metrics.register_gauge("warmup.seconds", lambda: _duration or 0.0)
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+def warmup_duration() -> Optional[float]:
+    """Seconds the warm-up took, None until it has finished"""
+    return _duration
+
+
+def mark_ready() -> None:
+    """Report ready without warming up, e.g. when warm-up is disabled"""
+    global _ready
+    _ready = True
+
+
+def reset_readiness() -> None:
+    global _ready, _duration
+    _ready, _duration = False, None
+
+
+async def _touch_pages(db: AsyncSession, results: Dict[str, Any]) -> None:
+    for table in (Bank.__table__, Branch.__table__):
+        for index in table.indexes:
+            await db.execute(text(f"SELECT count(*) FROM {table.name} INDEXED BY {index.name}"))
+
+
+async def _run_statements(db: AsyncSession, results: Dict[str, Any]) -> None:
+    results["banks"] = await BankService.get_all_banks(db)
+    await BankService.get_bank_count(db)
+    await BranchService.get_branch_count(db)
+    ifsc = (await db.execute(select(Branch.ifsc).order_by(Branch.ifsc).limit(1))).scalar()
+    if ifsc is None:
+        return
+    results["branch"] = await BranchService.get_branch_by_ifsc(db, ifsc)
+    await BankService.get_bank_by_code(db, ifsc[:4])
+    bank_id = results["branch"].bank_id
+    results["page"] = await BranchService.search_branches(db)
+    for sort in BRANCH_SORTS:
+        await BranchService.get_branches_by_bank_id(db, bank_id, sort=sort)
+        await BranchService.search_branches(db, bank_id=bank_id, sort=sort)
+
+
+async def _render_responses(db: AsyncSession, results: Dict[str, Any]) -> None:
+    for bank, branch_count in results.get("banks", [])[:50]:
+        BankList(id=bank.id, name=bank.name, branch_count=branch_count).model_dump_json()
+    if "branch" in results:
+        BranchDetail.model_validate(results["branch"]).model_dump_json()
+    if "page" in results:
+        items, total = results["page"]
+        PaginatedResponse[BranchSchema](items=items, total=total, skip=0, limit=100).model_dump_json()
+
+
+_STEPS = (
+    ("pages", _touch_pages),
+    ("statements", _run_statements),
+    ("responses", _render_responses),
+)
+
+
+async def warm_up(session_factory: Optional[async_sessionmaker] = None) -> float:
+    """Run every warm-up step, mark the process ready and return the duration"""
+    global _ready, _duration
+    if session_factory is None:
+        from app.core import database
+        session_factory = database.AsyncSessionLocal
+    started = time.perf_counter()
+    results: Dict[str, Any] = {}
+    timings = {}
+    for name, step in _STEPS:
+        step_started = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                await step(db, results)
+        except Exception:
+            metrics.increment("warmup.failures")
+            logger.exception(f"Warm-up step {name!r} failed")
+        timings[name] = round(time.perf_counter() - step_started, 3)
+    _duration = time.perf_counter() - started
+    _ready = True
+    logger.info(f"Warm-up finished in {_duration:.3f}s ({timings})")
+    return _duration
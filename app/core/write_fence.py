@@ -0,0 +1,83 @@
+"""Refuse writes that would land in a database file that was replaced
+
+``scripts/load_data.py`` renames a reloaded file over the live one while
+holding the live file's write lock. Connections opened before the rename
+keep the old, now unlinked, file open: a writer that was waiting on that
+lock, or a worker that has not noticed the new file yet (see
+``app.core.hot_swap``), would write into a file nobody reads again.
+
+Every connection records the inode of the file it opened. Each write
+statement, and the commit of a transaction that wrote (while it still
+holds the write lock), first checks that the path still names that inode;
+SQLite's own "readonly database" error for a moved file is treated the
+same. The transaction is rolled back and ``DatabaseReplacedError`` raised,
+which the API answers with ``503``; the retry reaches the new file.
+"""
+import os
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import metrics
+
+_WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class DatabaseReplacedError(Exception):
+    """The database file was replaced during the write; nothing was committed"""
+
+
+def _inode(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+
+
+def install_write_fence(engine: AsyncEngine, path: Path) -> None:
+    """Fence writes of ``engine`` against ``path`` being renamed over"""
+    sync_engine = engine.sync_engine
+
+    def moved(conn) -> bool:
+        return _inode(path) != conn.info.get("database_inode")
+
+    def refuse(conn) -> DatabaseReplacedError:
+        metrics.increment("database.fenced_writes")
+        return DatabaseReplacedError(f"{path} was replaced during the write; retry it")
+
+    def record_inode(dbapi_connection, connection_record):
+        connection_record.info["database_inode"] = _inode(path)
+
+    def check_write(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:7].upper().startswith(_WRITES):
+            if moved(conn):
+                raise refuse(conn)
+            conn.info["database_wrote"] = True
+
+    def check_commit(conn):
+        if conn.info.pop("database_wrote", False) and moved(conn):
+            conn.engine.dialect.do_rollback(conn.connection)
+            raise refuse(conn)
+
+    def forget_write(conn):
+        conn.info.pop("database_wrote", None)
+
+    def translate_error(context):
+        # SQLite refuses to write to a file that was moved since it was opened
+        error = context.original_exception
+        if (
+            isinstance(error, sqlite3.OperationalError)
+            and "readonly database" in str(error)
+            and context.connection is not None
+            and moved(context.connection)
+        ):
+            raise refuse(context.connection) from error
+
+    event.listen(sync_engine, "connect", record_inode)
+    event.listen(sync_engine, "before_cursor_execute", check_write)
+    event.listen(sync_engine, "commit", check_commit)
+    event.listen(sync_engine, "rollback", forget_write)
+    event.listen(sync_engine, "handle_error", translate_error)
@@ -1,19 +1,140 @@
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from pathlib import Path
+import logging
 from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.core.database import get_db
+from app.core.admission import admitted_db
+from app.core import metrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.tracing import SpanExporter, TracingMiddleware, install_serialization_spans
+from app.core.change_log import change_log_version
+from app.core.snapshot import SnapshotError, open_snapshot, close_snapshot
+from app.core.columnar import build_columnar_index
+from app.core.ifsc_filter import build_ifsc_filter
+from app.core.bank_codes import build_bank_codes
+from app.core.bank_registry import build_bank_registry, clear_bank_registry
+from app.core import database
+from app.core.database import sqlite_file
+from app.core.hot_swap import watch_database_file
+from app.core.write_fence import DatabaseReplacedError
+from app.core.result_cache import clear_result_cache
+from app.core.schema import upgrade_schema
+from app.core.warmup import is_ready, mark_ready, reset_readiness, warm_up, warmup_duration
+from app.core.dataset import (
+    register_dataset_index,
+    unregister_dataset_index,
+    rebuild_dataset_indexes,
+)
 from app.services.bank_service import BankService
 from app.services.branch_service import BranchService
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with database.engine.begin() as conn:
+        await upgrade_schema(conn)
+    if settings.snapshot_path and Path(settings.snapshot_path).exists():
+        try:
+            async with database.AsyncSessionLocal() as db:
+                open_snapshot(settings.snapshot_path, await change_log_version(db))
+        except SnapshotError as e:
+            logger.warning(f"Ignoring directory snapshot: {e}")
+    if settings.branch_search_engine == "columnar":
+        register_dataset_index("columnar", build_columnar_index)
+    if settings.ifsc_bloom_enabled:
+        register_dataset_index("ifsc_bloom", build_ifsc_filter)
+    register_dataset_index("bank_codes", build_bank_codes)
+    register_dataset_index("bank_registry", build_bank_registry)
+    await rebuild_dataset_indexes()
+    watcher = None
+    database_file = sqlite_file(settings.database_url)
+    if database_file is not None and settings.database_watch_interval > 0:
+        # Pick up datasets reloaded by scripts/load_data.py without a restart
+        watcher = asyncio.create_task(
+            watch_database_file(database_file, settings.database_watch_interval)
+        )
+    warmup = None
+    if settings.warmup_enabled:
+        # Serve (cold) right away; GET /ready flips once this is done
+        warmup = asyncio.create_task(warm_up())
+    else:
+        mark_ready()
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    reset_readiness()
+    if watcher is not None:
+        watcher.cancel()
+    unregister_dataset_index("columnar")
+    unregister_dataset_index("ifsc_bloom")
+    unregister_dataset_index("bank_codes")
+    unregister_dataset_index("bank_registry")
+    clear_bank_registry()
+    close_snapshot()
+    clear_result_cache()
+    if trace_exporter is not None:
+        # Write the queued traces without blocking the event loop
+        await run_in_threadpool(trace_exporter.shutdown)
+
 app = FastAPI(
     title=settings.project_name,
     version=settings.version,
     description="REST API for Indian Banks and Branches data",
+    lifespan=lifespan,
 )
 
 app.include_router(api_router, prefix=settings.api_v1_prefix)
 
+@app.exception_handler(DatabaseReplacedError)
+async def database_replaced(request, exc: DatabaseReplacedError):
+    """A write raced a reload of the database file; retry once this worker has switched to it"""
+    return JSONResponse(
+        {"detail": "Database is being replaced, retry the write"},
+        status_code=503,
+        headers={"Retry-After": str(math.ceil(settings.database_watch_interval) or 1)},
+    )
+
+if settings.compression_enabled:
+    # Bank lists and per-bank branch pages are kept pre-compressed
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        cacheable=[
+            rf"^{settings.api_v1_prefix}/banks/$",
+            rf"^{settings.api_v1_prefix}/branches/bank/\d+$",
+        ],
+        cache_max_bytes=settings.compression_cache_max_bytes,
+        cache_ttl=settings.compression_cache_ttl,
+    )
+
+if settings.profile_token:
+    app.add_middleware(
+        ProfilingMiddleware,
+        token=settings.profile_token,
+        sample_rate=settings.profile_sample_rate,
+        output_dir=settings.profile_dir,
+    )
+
+trace_exporter = None
+if settings.trace_sample_rate > 0:
+    # Outermost, so the root span covers every other middleware
+    install_serialization_spans()
+    trace_exporter = SpanExporter(path=settings.trace_file)
+    app.add_middleware(
+        TracingMiddleware,
+        sample_rate=settings.trace_sample_rate,
+        exporter=trace_exporter,
+        honor_traceparent=settings.trace_honor_traceparent,
+    )
+
 @app.get("/")
 async def root():
     return {
@@ -27,8 +148,20 @@ async def root():
 async def health_check():
     return {"status": "healthy", "database": "sqlite"}
 
+@app.get("/ready")
+async def readiness_check():
+    """503 until the startup warm-up has finished, for load balancer readiness probes"""
+    if not is_ready():
+        return JSONResponse({"status": "warming_up"}, status_code=503)
+    return {"status": "ready", "warmup_seconds": warmup_duration()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """In-process counters and gauges"""
+    return metrics.snapshot()
+
 @app.get("/stats")
-async def get_database_stats(db: AsyncSession = Depends(get_db)):
+async def get_database_stats(db: AsyncSession = Depends(admitted_db("expensive"))):
     """Get comprehensive database statistics"""
     try:
         # Get bank count
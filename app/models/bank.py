@@ -5,7 +5,7 @@ from app.core.database import Base
 class Bank(Base):
     __tablename__ = "banks"
     
-    id = Column(BigInteger, primary_key=True, index=True)
+    id = Column(BigInteger, primary_key=True)
     name = Column(String(49), nullable=False)
     
     # Relationship
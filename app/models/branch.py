@@ -1,17 +1,34 @@
-from sqlalchemy import Column, BigInteger, String, ForeignKey
+from sqlalchemy import Column, BigInteger, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Branch(Base):
     __tablename__ = "branches"
     
-    ifsc = Column(String(11), primary_key=True, index=True)
+    ifsc = Column(String(11), primary_key=True)
     bank_id = Column(BigInteger, ForeignKey("banks.id"), nullable=False)
     branch = Column(String(74))
     address = Column(String(195))
     city = Column(String(50))
     district = Column(String(50))
     state = Column(String(26))
+    pincode = Column(String(6), index=True)  # extracted from the address
     
     # Relationship
     bank = relationship("Bank", back_populates="branches")
+    
+    # One index per sort order, alone and within a bank, each ending in the
+    # primary key so results come back in a stable order without a sort step.
+    # PIN code lookups match a handful of rows and sort them instead.
+    # Together they also lead with every column indexed by indian_bank_clean.sql
+    # (bank_id, city, state, district) and cover the join on bank_id.
+    __table_args__ = (
+        Index("ix_branches_branch_ifsc", "branch", "ifsc"),
+        Index("ix_branches_city_ifsc", "city", "ifsc"),
+        Index("ix_branches_state_district_city_ifsc", "state", "district", "city", "ifsc"),
+        Index("ix_branches_district_ifsc", "district", "ifsc"),
+        Index("ix_branches_bank_id_ifsc", "bank_id", "ifsc"),
+        Index("ix_branches_bank_id_branch_ifsc", "bank_id", "branch", "ifsc"),
+        Index("ix_branches_bank_id_city_ifsc", "bank_id", "city", "ifsc"),
+        Index("ix_branches_bank_id_state_district_city_ifsc", "bank_id", "state", "district", "city", "ifsc"),
+    )
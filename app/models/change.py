@@ -0,0 +1,21 @@
+from sqlalchemy import Column, BigInteger, Integer, String
+from app.core.database import Base
+
+class BranchChange(Base):
+    """One entry of the branch change log; ``version`` never goes backwards"""
+    __tablename__ = "branch_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    ifsc = Column(String(11), nullable=False, index=True)
+    op = Column(String(6), nullable=False)  # insert, update or delete
+
+# ``ChangeLogMeta`` key of the change log floor
+FLOOR_KEY = "floor"
+
+class ChangeLogMeta(Base):
+    """Change log bookkeeping, e.g. ``floor``: the oldest version deltas start from"""
+    __tablename__ = "change_log_meta"
+    
+    key = Column(String(32), primary_key=True)
+    value = Column(BigInteger, nullable=False)
@@ -19,6 +19,12 @@ class BankList(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class BankCode(BaseModel):
+    code: str
+    bank_id: int
+    bank_name: str
+    branch_count: int
+
 # Define BankDetail without forward reference for now
 class BankDetail(BankBase):
     id: int
@@ -0,0 +1,43 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+from app.schemas.branch import BranchSort, SortOrder
+from app.utils.ifsc import IFSC_PREFIX_PATTERN
+from app.utils.pincode import PINCODE_PATTERN
+
+class SearchParams(BaseModel):
+    q: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    district: Optional[str] = None
+    bank_id: Optional[int] = None
+    pincode: Optional[str] = Field(None, pattern=PINCODE_PATTERN)
+    ifsc_prefix: Optional[str] = Field(None, pattern=IFSC_PREFIX_PATTERN)
+    skip: int = Field(0, ge=0)
+    limit: int = Field(100, ge=1, le=1000)
+    fields: Optional[str] = None
+    sort: BranchSort = "ifsc"
+    order: SortOrder = "asc"
+
+class LookupParams(BaseModel):
+    ifsc: str
+    fields: Optional[str] = None
+
+class BankListParams(BaseModel):
+    q: Optional[str] = None
+    skip: int = Field(0, ge=0)
+    limit: int = Field(50, ge=1, le=1000)
+
+class BatchSubRequest(BaseModel):
+    op: Literal["search", "lookup", "banks"]
+    params: Dict[str, Any] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=50)
+
+class BatchItemResult(BaseModel):
+    status: int
+    body: Optional[Any] = None
+    detail: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
@@ -1,5 +1,9 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
+
+# Sort orders of branch listings (see BRANCH_SORTS in the branch service)
+BranchSort = Literal["ifsc", "branch", "city", "state"]
+SortOrder = Literal["asc", "desc"]
 
 class BranchBase(BaseModel):
     ifsc: str
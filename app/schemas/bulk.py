@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Any, List, Literal, Optional, Union
+
+class BulkRowResult(BaseModel):
+    index: int
+    key: Optional[Union[int, str]] = None
+    status: Literal["inserted", "updated", "error"]
+    detail: Optional[Any] = None
+
+class BulkResponse(BaseModel):
+    inserted: int
+    updated: int
+    errors: int
+    results: List[BulkRowResult]
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import List
+from app.schemas.branch import Branch
+
+class ChangeFeed(BaseModel):
+    since: int
+    version: int
+    resync: bool = False
+    has_more: bool = False
+    upserted: List[Branch] = []
+    deleted: List[str] = []
@@ -1,13 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from sqlalchemy.dialects.sqlite import insert
+from typing import Dict, List, Optional, Sequence
 from app.models.bank import Bank
 from app.models.branch import Branch
 from app.schemas.bank import BankCreate
+from app.core.query_log import track_operation
+from app.core.session import releases_connection
+from app.core.singleflight import coalesce
+from app.core.result_cache import cached
+from app.core.dataset import bump_dataset_version
+from app.core.group_commit import write_row
+from app.core.bank_codes import BANK_CODE_LENGTH, BankCode, get_bank_codes
+from app.services.change_service import ChangeService
+from app.utils.bulk import IN_CHUNK_SIZE, RowOutcome, chunked
+from app.utils.ifsc import prefix_range
 
 class BankService:
     @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
     async def get_all_banks(db: AsyncSession) -> List[Bank]:
         """Get all banks with branch count"""
         result = await db.execute(
@@ -19,6 +34,10 @@ class BankService:
         return result.all()
     
     @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
     async def get_bank_by_id(db: AsyncSession, bank_id: int) -> Optional[Bank]:
         """Get bank by ID with branches"""
         result = await db.execute(
@@ -29,16 +48,100 @@ class BankService:
         return result.scalar_one_or_none()
     
     @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
+    async def get_bank_by_code(db: AsyncSession, code: str) -> Optional[BankCode]:
+        """Resolve a 4-character IFSC bank code to its bank and branch count"""
+        code = code.upper()
+        if len(code) != BANK_CODE_LENGTH:
+            return None
+        codes = get_bank_codes()
+        if codes is not None:
+            return codes.get(code)
+        
+        # No current map: count the code's branches with a range seek on the key
+        low, high = prefix_range(code)
+        row = (await db.execute(
+            select(Branch.bank_id, Bank.name, func.count())
+            .join(Bank, Branch.bank_id == Bank.id)
+            .where(Branch.ifsc >= low, Branch.ifsc < high)
+            .group_by(Branch.bank_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )).first()
+        if row is None:
+            return None
+        return BankCode(code, *row)
+    
+    @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
     async def get_bank_count(db: AsyncSession) -> int:
         """Get total number of banks"""
         result = await db.execute(select(func.count(Bank.id)))
         return result.scalar()
     
     @staticmethod
-    async def create_bank(db: AsyncSession, bank: BankCreate) -> Bank:
-        """Create a new bank"""
-        db_bank = Bank(id=bank.id, name=bank.name)
-        db.add(db_bank)
+    @releases_connection
+    @track_operation
+    async def create_bank(db: AsyncSession, bank: BankCreate, group_commit: Optional[bool] = None) -> Bank:
+        """Create a new bank (group-committed with concurrent writes unless ``group_commit`` is False)"""
+        def add_bank(session: AsyncSession) -> Bank:
+            db_bank = Bank(id=bank.id, name=bank.name)
+            session.add(db_bank)
+            return db_bank
+        return await write_row(db, add_bank, group_commit)
+    
+    @staticmethod
+    @releases_connection
+    @track_operation
+    async def bulk_upsert_banks(db: AsyncSession, banks: Sequence[BankCreate]) -> List[RowOutcome]:
+        """Insert or update many banks in one transaction
+        
+        Returns a (status, detail) outcome per input row; repeated ids after
+        the first are rejected. New banks are inserted first, which takes the
+        write lock, so the insert's report of the rows it wrote and the names
+        read afterwards are a consistent pre-image of the updates. Renaming a
+        bank logs an update of each of its branches in the change log.
+        """
+        outcomes: List[Optional[RowOutcome]] = []
+        rows = {}
+        # Position of each accepted row; its outcome is known once it is written
+        accepted: Dict[int, int] = {}
+        for bank in banks:
+            if bank.id in rows:
+                outcomes.append(("error", "Duplicate bank id in request"))
+                continue
+            rows[bank.id] = {"id": bank.id, "name": bank.name}
+            accepted[len(outcomes)] = bank.id
+            outcomes.append(None)
+        
+        if not rows:
+            return outcomes
+        inserted = set((await db.execute(
+            insert(Bank).on_conflict_do_nothing(index_elements=[Bank.id]).returning(Bank.id),
+            list(rows.values())
+        )).scalars())
+        existing = {}
+        for chunk in chunked([bank_id for bank_id in rows if bank_id not in inserted], IN_CHUNK_SIZE):
+            existing.update((await db.execute(select(Bank.id, Bank.name).where(Bank.id.in_(chunk)))).all())
+        if existing:
+            statement = insert(Bank)
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[Bank.id], set_={"name": statement.excluded.name}
+                ),
+                [rows[bank_id] for bank_id in existing]
+            )
+        # Renames change bank_name on every branch of the bank
+        renamed = [bank_id for bank_id, name in existing.items() if name != rows[bank_id]["name"]]
+        await ChangeService.record_bank_branches(db, renamed)
         await db.commit()
-        await db.refresh(db_bank)
-        return db_bank
+        bump_dataset_version()
+        for position, bank_id in accepted.items():
+            outcomes[position] = ("inserted" if bank_id in inserted else "updated", None)
+        return outcomes
@@ -1,27 +1,105 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
-from typing import List, Optional, Tuple
+from sqlalchemy.dialects.sqlite import insert
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from app.models.branch import Branch
 from app.models.bank import Bank
 from app.schemas.branch import BranchCreate
+from app.core.query_log import track_operation
+from app.core.session import releases_connection
+from app.core.singleflight import coalesce
+from app.core.result_cache import cached
+from app.core.dataset import bump_dataset_version
+from app.core.group_commit import write_row
+from app.core.snapshot import get_snapshot
+from app.core.columnar import get_columnar_index
+from app.core.bank_registry import find_bank_ids, get_bank_names
+from app.services.change_service import ChangeService, INSERT, UPDATE
+from app.utils.bulk import RowOutcome, existing_keys
+from app.utils.ifsc import is_valid_ifsc, prefix_range
+from app.utils.pincode import extract_pincode
+
+# Fields that can be requested as a sparse fieldset; bank_name comes from the bank registry
+BRANCH_FIELDS = ("ifsc", "bank_id", "bank_name", "branch", "address", "city", "district", "state")
+
+def _columns(fields: Sequence[str]) -> list:
+    """SELECT list for a sparse fieldset; bank_name is selected as the bank id"""
+    return [Branch.bank_id if field == 'bank_name' else getattr(Branch, field) for field in fields]
+
+def _rows(rows, fields: Sequence[str], bank_names: Dict[int, str]) -> List[Tuple[Any, ...]]:
+    """Sparse-fieldset rows with bank ids in the bank_name position replaced by names"""
+    if 'bank_name' not in fields:
+        return [tuple(row) for row in rows]
+    position = list(fields).index('bank_name')
+    return [
+        tuple(bank_names.get(value) if i == position else value for i, value in enumerate(row))
+        for row in rows
+    ]
+
+def _named(branches: List[Branch], bank_names: Dict[int, str]) -> List[Branch]:
+    """Attach bank names to branches read from the branches table alone"""
+    for branch in branches:
+        branch.bank_name = bank_names.get(branch.bank_id)
+    return branches
+
+# Sort orders for branch listings. Each is the key of a composite index on
+# branches, alone and after bank_id (see Branch), ending in the primary key
+# so that pages are stable. Scans (optionally within a bank) read the rows in
+# that order without a sort step; seeks on another index (``pincode=``, or
+# ``ifsc_prefix=`` with a sort other than ifsc) sort their few matches in a
+# temporary B-tree instead.
+BRANCH_SORTS = {
+    "ifsc": (Branch.ifsc,),
+    "branch": (Branch.branch, Branch.ifsc),
+    "city": (Branch.city, Branch.ifsc),
+    "state": (Branch.state, Branch.district, Branch.city, Branch.ifsc),
+}
+
+def _order_by(sort: str, order: str) -> list:
+    """ORDER BY clause for a sort order, all ascending or all descending"""
+    return [column.desc() if order == "desc" else column for column in BRANCH_SORTS[sort]]
+
+def _project(branches: List[Branch], fields: Sequence[str]) -> List[Tuple[Any, ...]]:
+    """Trim already-materialized branches to a sparse fieldset"""
+    return [tuple(getattr(branch, field) for field in fields) for branch in branches]
 
 class BranchService:
     @staticmethod
-    async def get_branch_by_ifsc(db: AsyncSession, ifsc: str) -> Optional[Branch]:
-        """Get branch by IFSC code with bank details"""
-        result = await db.execute(
-            select(Branch, Bank.name.label('bank_name'))
-            .join(Bank, Branch.bank_id == Bank.id)
-            .where(Branch.ifsc == ifsc.upper())
-        )
-        row = result.first()
-        if row:
-            branch = row[0]
-            branch.bank_name = row[1]
-            return branch
-        return None
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
+    async def get_branch_by_ifsc(
+        db: AsyncSession,
+        ifsc: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> Union[Branch, Tuple[Any, ...], None]:
+        """Get branch by IFSC code with bank details
+        
+        With ``fields`` only those columns are selected and a tuple is returned.
+        """
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            branch = snapshot.get_branch(ifsc)
+            if branch is None or not fields:
+                return branch
+            return _project([branch], fields)[0]
+        
+        bank_names = await get_bank_names(db)
+        if fields:
+            row = (await db.execute(select(*_columns(fields)).where(Branch.ifsc == ifsc.upper()))).first()
+            return _rows([row], fields, bank_names)[0] if row else None
+        
+        branch = (await db.execute(select(Branch).where(Branch.ifsc == ifsc.upper()))).scalar()
+        if branch is None:
+            return None
+        return _named([branch], bank_names)[0]
     
     @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
     async def search_branches(
         db: AsyncSession,
         query: Optional[str] = None,
@@ -30,24 +108,56 @@ class BranchService:
         district: Optional[str] = None,
         bank_id: Optional[int] = None,
         skip: int = 0,
-        limit: int = 100
-    ) -> Tuple[List[Branch], int]:
-        """Search branches with multiple filters"""
-        base_query = select(Branch, Bank.name.label('bank_name')).join(Bank, Branch.bank_id == Bank.id)
-        count_query = select(func.count(Branch.ifsc)).join(Bank, Branch.bank_id == Bank.id)
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+        pincode: Optional[str] = None,
+        ifsc_prefix: Optional[str] = None,
+        sort: str = "ifsc",
+        order: str = "asc"
+    ) -> Tuple[List[Any], int]:
+        """Search branches with multiple filters
+        
+        With ``fields`` only those columns are selected and each item is a
+        tuple ordered like ``fields`` instead of a Branch. ``pincode`` is an
+        exact match served by the pincode index; ``ifsc_prefix`` is a range
+        seek on the primary key. Results are ordered by ``sort`` (a key of
+        ``BRANCH_SORTS``) in ``order``.
+        """
+        # The columnar index and the snapshot are in IFSC order and filter
+        # neither PIN codes nor prefixes
+        in_ifsc_order = sort == "ifsc" and order == "asc"
+        columnar = get_columnar_index()
+        if columnar is not None and in_ifsc_order and not (query or pincode or ifsc_prefix):
+            branches, total = columnar.search(
+                city=city, state=state, district=district, bank_id=bank_id, skip=skip, limit=limit
+            )
+            return (_project(branches, fields) if fields else branches), total
+        
+        snapshot = get_snapshot()
+        if snapshot is not None and in_ifsc_order and not (query or city or district or pincode or ifsc_prefix):
+            branches, total = snapshot.search_branches(
+                bank_id=bank_id or None, state=state or None, skip=skip, limit=limit
+            )
+            return (_project(branches, fields) if fields else branches), total
+        
+        bank_names = await get_bank_names(db)
+        base_query = select(*_columns(fields)) if fields else select(Branch)
+        count_query = select(func.count(Branch.ifsc))
         
         filters = []
         
         if query:
             search_filter = f"%{query}%"
-            filters.append(
-                or_(
-                    Branch.ifsc.ilike(search_filter),
-                    Branch.branch.ilike(search_filter),
-                    Branch.address.ilike(search_filter),
-                    Bank.name.ilike(search_filter)
-                )
-            )
+            matches = [
+                Branch.ifsc.ilike(search_filter),
+                Branch.branch.ilike(search_filter),
+                Branch.address.ilike(search_filter)
+            ]
+            # Bank names are matched in the registry, not by joining banks
+            bank_ids = await find_bank_ids(db, query)
+            if bank_ids:
+                matches.append(Branch.bank_id.in_(bank_ids))
+            filters.append(or_(*matches))
         
         if city:
             filters.append(Branch.city.ilike(f"%{city}%"))
@@ -61,6 +171,13 @@ class BranchService:
         if bank_id:
             filters.append(Branch.bank_id == bank_id)
         
+        if pincode:
+            filters.append(Branch.pincode == pincode)
+        
+        if ifsc_prefix:
+            low, high = prefix_range(ifsc_prefix)
+            filters.extend((Branch.ifsc >= low, Branch.ifsc < high))
+        
         if filters:
             base_query = base_query.where(*filters)
             count_query = count_query.where(*filters)
@@ -70,58 +187,133 @@ class BranchService:
         total = count_result.scalar()
         
         # Get branches
-        result = await db.execute(base_query.offset(skip).limit(limit))
-        
-        branches = []
-        for row in result.all():
-            branch = row[0]
-            branch.bank_name = row[1]
-            branches.append(branch)
-        
-        return branches, total
+        result = await db.execute(base_query.order_by(*_order_by(sort, order)).offset(skip).limit(limit))
+        if fields:
+            return _rows(result.all(), fields, bank_names), total
+        return _named(list(result.scalars().all()), bank_names), total
     
     @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
     async def get_branches_by_bank_id(
         db: AsyncSession, 
         bank_id: int, 
         skip: int = 0, 
-        limit: int = 100
-    ) -> Tuple[List[Branch], int]:
-        """Get branches by bank ID with pagination"""
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None,
+        sort: str = "ifsc",
+        order: str = "asc"
+    ) -> Tuple[List[Any], int]:
+        """Get branches by bank ID with pagination
+        
+        With ``fields`` only those columns are selected and each item is a
+        tuple ordered like ``fields`` instead of a Branch. Results are
+        ordered by ``sort`` (a key of ``BRANCH_SORTS``) in ``order``.
+        """
+        snapshot = get_snapshot()
+        if snapshot is not None and sort == "ifsc" and order == "asc":
+            branches, total = snapshot.search_branches(bank_id=bank_id, skip=skip, limit=limit)
+            return (_project(branches, fields) if fields else branches), total
+        
         # Get total count
         count_result = await db.execute(
             select(func.count(Branch.ifsc)).where(Branch.bank_id == bank_id)
         )
         total = count_result.scalar()
         
-        # Get branches with bank name
+        bank_names = await get_bank_names(db)
+        base_query = select(*_columns(fields)) if fields else select(Branch)
         result = await db.execute(
-            select(Branch, Bank.name.label('bank_name'))
-            .join(Bank, Branch.bank_id == Bank.id)
+            base_query
             .where(Branch.bank_id == bank_id)
+            .order_by(*_order_by(sort, order))
             .offset(skip)
             .limit(limit)
         )
-        
-        branches = []
-        for row in result.all():
-            branch = row[0]
-            branch.bank_name = row[1]
-            branches.append(branch)
-        
-        return branches, total
+        if fields:
+            return _rows(result.all(), fields, bank_names), total
+        return _named(list(result.scalars().all()), bank_names), total
     
     @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
     async def get_branch_count(db: AsyncSession) -> int:
         """Get total number of branches"""
         result = await db.execute(select(func.count(Branch.ifsc)))
         return result.scalar()
     
     @staticmethod
-    async def create_branch(db: AsyncSession, branch: BranchCreate) -> Branch:
-        """Create a new branch"""
-        db_branch = Branch(**branch.dict())
-        db.add(db_branch)
+    @releases_connection
+    @track_operation
+    async def create_branch(db: AsyncSession, branch: BranchCreate, group_commit: Optional[bool] = None) -> Branch:
+        """Create a new branch (group-committed with concurrent writes unless ``group_commit`` is False)"""
+        def add_branch(session: AsyncSession) -> Branch:
+            db_branch = Branch(**branch.model_dump(), pincode=extract_pincode(branch.address))
+            session.add(db_branch)
+            ChangeService.record(session, db_branch.ifsc, INSERT)
+            return db_branch
+        return await write_row(db, add_branch, group_commit)
+    
+    @staticmethod
+    @releases_connection
+    @track_operation
+    async def bulk_upsert_branches(db: AsyncSession, branches: Sequence[BranchCreate]) -> List[RowOutcome]:
+        """Insert or update many branches in one transaction
+        
+        IFSC codes are upper-cased. Returns a (status, detail) outcome per
+        input row; malformed codes, unknown banks and repeated codes after
+        the first are rejected. Whether a row was inserted or updated comes
+        from the writes themselves: new rows are inserted first, which takes
+        the write lock, and the insert reports which ones it wrote.
+        """
+        known_banks = await existing_keys(db, Bank.id, {branch.bank_id for branch in branches})
+        outcomes: List[Optional[RowOutcome]] = []
+        rows = {}
+        # Position of each accepted row; its outcome is known once it is written
+        accepted: Dict[int, str] = {}
+        for branch in branches:
+            ifsc = branch.ifsc.upper()
+            if not is_valid_ifsc(ifsc):
+                outcomes.append(("error", "Invalid IFSC format"))
+            elif branch.bank_id not in known_banks:
+                outcomes.append(("error", "Bank not found"))
+            elif ifsc in rows:
+                outcomes.append(("error", "Duplicate IFSC in request"))
+            else:
+                rows[ifsc] = {
+                    **branch.model_dump(), "ifsc": ifsc, "pincode": extract_pincode(branch.address)
+                }
+                accepted[len(outcomes)] = ifsc
+                outcomes.append(None)
+        
+        if not rows:
+            return outcomes
+        inserted = set((await db.execute(
+            insert(Branch).on_conflict_do_nothing(index_elements=[Branch.ifsc]).returning(Branch.ifsc),
+            list(rows.values())
+        )).scalars())
+        updated = [row for ifsc, row in rows.items() if ifsc not in inserted]
+        if updated:
+            statement = insert(Branch)
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[Branch.ifsc],
+                    set_={
+                        column: statement.excluded[column]
+                        for column in ("bank_id", "branch", "address", "city", "district", "state", "pincode")
+                    }
+                ),
+                updated
+            )
+        await ChangeService.record_many(
+            db, [(ifsc, INSERT if ifsc in inserted else UPDATE) for ifsc in rows]
+        )
         await db.commit()
-        await db.refresh(db_branch)
-        return db_branch
+        bump_dataset_version()
+        for position, ifsc in accepted.items():
+            outcomes[position] = ("inserted" if ifsc in inserted else "updated", None)
+        return outcomes
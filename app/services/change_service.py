@@ -0,0 +1,128 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, literal
+from sqlalchemy.dialects.sqlite import insert
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.models.branch import Branch
+from app.models.change import FLOOR_KEY, BranchChange, ChangeLogMeta
+from app.schemas.change import ChangeFeed
+from app.core.query_log import track_operation
+from app.core.session import releases_connection
+from app.core.singleflight import coalesce
+from app.core.result_cache import cached
+from app.core.bank_registry import get_bank_names
+from app.core.change_log import change_log_floor, change_log_version
+from app.utils.bulk import IN_CHUNK_SIZE, chunked
+
+INSERT, UPDATE, DELETE = "insert", "update", "delete"
+
+class ChangeService:
+    """Branch change log: what changed, in order, since a given version
+    
+    Writers record changes in the same transaction as the rows they touch;
+    readers ask for everything after the version they last synced to.
+    """
+    
+    @staticmethod
+    def record(db: AsyncSession, ifsc: str, op: str) -> None:
+        """Add one change to ``db``'s pending transaction"""
+        db.add(BranchChange(ifsc=ifsc, op=op))
+    
+    @staticmethod
+    async def record_many(db: AsyncSession, changes: Sequence[Tuple[str, str]]) -> None:
+        """Append (ifsc, op) changes with one executemany, without committing"""
+        if changes:
+            await db.execute(insert(BranchChange), [{"ifsc": ifsc, "op": op} for ifsc, op in changes])
+    
+    @staticmethod
+    async def record_bank_branches(db: AsyncSession, bank_ids: Sequence[int]) -> None:
+        """Record an update of every branch of ``bank_ids`` (e.g. after a rename)"""
+        for chunk in chunked(list(bank_ids), IN_CHUNK_SIZE):
+            await db.execute(
+                insert(BranchChange).from_select(
+                    ["ifsc", "op"],
+                    select(Branch.ifsc, literal(UPDATE)).where(Branch.bank_id.in_(chunk))
+                )
+            )
+    
+    @staticmethod
+    async def get_floor(db: AsyncSession) -> int:
+        """Oldest version a delta can start from; older clients must resync"""
+        return await change_log_floor(db)
+    
+    @staticmethod
+    async def set_floor(db: AsyncSession, version: int) -> None:
+        statement = insert(ChangeLogMeta).values(key=FLOOR_KEY, value=version)
+        await db.execute(
+            statement.on_conflict_do_update(index_elements=[ChangeLogMeta.key], set_={"value": version})
+        )
+    
+    @staticmethod
+    async def get_version(db: AsyncSession) -> int:
+        """Latest change log version"""
+        return await change_log_version(db)
+    
+    @staticmethod
+    @cached
+    @coalesce
+    @releases_connection
+    @track_operation
+    async def get_changes(db: AsyncSession, since: int, limit: int = 1000) -> ChangeFeed:
+        """Compact delta of up to ``limit`` log entries after ``since``
+        
+        Each IFSC appears once, with the current branch if it still exists
+        or in ``deleted`` if not.
+        """
+        floor = await ChangeService.get_floor(db)
+        latest = await ChangeService.get_version(db)
+        if since < floor or since > latest:
+            return ChangeFeed(since=since, version=latest, resync=True)
+        
+        result = await db.execute(
+            select(BranchChange.version, BranchChange.ifsc, BranchChange.op)
+            .where(BranchChange.version > since)
+            .order_by(BranchChange.version)
+            .limit(limit + 1)
+        )
+        entries = result.all()
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        
+        last_op: Dict[str, str] = {}
+        for _, ifsc, op in entries:
+            last_op[ifsc] = op
+        
+        current: Dict[str, Branch] = {}
+        changed = [ifsc for ifsc, op in last_op.items() if op != DELETE]
+        bank_names = await get_bank_names(db)
+        for chunk in chunked(changed, IN_CHUNK_SIZE):
+            rows = await db.execute(select(Branch).where(Branch.ifsc.in_(chunk)))
+            for branch in rows.scalars():
+                branch.bank_name = bank_names.get(branch.bank_id)
+                current[branch.ifsc] = branch
+        
+        return ChangeFeed(
+            since=since,
+            version=entries[-1].version if entries else since,
+            has_more=has_more,
+            upserted=[current[ifsc] for ifsc in changed if ifsc in current],
+            deleted=[ifsc for ifsc in last_op if ifsc not in current],
+        )
+    
+    @staticmethod
+    @releases_connection
+    @track_operation
+    async def compact(db: AsyncSession, keep: int) -> Optional[int]:
+        """Drop all but the newest ``keep`` entries and raise the floor to match
+        
+        Returns the new floor, or None if nothing was dropped.
+        """
+        result = await db.execute(
+            select(BranchChange.version).order_by(BranchChange.version.desc()).offset(keep).limit(1)
+        )
+        cutoff = result.scalar()
+        if cutoff is None:
+            return None
+        await db.execute(delete(BranchChange).where(BranchChange.version <= cutoff))
+        await ChangeService.set_floor(db, cutoff)
+        await db.commit()
+        return cutoff
@@ -0,0 +1,40 @@
+import hashlib
+import math
+from typing import Iterable
+
+class BloomFilter:
+    """Bloom filter over strings: no false negatives, tunable false positives"""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate must be between 0 and 1")
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.fp_rate = fp_rate
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[str], capacity: int, fp_rate: float = 0.01) -> "BloomFilter":
+        bloom = cls(capacity, fp_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
@@ -0,0 +1,159 @@
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.bulk import BulkResponse, BulkRowResult
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+# Bound parameters per statement stay below SQLite's historical limit of 999
+IN_CHUNK_SIZE = 500
+
+# (status, detail) for each row handed to a bulk upsert, in order
+RowOutcome = Tuple[str, Optional[str]]
+
+_INVALID_JSON = object()
+
+class RowLimitExceeded(Exception):
+    """An NDJSON stream went past the row limit after some chunks were written"""
+
+    def __init__(self, max_rows: int):
+        super().__init__(f"At most {max_rows} records per request")
+        self.max_rows = max_rows
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+async def existing_keys(db: AsyncSession, column, keys: Sequence[Any]) -> set:
+    """The subset of ``keys`` already present in ``column``"""
+    found = set()
+    for chunk in chunked(list(keys), IN_CHUNK_SIZE):
+        found.update((await db.execute(select(column).where(column.in_(chunk)))).scalars())
+    return found
+
+async def read_record_chunks(request: Request, max_rows: int, chunk_rows: int) -> AsyncIterator[List[Any]]:
+    """Decode a JSON array or an NDJSON stream into chunks of records
+
+    A JSON array is one chunk. NDJSON is decoded as it arrives and handed
+    out every ``chunk_rows`` records, so only one chunk is held at a time.
+    Undecodable NDJSON lines are kept as placeholders so they get a per-row
+    error instead of failing the whole request.
+
+    Too many records fail with 413 while nothing has been handed out yet.
+    Past that point the records read so far are handed out and
+    ``RowLimitExceeded`` is raised, so the caller can report what it wrote.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if content_type in NDJSON_TYPES:
+        records: List[Any] = []
+        count = 0
+        handed_out = False
+        buffer = b""
+        try:
+            async for chunk in request.stream():
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    count += _append_line(records, line, count, max_rows)
+                    if len(records) >= chunk_rows:
+                        handed_out = True
+                        yield records
+                        records = []
+            count += _append_line(records, buffer, count, max_rows)
+        except RowLimitExceeded:
+            if not handed_out:
+                raise HTTPException(status_code=413, detail=f"At most {max_rows} records per request")
+            if records:
+                yield records
+            raise
+        if records:
+            yield records
+    elif content_type == "application/json":
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of records")
+        if len(records) > max_rows:
+            raise HTTPException(status_code=413, detail=f"At most {max_rows} records per request")
+        yield records
+    else:
+        raise HTTPException(status_code=415, detail="Send application/json or application/x-ndjson")
+
+def _append_line(records: List[Any], line: bytes, count: int, max_rows: int) -> int:
+    """Decode one NDJSON line into ``records``; return how many records it added"""
+    line = line.strip()
+    if not line:
+        return 0
+    if count >= max_rows:
+        raise RowLimitExceeded(max_rows)
+    try:
+        records.append(json.loads(line))
+    except ValueError:
+        records.append(_INVALID_JSON)
+    return 1
+
+async def run_bulk(
+    chunks: AsyncIterator[List[Any]],
+    model: Type[BaseModel],
+    key: Callable[[BaseModel], Any],
+    upsert: Callable[[List[BaseModel]], Awaitable[List[RowOutcome]]]
+) -> BulkResponse:
+    """Validate every record, upsert the valid ones and report per-row outcomes
+
+    Each chunk is validated and upserted (in its own transaction) before the
+    next one is read. A stream cut off at the row limit keeps the chunks
+    already written: their outcomes are returned, followed by an error for
+    the first record that was not read.
+    """
+    results: List[BulkRowResult] = []
+    try:
+        async for records in chunks:
+            results.extend(await _run_chunk(records, len(results), model, key, upsert))
+    except RowLimitExceeded as e:
+        results.append(BulkRowResult(
+            index=len(results), status="error", detail=f"{e}; this and later records were not read"
+        ))
+
+    statuses = [result.status for result in results]
+    return BulkResponse(
+        inserted=statuses.count("inserted"),
+        updated=statuses.count("updated"),
+        errors=statuses.count("error"),
+        results=results,
+    )
+
+async def _run_chunk(
+    records: List[Any],
+    offset: int,
+    model: Type[BaseModel],
+    key: Callable[[BaseModel], Any],
+    upsert: Callable[[List[BaseModel]], Awaitable[List[RowOutcome]]]
+) -> List[BulkRowResult]:
+    """Validate and upsert one chunk whose first record is number ``offset``"""
+    chunk_results: List[Optional[BulkRowResult]] = [None] * len(records)
+    valid: List[Tuple[int, BaseModel]] = []
+    for position, record in enumerate(records):
+        index = offset + position
+        if record is _INVALID_JSON:
+            chunk_results[position] = BulkRowResult(index=index, status="error", detail="Invalid JSON")
+            continue
+        try:
+            valid.append((position, model.model_validate(record)))
+        except ValidationError as e:
+            chunk_results[position] = BulkRowResult(
+                index=index, status="error", detail=json.loads(e.json(include_url=False))
+            )
+
+    outcomes = await upsert([row for _, row in valid]) if valid else []
+    for (position, row), (status, detail) in zip(valid, outcomes):
+        chunk_results[position] = BulkRowResult(
+            index=offset + position, key=key(row), status=status, detail=detail
+        )
+    return chunk_results
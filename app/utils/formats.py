@@ -0,0 +1,108 @@
+"""Binary encodings of paginated listings for analytics clients
+
+Clients that load pages into dataframes can ask for MessagePack or an
+Arrow IPC stream through ``Accept`` instead of re-parsing JSON. Pages are
+encoded from sparse-fieldset rows (tuples in ``fields`` order). The Arrow
+stream is built column by column from those rows, with no per-row dicts,
+and carries the pagination values as schema metadata. Each format is only
+offered while its library (``msgpack``, ``pyarrow``) is installed; anything
+else is answered with JSON.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from fastapi import Response
+
+from app.core import metrics
+from app.core.compression import negotiate_encoding
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+MSGPACK_TYPE = "application/msgpack"
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def available_formats() -> List[str]:
+    """Binary media types whose encoder is installed"""
+    available = []
+    if msgpack is not None:
+        available.append(MSGPACK_TYPE)
+    if pa is not None:
+        available.append(ARROW_STREAM_TYPE)
+    return available
+
+
+def negotiate_format(accept: str) -> Optional[str]:
+    """The binary media type preferred by ``accept``, or None for JSON
+
+    JSON wins ties and wildcards, so browsers and ``*/*`` clients are
+    unaffected.
+    """
+    best = negotiate_encoding(accept, ["application/json", *available_formats()])
+    return None if best == "application/json" else best
+
+
+def _pagination(total: int, skip: int, limit: int) -> Dict[str, int]:
+    return {
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "has_next": skip + limit < total,
+        "has_prev": skip > 0,
+    }
+
+
+def _msgpack_page(rows: Sequence[tuple], fields: Sequence[str], pagination: Dict[str, int]) -> bytes:
+    return msgpack.packb({"items": [dict(zip(fields, row)) for row in rows], **pagination})
+
+
+def _arrow_page(
+    rows: Sequence[tuple],
+    fields: Sequence[str],
+    pagination: Dict[str, int],
+    arrow_types: Dict[str, str]
+) -> bytes:
+    schema = pa.schema(
+        [pa.field(field, pa.type_for_alias(arrow_types.get(field, "string"))) for field in fields],
+        metadata={key: str(int(value)) for key, value in pagination.items()},
+    )
+    columns = list(zip(*rows)) if rows else [()] * len(fields)
+    batch = pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def binary_page(
+    rows: Sequence[tuple],
+    fields: Sequence[str],
+    total: int,
+    skip: int,
+    limit: int,
+    media_type: str,
+    arrow_types: Optional[Dict[str, str]] = None
+) -> Response:
+    """Encode a page of rows as ``media_type``
+
+    ``arrow_types`` maps fields to Arrow type names (``"int64"``); other
+    fields are strings.
+    """
+    pagination = _pagination(total, skip, limit)
+    if media_type == ARROW_STREAM_TYPE:
+        metrics.increment("responses.arrow")
+        body = _arrow_page(rows, fields, pagination, arrow_types or {})
+    else:
+        metrics.increment("responses.msgpack")
+        body = _msgpack_page(rows, fields, pagination)
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
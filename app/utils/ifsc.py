@@ -0,0 +1,21 @@
+import re
+from typing import Tuple
+
+# 4-letter bank code, a literal '0', then a 6-character branch code
+IFSC_PATTERN = re.compile(r"^[A-Z]{4}0[A-Z0-9]{6}$")
+
+def is_valid_ifsc(ifsc: str) -> bool:
+    """Check the IFSC format (case-insensitive)"""
+    return bool(IFSC_PATTERN.match(ifsc.upper()))
+
+# Leading characters of an IFSC, e.g. a bank code such as "HDFC"
+IFSC_PREFIX_PATTERN = r"^[A-Za-z0-9]{1,11}$"
+
+def prefix_range(prefix: str) -> Tuple[str, str]:
+    """Half-open ``[low, high)`` range of the IFSC codes starting with ``prefix``
+    
+    ``HDFC`` gives ``("HDFC", "HDFD")``, which an index on ``ifsc`` answers
+    with a range seek where ``LIKE 'HDFC%'`` would scan.
+    """
+    low = prefix.upper()
+    return low, low[:-1] + chr(ord(low[-1]) + 1)
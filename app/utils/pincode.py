@@ -0,0 +1,16 @@
+import re
+from typing import Optional
+
+# Six digits, optionally written "560 034"; the first digit is never 0
+_PINCODE = re.compile(r"(?<!\d)([1-9]\d{2})\s?(\d{3})(?!\d)")
+
+PINCODE_PATTERN = r"^[1-9][0-9]{5}$"
+
+def extract_pincode(address: Optional[str]) -> Optional[str]:
+    """The PIN code an address ends with (the last one it contains), if any"""
+    if not address:
+        return None
+    matches = _PINCODE.findall(address)
+    if not matches:
+        return None
+    return "".join(matches[-1])
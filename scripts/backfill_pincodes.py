@@ -0,0 +1,38 @@
+"""Add and fill the branches.pincode column in a database loaded before it existed
+
+Safe to re-run: only rows without a PIN code are touched. Reloading with
+scripts/load_data.py fills the column as well.
+
+    python scripts/backfill_pincodes.py
+"""
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.core.database import create_database_engine, create_session_factory
+from app.core.schema import backfill_pincodes, upgrade_schema
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+async def main():
+    engine = create_database_engine(settings.database_url)
+    try:
+        async with engine.begin() as conn:
+            await upgrade_schema(conn)
+        async with create_session_factory(engine)() as db:
+            updated = await backfill_pincodes(db)
+        logger.info(f"Filled in {updated} PIN codes")
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
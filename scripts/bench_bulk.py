@@ -0,0 +1,83 @@
+"""Benchmark bulk branch upserts against one-row-at-a-time inserts
+
+Runs against a throwaway SQLite file and prints rows/sec for
+``BranchService.create_branch`` (concurrent writers, with and without group
+commit) and ``BranchService.bulk_upsert_branches`` (fresh inserts, then
+updates of the same rows).
+
+    python scripts/bench_bulk.py --rows 20000 --single-rows 1000 --writers 50
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.models.bank import Bank
+from app.schemas.branch import BranchCreate
+from app.services.branch_service import BranchService
+
+def _branches(count: int, start: int = 0, city: str = "MUMBAI"):
+    return [
+        BranchCreate(
+            ifsc=f"BENC0{i:06d}", bank_id=1, branch=f"BRANCH {i}",
+            address=f"{i} MAIN ROAD", city=city, district=city, state="MAHARASHTRA"
+        )
+        for i in range(start, start + count)
+    ]
+
+def _report(label: str, rows: int, seconds: float) -> None:
+    print(f"{label:<36} {rows:>8} rows  {seconds:8.3f}s  {rows / seconds:>10.0f} rows/sec")
+
+async def _create_concurrently(sessions, branches, writers: int, grouped: bool) -> None:
+    queue = list(branches)
+
+    async def writer():
+        while queue:
+            branch = queue.pop()
+            async with sessions() as db:
+                await BranchService.create_branch(db, branch, group_commit=grouped)
+
+    await asyncio.gather(*(writer() for _ in range(writers)))
+
+async def main(rows: int, single_rows: int, writers: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add(Bank(id=1, name="BENCH BANK"))
+            await db.commit()
+
+        for label, grouped, start in (
+            ("create_branch", False, 800000),
+            ("create_branch, group commit", True, 900000),
+        ):
+            started = time.perf_counter()
+            await _create_concurrently(sessions, _branches(single_rows, start=start), writers, grouped)
+            _report(f"{label} (x{writers})", single_rows, time.perf_counter() - started)
+
+        for label, city in (("bulk upsert (insert)", "MUMBAI"), ("bulk upsert (update)", "PUNE")):
+            batch = _branches(rows, city=city)
+            async with sessions() as db:
+                started = time.perf_counter()
+                await BranchService.bulk_upsert_branches(db, batch)
+                _report(label, rows, time.perf_counter() - started)
+
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--single-rows", type=int, default=1000)
+    parser.add_argument("--writers", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.single_rows, args.writers))
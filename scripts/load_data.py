@@ -1,5 +1,6 @@
 import asyncio
 import re
+import sqlite3
 import sys
 import os
 from pathlib import Path
@@ -8,11 +9,18 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.core.database import engine, AsyncSessionLocal
+from sqlalchemy import select, func, text
+from sqlalchemy.engine import make_url
+from app.core.database import create_database_engine, create_session_factory, sqlite_file
 from app.models.bank import Bank
 from app.models.branch import Branch
+from app.models.change import FLOOR_KEY, BranchChange, ChangeLogMeta
 from app.core.database import Base
+from app.core.config import settings
+from app.core.snapshot import build_snapshot
+from app.services.change_service import ChangeService, INSERT, UPDATE, DELETE
+from app.utils.pincode import extract_pincode
+from app.core.schema import analyze, create_indexes, drop_indexes, missing_indexes
 import logging
 
 # Configure logging
@@ -22,18 +30,104 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def change_counter(path: Path) -> int:
+    """SQLite's file change counter, bumped by every committed write (rollback journal mode)"""
+    with open(path, "rb") as f:
+        f.seek(24)
+        return int.from_bytes(f.read(4), "big")
+
+def max_change_version(conn: sqlite3.Connection) -> int:
+    """Highest change log version a database has handed out (0 without a change log)"""
+    try:
+        sequence = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (BranchChange.__tablename__,)
+        ).fetchone()
+        latest = conn.execute(f"SELECT max(version) FROM {BranchChange.__tablename__}").fetchone()
+    except sqlite3.OperationalError:
+        # No change log (or no AUTOINCREMENT table at all) yet
+        return 0
+    return max(sequence[0] if sequence else 0, latest[0] or 0)
+
 class DataLoader:
     def __init__(self):
         self.sql_file = "indian_bank.sql"
+        self.previous_branches = {}
+        self.banks_loaded = 0
+        self.branches_loaded = 0
+        # A file database is rebuilt next to the live one and renamed over it
+        # once complete, so a running API can switch to it without downtime
+        self.live_file = sqlite_file(settings.database_url)
+        self.staging_file = None
+        # Change counter of the live file when it was copied, None if there was none
+        self.live_counter = None
+        database_url = settings.database_url
+        if self.live_file is not None:
+            self.staging_file = self.live_file.with_name(self.live_file.name + ".next")
+            database_url = make_url(database_url).set(database=str(self.staging_file)).render_as_string(
+                hide_password=False
+            )
+        self.engine = create_database_engine(database_url)
+        self.sessions = create_session_factory(self.engine)
+    
+    def stage_database(self):
+        """Start the staging file from a copy of the live database (keeps the change log)"""
+        if self.staging_file is None:
+            return
+        if Path(f"{self.live_file}-wal").exists():
+            raise RuntimeError(
+                f"{self.live_file} has a write-ahead log; checkpoint it before reloading"
+            )
+        for stale in (self.staging_file, Path(f"{self.staging_file}-journal")):
+            stale.unlink(missing_ok=True)
+        if self.live_file.exists():
+            logger.info(f"Copying {self.live_file} to {self.staging_file}")
+            counter = change_counter(self.live_file)
+            source = sqlite3.connect(self.live_file)
+            target = sqlite3.connect(self.staging_file)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            if change_counter(self.live_file) != counter:
+                raise RuntimeError(f"{self.live_file} was written to while it was copied; run the load again")
+            self.live_counter = counter
     
     async def create_tables(self):
-        """Create all database tables"""
+        """Create all database tables, keeping the change log"""
         logger.info("Creating database tables...")
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.drop_all)  # Drop existing tables
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        # Remember the current directory so the reload can be diffed against it
+        self.previous_branches = await self.read_branch_rows()
+        data_tables = [
+            table for table in Base.metadata.sorted_tables
+            if table not in (BranchChange.__table__, ChangeLogMeta.__table__)
+        ]
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all, tables=data_tables)  # Drop existing tables
             await conn.run_sync(Base.metadata.create_all)  # Create fresh tables
+            # Indexes are built once after the bulk load instead of row by row
+            await drop_indexes(conn, data_tables)
         logger.info("Database tables created successfully")
     
+    async def build_indexes(self):
+        """Create the declared indexes over the loaded data and gather planner statistics"""
+        async with self.engine.begin() as conn:
+            created = await create_indexes(conn)
+            logger.info(f"Created {len(created)} indexes; analyzing...")
+            await analyze(conn, full=True)
+    
+    async def read_branch_rows(self):
+        """Every branch as ifsc -> (bank_id, bank_name, branch, address, city, district, state)"""
+        async with self.sessions() as db:
+            result = await db.execute(
+                select(Branch.ifsc, Branch.bank_id, Bank.name, Branch.branch, Branch.address,
+                       Branch.city, Branch.district, Branch.state)
+                .join(Bank, Branch.bank_id == Bank.id)
+            )
+            return {row[0]: tuple(row[1:]) for row in result.all()}
+    
     async def load_banks_from_sql(self):
         """Load banks from SQL file"""
         logger.info(f"Loading banks from {self.sql_file}")
@@ -42,7 +136,7 @@ class DataLoader:
             logger.error(f"SQL file not found: {self.sql_file}")
             return
         
-        async with AsyncSessionLocal() as db:
+        async with self.sessions() as db:
             try:
                 with open(self.sql_file, 'r', encoding='utf-8') as file:
                     content = file.read()
@@ -72,6 +166,7 @@ class DataLoader:
                                         logger.warning(f"Invalid bank ID in line: {line}")
                         
                         await db.commit()
+                        self.banks_loaded = banks_added
                         logger.info(f"Successfully added {banks_added} banks to database")
                     else:
                         logger.warning("No bank data found in SQL file")
@@ -89,7 +184,7 @@ class DataLoader:
             logger.error(f"SQL file not found: {self.sql_file}")
             return
         
-        async with AsyncSessionLocal() as db:
+        async with self.sessions() as db:
             try:
                 with open(self.sql_file, 'r', encoding='utf-8') as file:
                     content = file.read()
@@ -130,7 +225,8 @@ class DataLoader:
                                                     address=address,
                                                     city=city,
                                                     district=district,
-                                                    state=state
+                                                    state=state,
+                                                    pincode=extract_pincode(address)
                                                 )
                                                 db.add(branch)
                                                 branches_added += 1
@@ -153,6 +249,7 @@ class DataLoader:
                         
                         # Final commit
                         await db.commit()
+                        self.branches_loaded = branches_added
                         logger.info(f"Successfully added {branches_added} branches to database")
                         if branches_skipped > 0:
                             logger.info(f"Skipped {branches_skipped} branches due to errors")
@@ -164,9 +261,132 @@ class DataLoader:
                 await db.rollback()
                 raise
     
+    async def record_changes(self):
+        """Append the difference to the previous load to the change log"""
+        current = await self.read_branch_rows()
+        previous = self.previous_branches
+        async with self.sessions() as db:
+            if not previous:
+                # Nothing to diff against: every client has to start from a full download
+                await ChangeService.set_floor(db, await ChangeService.get_version(db))
+                changes = []
+            else:
+                changes = [(ifsc, DELETE) for ifsc in previous.keys() - current.keys()]
+                for ifsc, row in current.items():
+                    if ifsc not in previous:
+                        changes.append((ifsc, INSERT))
+                    elif previous[ifsc] != row:
+                        changes.append((ifsc, UPDATE))
+                await ChangeService.record_many(db, changes)
+            await db.commit()
+            await ChangeService.compact(db, settings.change_log_retention)
+            version = await ChangeService.get_version(db)
+        logger.info(f"Recorded {len(changes)} branch changes; change log is at version {version}")
+    
+    async def verify(self, min_ratio: float = 0.5):
+        """Refuse to publish a database that is corrupt, incomplete or suspiciously small"""
+        async with self.engine.connect() as conn:
+            integrity = (await conn.execute(text("PRAGMA integrity_check"))).scalars().all()
+            if integrity != ["ok"]:
+                raise RuntimeError(f"Integrity check failed: {integrity[:5]}")
+            orphans = (await conn.execute(text("PRAGMA foreign_key_check"))).all()
+            if orphans:
+                raise RuntimeError(f"{len(orphans)} rows reference missing banks")
+            absent = await missing_indexes(conn)
+            if absent:
+                raise RuntimeError(f"Missing indexes: {', '.join(absent)}")
+        async with self.sessions() as db:
+            bank_count = (await db.execute(select(func.count(Bank.id)))).scalar()
+            branch_count = (await db.execute(select(func.count(Branch.ifsc)))).scalar()
+        if (bank_count, branch_count) != (self.banks_loaded, self.branches_loaded):
+            raise RuntimeError(
+                f"Loaded {self.banks_loaded} banks and {self.branches_loaded} branches "
+                f"but the database holds {bank_count} and {branch_count}"
+            )
+        if branch_count == 0:
+            raise RuntimeError("No branches were loaded")
+        if branch_count < len(self.previous_branches) * min_ratio:
+            raise RuntimeError(
+                f"Only {branch_count} branches loaded, down from {len(self.previous_branches)}"
+            )
+        logger.info(f"Verified {bank_count} banks and {branch_count} branches")
+    
+    def snapshot_target(self):
+        return f"{settings.snapshot_path}.next" if self.staging_file else settings.snapshot_path
+    
+    async def write_snapshot(self):
+        """Write the memory-mapped directory snapshot shared by API workers"""
+        if not settings.snapshot_path:
+            return
+        logger.info(f"Writing directory snapshot to {self.snapshot_target()}")
+        async with self.sessions() as db:
+            count = await build_snapshot(db, self.snapshot_target())
+        logger.info(f"Snapshot written with {count} branches")
+    
+    def reserve_versions(self, live_version: int):
+        """Move the staged change log past every version the live file has handed out
+        
+        Entries the live file logged after the copy are not in the staged
+        one: their versions must not be handed out again, and clients that
+        saw them have to resync from the floor.
+        """
+        staged = sqlite3.connect(self.staging_file)
+        try:
+            if max_change_version(staged) >= live_version:
+                return
+            with staged:
+                staged.execute(
+                    "DELETE FROM sqlite_sequence WHERE name = ?", (BranchChange.__tablename__,)
+                )
+                staged.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)",
+                    (BranchChange.__tablename__, live_version)
+                )
+                staged.execute(
+                    f"INSERT INTO {ChangeLogMeta.__tablename__} (key, value) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = max(value, excluded.value)",
+                    (FLOOR_KEY, live_version)
+                )
+            logger.warning(f"Raised the staged change log to version {live_version}")
+        finally:
+            staged.close()
+    
+    async def publish(self):
+        """Rename the staged snapshot and database over the live ones
+        
+        API writes are held off (``BEGIN IMMEDIATE`` on the live file) from
+        the final check to the rename. If the live file was written to since
+        it was copied, those writes would be lost: the publish fails and the
+        load has to be run again. API writers still on the old file after
+        the rename get a 503 instead of committing (see
+        ``app.core.write_fence``).
+        """
+        await self.engine.dispose()
+        if self.staging_file is None:
+            return
+        live = None
+        if self.live_counter is not None:
+            live = sqlite3.connect(self.live_file, isolation_level=None)
+        try:
+            if live is not None:
+                live.execute("BEGIN IMMEDIATE")
+                if change_counter(self.live_file) != self.live_counter:
+                    raise RuntimeError(
+                        f"{self.live_file} was written to after it was copied; run the load again"
+                    )
+                self.reserve_versions(max_change_version(live))
+            # The snapshot goes first: the API re-reads it when it sees the new database
+            if settings.snapshot_path:
+                os.replace(self.snapshot_target(), settings.snapshot_path)
+            os.replace(self.staging_file, self.live_file)
+        finally:
+            if live is not None:
+                live.close()
+        logger.info(f"Published {self.live_file}; running API servers switch to it shortly")
+    
     async def get_stats(self):
         """Get database statistics"""
-        async with AsyncSessionLocal() as db:
+        async with self.sessions() as db:
             # Count banks
             bank_result = await db.execute(select(Bank))
             bank_count = len(bank_result.scalars().all())
@@ -195,6 +415,9 @@ class DataLoader:
         logger.info("Starting complete data loading process...")
         
         try:
+            # Build next to the live database
+            self.stage_database()
+            
             # Create tables
             await self.create_tables()
             
@@ -204,8 +427,23 @@ class DataLoader:
             # Load branches
             await self.load_branches_from_sql()
             
+            # Index the loaded data
+            await self.build_indexes()
+            
+            # Log what changed since the previous load
+            await self.record_changes()
+            
+            # Check the result before anyone can see it
+            await self.verify()
+            
+            # Write the shared snapshot
+            await self.write_snapshot()
+            
             # Get and display statistics
             stats = await self.get_stats()
+            
+            # Switch the live database over
+            await self.publish()
             logger.info("Data loading completed successfully!")
             logger.info(f"Final statistics: {stats}")
             
@@ -213,6 +451,7 @@ class DataLoader:
             
         except Exception as e:
             logger.error(f"Data loading failed: {e}")
+            await self.engine.dispose()
             raise
 
 async def main():
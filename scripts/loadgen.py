@@ -0,0 +1,310 @@
+"""Open-loop load generator with a weighted mix of realistic requests
+
+Requests arrive as a Poisson process at ``--rate`` per second whether or
+not earlier ones have finished, so an overloaded server shows up as
+growing latency and errors instead of a politely slower client. Each
+arrival draws a request kind from the ``--mix`` weights:
+
+    lookup     GET /api/v1/branches/{ifsc} for a known IFSC
+    miss       the same for a well-formed IFSC that does not exist (404)
+    search     a filtered search (city, state, bank, IFSC prefix)
+    deep_page  an unfiltered page far into the listing, in a random sort
+    stats      GET /stats
+    bank       GET /api/v1/banks/{id}
+
+IFSCs, cities and bank ids are sampled from the target before the run.
+Every ``--interval`` seconds a line with throughput, latency percentiles
+and the error rate is printed, then a summary per request kind.
+
+Latency is measured from each request's scheduled arrival, not from when
+it was sent, so time spent waiting behind a stalled client or event loop
+counts (no coordinated omission). Arrivals dropped at ``--max-in-flight``
+count as errors.
+
+    python scripts/loadgen.py --url http://localhost:8000 --rate 500 --duration 60
+    python scripts/loadgen.py --in-process --rate 200 --mix lookup=80,miss=20
+
+``--in-process`` drives the ASGI app (and its configured database)
+directly, with no server or network in between.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add the parent directory to the path so we can import from app
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+
+DEFAULT_MIX = "lookup=45,miss=10,search=25,deep_page=10,stats=2,bank=8"
+
+# Statuses that count as a correct answer for each request kind
+EXPECTED = {"miss": {404}}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """``lookup=45,miss=10`` -> {kind: weight}"""
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in REQUESTS:
+            raise ValueError(f"Unknown request kind {kind!r}; choose from {', '.join(REQUESTS)}")
+        weights[kind] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return weights
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Sample:
+    """Values drawn from the target's data before the run"""
+
+    def __init__(self, ifscs: List[str], cities: List[str], states: List[str], bank_ids: List[int], total: int):
+        self.ifscs = ifscs
+        self.cities = cities
+        self.states = states
+        self.bank_ids = bank_ids
+        self.total = total
+
+    @classmethod
+    async def load(cls, client: httpx.AsyncClient, size: int) -> "Sample":
+        page = (await client.get("/api/v1/branches/", params={"limit": size})).raise_for_status().json()
+        banks = (await client.get("/api/v1/banks/", params={"limit": 1000})).raise_for_status().json()
+        items = page["items"]
+        if not items:
+            raise SystemExit("The target has no branches to sample")
+        return cls(
+            ifscs=[item["ifsc"] for item in items],
+            cities=sorted({item["city"] for item in items if item["city"]}),
+            states=sorted({item["state"] for item in items if item["state"]}),
+            bank_ids=[bank["id"] for bank in banks["items"]],
+            total=page["total"],
+        )
+
+
+def _lookup(sample: Sample) -> Tuple[str, dict]:
+    return f"/api/v1/branches/{random.choice(sample.ifscs)}", {}
+
+
+def _miss(sample: Sample) -> Tuple[str, dict]:
+    # Keep the bank code real so the request gets past the format check
+    code = random.choice(sample.ifscs)[:4]
+    return f"/api/v1/branches/{code}0Z{random.randrange(10 ** 5):05d}", {}
+
+
+def _search(sample: Sample) -> Tuple[str, dict]:
+    params = random.choice([
+        {"city": random.choice(sample.cities)} if sample.cities else {},
+        {"state": random.choice(sample.states)} if sample.states else {},
+        {"bank_id": random.choice(sample.bank_ids)} if sample.bank_ids else {},
+        {"ifsc_prefix": random.choice(sample.ifscs)[:4]},
+    ])
+    return "/api/v1/branches/", {**params, "limit": 20}
+
+
+def _deep_page(sample: Sample) -> Tuple[str, dict]:
+    skip = random.randrange(max(sample.total - 100, 1))
+    sort = random.choice(["ifsc", "branch", "city", "state"])
+    return "/api/v1/branches/", {"skip": skip, "limit": 100, "sort": sort, "order": random.choice(["asc", "desc"])}
+
+
+def _stats(sample: Sample) -> Tuple[str, dict]:
+    return "/stats", {}
+
+
+def _bank(sample: Sample) -> Tuple[str, dict]:
+    return f"/api/v1/banks/{random.choice(sample.bank_ids or [1])}", {}
+
+
+REQUESTS = {
+    "lookup": _lookup,
+    "miss": _miss,
+    "search": _search,
+    "deep_page": _deep_page,
+    "stats": _stats,
+    "bank": _bank,
+}
+
+
+class Recorder:
+    """Latencies and outcomes, per reporting interval and per request kind"""
+
+    def __init__(self):
+        self.interval: List[Tuple[float, bool]] = []
+        self.interval_dropped = 0
+        self.dropped = 0
+        self.dropped_by_kind: Dict[str, int] = defaultdict(int)
+        self.by_kind: Dict[str, List[float]] = defaultdict(list)
+        self.errors_by_kind: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[object, int] = defaultdict(int)
+
+    def record(self, kind: str, latency: float, status: object) -> None:
+        ok = status in EXPECTED.get(kind, {200})
+        self.interval.append((latency, ok))
+        self.by_kind[kind].append(latency)
+        self.statuses[status] += 1
+        if not ok:
+            self.errors_by_kind[kind] += 1
+
+    def drop(self, kind: str) -> None:
+        """An arrival that was never sent: an error, without a latency"""
+        self.dropped += 1
+        self.interval_dropped += 1
+        self.dropped_by_kind[kind] += 1
+
+    def flush(self) -> Tuple[List[Tuple[float, bool]], int]:
+        interval, self.interval = self.interval, []
+        dropped, self.interval_dropped = self.interval_dropped, 0
+        return interval, dropped
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:8.1f}"
+
+
+async def _send(
+    client: httpx.AsyncClient, kind: str, sample: Sample, recorder: Recorder, scheduled: float
+) -> None:
+    path, params = REQUESTS[kind](sample)
+    try:
+        status: object = (await client.get(path, params=params)).status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    recorder.record(kind, time.perf_counter() - scheduled, status)
+
+
+async def _report(recorder: Recorder, interval: float, started: float) -> None:
+    print(f"{'t(s)':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    while True:
+        await asyncio.sleep(interval)
+        window, dropped = recorder.flush()
+        latencies = [latency for latency, _ in window]
+        errors = sum(1 for _, ok in window if not ok) + dropped
+        arrivals = len(window) + dropped
+        print(
+            f"{time.perf_counter() - started:6.0f} {len(window) / interval:8.0f} "
+            f"{_ms(percentile(latencies, 0.50))} {_ms(percentile(latencies, 0.95))} "
+            f"{_ms(percentile(latencies, 0.99))} {_ms(max(latencies, default=0.0))} "
+            f"{(errors / arrivals if arrivals else 0.0):7.1%}"
+        )
+
+
+def _summary(recorder: Recorder, elapsed: float, server_cores: int) -> None:
+    completed = sum(len(latencies) for latencies in recorder.by_kind.values())
+    errors = sum(recorder.errors_by_kind.values()) + recorder.dropped
+    arrivals = completed + recorder.dropped
+    print()
+    print(f"{'kind':<10} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for kind in sorted(recorder.by_kind.keys() | recorder.dropped_by_kind.keys()):
+        latencies = recorder.by_kind[kind]
+        dropped = recorder.dropped_by_kind[kind]
+        print(
+            f"{kind:<10} {len(latencies) + dropped:>8} {_ms(percentile(latencies, 0.50))} "
+            f"{_ms(percentile(latencies, 0.95))} {_ms(percentile(latencies, 0.99))} "
+            f"{(recorder.errors_by_kind[kind] + dropped) / (len(latencies) + dropped):7.1%}"
+        )
+    throughput = completed / elapsed if elapsed else 0.0
+    print()
+    print(f"completed {completed} in {elapsed:.1f}s: {throughput:.0f} req/s, "
+          f"{throughput / server_cores:.0f} req/s per server core ({server_cores})")
+    print(f"errors {errors} of {arrivals} arrivals ({(errors / arrivals if arrivals else 0.0):.1%}), "
+          f"of which dropped at the in-flight limit {recorder.dropped}")
+    print("statuses " + ", ".join(f"{status}: {count}" for status, count in sorted(
+        recorder.statuses.items(), key=lambda item: str(item[0])
+    )))
+
+
+async def run(
+    client: httpx.AsyncClient,
+    rate: float,
+    duration: float,
+    mix: Dict[str, float],
+    interval: float,
+    max_in_flight: int,
+    sample_size: int,
+    server_cores: int,
+    seed: Optional[int] = None,
+) -> Recorder:
+    random.seed(seed)
+    sample = await Sample.load(client, sample_size)
+    kinds, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    in_flight = set()
+    started = time.perf_counter()
+    reporter = asyncio.create_task(_report(recorder, interval, started))
+
+    # Open loop: arrivals follow the schedule, not the responses
+    next_arrival = started
+    while next_arrival - started < duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = random.choices(kinds, weights)[0]
+        if len(in_flight) >= max_in_flight:
+            recorder.drop(kind)
+        else:
+            task = asyncio.create_task(_send(client, kind, sample, recorder, next_arrival))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_arrival += random.expovariate(rate)
+
+    if in_flight:
+        await asyncio.wait(in_flight)
+    elapsed = time.perf_counter() - started
+    reporter.cancel()
+    _summary(recorder, elapsed, server_cores)
+    return recorder
+
+
+async def main(args: argparse.Namespace) -> None:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    options = dict(timeout=args.timeout, limits=limits)
+    run_args = (
+        args.rate, args.duration, mix, args.interval, args.max_in_flight, args.sample_size,
+        args.server_cores, args.seed,
+    )
+    if not args.in_process:
+        async with httpx.AsyncClient(base_url=args.url, **options) as client:
+            await run(client, *run_args)
+        return
+
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", **options) as client:
+            await run(client, *run_args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of a running server")
+    parser.add_argument("--in-process", action="store_true", help="Drive the ASGI app directly instead of --url")
+    parser.add_argument("--rate", type=float, default=100.0, help="Mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request kinds (default {DEFAULT_MIX})")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Arrivals beyond this are dropped")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument("--sample-size", type=int, default=1000, help="Branches sampled for IFSCs and cities")
+    parser.add_argument("--server-cores", type=int, default=os.cpu_count() or 1,
+                        help="Cores serving the target, for req/s per core")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    except ValueError as e:
+        parser.error(str(e))
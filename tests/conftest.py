@@ -1,12 +1,22 @@
+import os
+
+# Keep the app's own engine (used at startup) off the working directory
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+# ... and do not warm it up in the background while tests run
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
 from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.core.database import get_db, Base
+from app.core import database, dataset
+from app.core.database import get_db, get_session_factory, Base
+from app.core.session import LazySession
+from app.core.dataset import bump_dataset_version
 from app.models.bank import Bank
 from app.models.branch import Branch
 
@@ -25,7 +35,7 @@ test_engine = create_async_engine(
 # Create test session factory
 TestSessionLocal = async_sessionmaker(
     test_engine,
-    class_=AsyncSession,
+    class_=LazySession,
     expire_on_commit=False
 )
 
@@ -34,6 +44,8 @@ async def test_db():
     """Create test database and tables"""
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Every test gets a fresh dataset, so nothing derived from a previous one is reused
+    bump_dataset_version()
     
     async with TestSessionLocal() as session:
         yield session
@@ -42,13 +54,21 @@ async def test_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 @pytest_asyncio.fixture
-async def client(test_db):
+async def client(test_db, monkeypatch):
     """Create test client with test database"""
+    # Startup (schema upgrade, dataset indexes) runs against the test database too.
+    # Rebuilds after writes would run on the client's event loop and share the
+    # single test connection with the test's own; indexes just go stale instead.
+    monkeypatch.setattr(database, "engine", test_engine)
+    monkeypatch.setattr(database, "AsyncSessionLocal", TestSessionLocal)
+    monkeypatch.setattr(dataset, "schedule_index_rebuild", lambda: None)
+
     async def override_get_db():
         async with TestSessionLocal() as session:
             yield session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestSessionLocal
     
     # Use TestClient for testing instead of AsyncClient
     with TestClient(app) as test_client:
@@ -72,6 +92,7 @@ async def sample_banks(test_db):
         banks.append(bank)
     
     await test_db.commit()
+    bump_dataset_version()
     return banks
 
 @pytest_asyncio.fixture
@@ -123,4 +144,5 @@ async def sample_branches(test_db, sample_banks):
         branches.append(branch)
     
     await test_db.commit()
+    bump_dataset_version()
     return branches
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.admission import GATES, AdmissionGate, Overloaded
+
+class TestAdmissionGate:
+    """Test the admission gate primitive"""
+
+    async def test_limits_concurrency(self):
+        """No more than ``limit`` holders run at once; the rest queue in order"""
+        gate = AdmissionGate("test", limit=2, max_queue=10, queue_timeout=1)
+        running = peak = 0
+        order = []
+
+        async def work(i):
+            nonlocal running, peak
+            async with gate.slot():
+                order.append(i)
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(work(i) for i in range(6)))
+
+        assert peak == 2
+        assert order == list(range(6))
+        assert gate.in_flight == 0
+        assert gate.queued == 0
+
+    async def test_sheds_when_queue_full(self):
+        """A saturated gate with a full queue fails fast"""
+        metrics.reset()
+        gate = AdmissionGate("test", limit=1, max_queue=1, queue_timeout=1)
+        await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(Overloaded) as exc_info:
+            await gate.acquire()
+        assert exc_info.value.reason == "queue_full"
+        assert metrics.get_counter("admission.test.shed.queue_full") == 1
+
+        gate.release()
+        await waiter
+        gate.release()
+        assert gate.in_flight == 0
+
+    async def test_sheds_after_queue_timeout(self):
+        """Queued requests give up after the queue timeout"""
+        gate = AdmissionGate("test", limit=1, max_queue=5, queue_timeout=0.01)
+        await gate.acquire()
+
+        with pytest.raises(Overloaded) as exc_info:
+            await gate.acquire()
+        assert exc_info.value.reason == "timeout"
+        assert gate.queued == 0
+
+        gate.release()
+        assert gate.in_flight == 0
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Cancelling a queued request frees its queue slot"""
+        gate = AdmissionGate("test", limit=1, max_queue=5, queue_timeout=1)
+        await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.queued == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert gate.queued == 0
+        gate.release()
+        assert gate.in_flight == 0
+
+class TestAdmissionEndpoints:
+    """Test load shedding on the API"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        metrics.reset()
+
+    def _saturate(self, monkeypatch, name):
+        monkeypatch.setattr(GATES[name], "limit", 0)
+        monkeypatch.setattr(GATES[name], "max_queue", 0)
+
+    def test_saturated_class_returns_503(self, client: TestClient, monkeypatch):
+        """Excess requests get a fast 503 with Retry-After"""
+        self._saturate(monkeypatch, "expensive")
+        response = client.get("/stats")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert metrics.get_counter("admission.expensive.shed.queue_full") == 1
+
+    def test_classes_have_separate_budgets(self, client: TestClient, monkeypatch):
+        """Saturated expensive routes do not block IFSC lookups or narrow searches"""
+        self._saturate(monkeypatch, "expensive")
+        assert client.get("/api/v1/branches/SBIN0000001").status_code == 200
+        assert client.get("/api/v1/branches/?city=MUMBAI").status_code == 200
+        assert client.get("/api/v1/banks/1").status_code == 503
+
+    @pytest.mark.parametrize("query,route_class", [
+        ("?q=HDFC", "expensive"),
+        ("", "expensive"),
+        ("?city=MUMBAI", "search"),
+        ("?bank_id=1&limit=10", "search"),
+    ])
+    def test_search_route_class(self, client: TestClient, monkeypatch, query, route_class):
+        """Free-text and unfiltered searches count as expensive"""
+        self._saturate(monkeypatch, route_class)
+        response = client.get(f"/api/v1/branches/{query}")
+        assert response.status_code == 503
+
+    def test_metrics_expose_gates(self, client: TestClient):
+        """Queue depth and in-flight gauges are exported"""
+        client.get("/api/v1/branches/SBIN0000001")
+        data = client.get("/metrics").json()
+        assert data["gauges"]["admission.lookup.queued"] == 0
+        assert data["gauges"]["admission.lookup.in_flight"] == 0
+        assert data["counters"]["admission.lookup.admitted"] == 1
@@ -0,0 +1,83 @@
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.bank_codes import build_bank_codes, clear_bank_codes, get_bank_codes
+from app.core.dataset import bump_dataset_version, get_dataset_version
+from app.models.branch import Branch
+from app.services.bank_service import BankService
+from app.utils.ifsc import prefix_range
+
+class TestPrefixRange:
+    """Test the key range of an IFSC prefix"""
+
+    @pytest.mark.parametrize("prefix,expected", [
+        ("HDFC", ("HDFC", "HDFD")),
+        ("sbin0", ("SBIN0", "SBIN1")),
+        ("PUNZ", ("PUNZ", "PUN[")),
+        ("SBIN000009", ("SBIN000009", "SBIN00000:")),
+    ])
+    def test_range(self, prefix, expected):
+        assert prefix_range(prefix) == expected
+
+class TestBankCodes:
+    """Test bank code resolution and the ifsc_prefix filter"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        self.db = test_db
+        yield
+        clear_bank_codes()
+
+    async def _publish(self):
+        publish = await build_bank_codes(self.db)
+        publish(get_dataset_version())
+
+    async def test_map(self):
+        await self._publish()
+        codes = get_bank_codes()
+        assert set(codes) == {"SBIN", "PUNB", "HDFC"}
+        assert codes["SBIN"].branch_count == 2
+        assert codes["SBIN"].bank_name == "STATE BANK OF INDIA"
+
+        bump_dataset_version()
+        assert get_bank_codes() is None
+
+    @pytest.mark.parametrize("use_map", [True, False])
+    async def test_resolve(self, use_map):
+        if use_map:
+            await self._publish()
+        bank_code = await BankService.get_bank_by_code(self.db, "sbin")
+        assert bank_code == ("SBIN", 1, "STATE BANK OF INDIA", 2)
+        assert await BankService.get_bank_by_code(self.db, "ICIC") is None
+
+    def test_by_code_endpoint(self, client: TestClient):
+        response = client.get("/api/v1/banks/by-code/hdfc")
+        assert response.status_code == 200
+        assert response.json() == {
+            "code": "HDFC", "bank_id": 3, "bank_name": "HDFC BANK", "branch_count": 1
+        }
+        assert client.get("/api/v1/banks/by-code/ICIC").status_code == 404
+        assert client.get("/api/v1/banks/by-code/HDFC0").status_code == 422
+
+    def test_ifsc_prefix_filter(self, client: TestClient):
+        data = client.get("/api/v1/branches/?ifsc_prefix=SBIN").json()
+        assert data["total"] == 2
+        assert {b["ifsc"] for b in data["items"]} == {"SBIN0000001", "SBIN0000002"}
+
+        data = client.get("/api/v1/branches/?ifsc_prefix=sbin0000002&fields=ifsc").json()
+        assert data["items"] == [{"ifsc": "SBIN0000002"}]
+
+        assert client.get("/api/v1/branches/?ifsc_prefix=SB-N").status_code == 422
+
+    async def test_prefix_is_a_range_seek(self):
+        low, high = prefix_range("HDFC")
+        statement = select(Branch.ifsc).where(Branch.ifsc >= low, Branch.ifsc < high)
+        compiled = statement.compile(compile_kwargs={"literal_binds": True})
+        connection = await self.db.connection()
+        rows = (await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        plan = " ".join(row[-1] for row in rows)
+        assert "SEARCH branches USING" in plan
+        assert "ifsc>? AND ifsc<?" in plan
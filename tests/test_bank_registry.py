@@ -0,0 +1,117 @@
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import bank_registry, database, metrics, result_cache
+from app.core.bank_registry import build_bank_registry, find_bank_ids, get_bank_names
+from app.core.config import settings
+from app.core.dataset import bump_dataset_version, get_dataset_version
+from app.core.result_cache import clear_result_cache
+from app.main import app
+from app.models.bank import Bank
+from app.services.branch_service import BranchService
+from tests.conftest import TestSessionLocal, test_engine
+
+class TestBankRegistry:
+    """Test the bank name registry and join-free branch queries"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        self.db = test_db
+        metrics.reset()
+
+    async def _statements(self, call):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            result = await call()
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", capture)
+        return result, statements
+
+    async def test_loaded_once_per_dataset_version(self):
+        assert (await get_bank_names(self.db))[3] == "HDFC BANK"
+        await get_bank_names(self.db)
+        assert metrics.get_counter("bank_registry.loads") == 1
+
+        self.db.add(Bank(id=4, name="AXIS BANK"))
+        await self.db.commit()
+        bump_dataset_version()
+        assert (await get_bank_names(self.db))[4] == "AXIS BANK"
+        assert metrics.get_counter("bank_registry.loads") == 2
+
+    async def test_published_registry_is_served(self):
+        publish = await build_bank_registry(self.db)
+        publish(get_dataset_version())
+        assert (await get_bank_names(self.db))[2] == "PUNJAB NATIONAL BANK"
+        assert metrics.get_counter("bank_registry.loads") == 1
+
+    async def test_write_by_another_worker_reloads(self, tmp_path, monkeypatch):
+        """A change to the shared database file makes the registry stale in every worker"""
+        database_file = tmp_path / "data.db"
+        database_file.write_bytes(b"v1")
+        monkeypatch.setattr(result_cache, "_database_file", database_file)
+        monkeypatch.setattr(settings, "result_cache_stat_interval", 0)
+        clear_result_cache()
+        try:
+            await get_bank_names(self.db)
+            await get_bank_names(self.db)
+            assert metrics.get_counter("bank_registry.loads") == 1
+
+            database_file.write_bytes(b"version 2")
+            await get_bank_names(self.db)
+            assert metrics.get_counter("bank_registry.loads") == 2
+        finally:
+            clear_result_cache()
+
+    def test_built_at_startup_and_cleared_at_shutdown(self, monkeypatch):
+        monkeypatch.setattr(database, "engine", test_engine)
+        monkeypatch.setattr(database, "AsyncSessionLocal", TestSessionLocal)
+        with TestClient(app) as client:
+            assert metrics.get_counter("bank_registry.loads") == 1
+            assert client.get("/api/v1/branches/HDFC0000001").json()["bank_name"] == "HDFC BANK"
+            assert metrics.get_counter("bank_registry.loads") == 1
+        assert bank_registry._names_version is None
+
+    async def test_find_bank_ids(self):
+        assert await find_bank_ids(self.db, "national") == [2]
+        assert sorted(await find_bank_ids(self.db, "BANK")) == [1, 2, 3]
+        assert await find_bank_ids(self.db, "CANARA") == []
+
+    async def test_branch_queries_do_not_join_banks(self):
+        await get_bank_names(self.db)
+        (branches, total), statements = await self._statements(
+            lambda: BranchService.search_branches(self.db, city="MUMBAI")
+        )
+        assert total == 2
+        assert {b.bank_name for b in branches} == {"STATE BANK OF INDIA", "HDFC BANK"}
+        branch, more = await self._statements(
+            lambda: BranchService.get_branch_by_ifsc(self.db, "PUNB0000001")
+        )
+        assert branch.bank_name == "PUNJAB NATIONAL BANK"
+        statements += more
+        assert statements
+        for statement in statements:
+            assert "JOIN" not in statement.upper()
+            assert "banks" not in statement
+
+    async def test_search_by_bank_name(self):
+        branches, total = await BranchService.search_branches(self.db, query="hdfc bank")
+        assert total == 1
+        assert branches[0].ifsc == "HDFC0000001"
+
+        branches, total = await BranchService.search_branches(self.db, query="canara")
+        assert total == 0
+
+    async def test_sparse_fields_get_bank_names(self):
+        row = await BranchService.get_branch_by_ifsc(self.db, "SBIN0000001", fields=["ifsc", "bank_name"])
+        assert row == ("SBIN0000001", "STATE BANK OF INDIA")
+
+        rows, total = await BranchService.get_branches_by_bank_id(self.db, 1, fields=["bank_name", "city"])
+        assert total == 2
+        assert {name for name, _ in rows} == {"STATE BANK OF INDIA"}
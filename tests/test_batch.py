@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import Base, create_session_factory, get_session_factory
+from app.main import app
+from app.models.bank import Bank
+from app.models.branch import Branch
+from app.services.bank_service import BankService
+
+class TestBatchEndpoint:
+    """Test POST /api/v1/batch"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, sample_banks, sample_branches, monkeypatch):
+        """Setup test data"""
+        self.banks = sample_banks
+        self.branches = sample_branches
+        # The in-memory test database is a single shared connection, which
+        # must not be used concurrently from the TestClient's event loop
+        monkeypatch.setattr(settings, "batch_max_concurrency", 1)
+
+    def test_mixed_batch_in_order(self, client: TestClient):
+        """Sub-requests of every kind come back in request order"""
+        response = client.post("/api/v1/batch", json={"requests": [
+            {"op": "search", "params": {"city": "MUMBAI"}},
+            {"op": "lookup", "params": {"ifsc": "PUNB0000001"}},
+            {"op": "banks", "params": {"q": "BANK", "limit": 2}},
+            {"op": "search", "params": {"bank_id": 1, "fields": "ifsc"}},
+        ]})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [200, 200, 200, 200]
+
+        assert results[0]["body"]["total"] == 2
+        assert all(item["city"] == "MUMBAI" for item in results[0]["body"]["items"])
+        assert results[1]["body"]["ifsc"] == "PUNB0000001"
+        assert results[1]["body"]["bank_name"] == "PUNJAB NATIONAL BANK"
+        assert results[2]["body"]["total"] == 3
+        assert len(results[2]["body"]["items"]) == 2
+        assert results[2]["body"]["has_next"] is True
+        assert sorted(results[3]["body"]["items"], key=lambda i: i["ifsc"]) == [
+            {"ifsc": "SBIN0000001"}, {"ifsc": "SBIN0000002"}
+        ]
+
+    def test_per_item_errors(self, client: TestClient):
+        """Failures are reported per item without failing the batch"""
+        response = client.post("/api/v1/batch", json={"requests": [
+            {"op": "lookup", "params": {"ifsc": "NOPE0000000"}},
+            {"op": "search", "params": {"limit": 5000}},
+            {"op": "lookup", "params": {}},
+            {"op": "search", "params": {"fields": "bogus"}},
+            {"op": "lookup", "params": {"ifsc": "SBIN0000001"}},
+        ]})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [404, 422, 422, 422, 200]
+        assert results[0]["detail"] == "Branch not found"
+
+    def test_unexpected_error_fails_only_its_item(self, client: TestClient, monkeypatch):
+        """Any exception in a sub-request becomes a 500 item"""
+        async def broken(db):
+            raise RuntimeError("database is on fire")
+
+        monkeypatch.setattr(BankService, "get_all_banks", staticmethod(broken))
+        response = client.post("/api/v1/batch", json={"requests": [
+            {"op": "banks", "params": {}},
+            {"op": "lookup", "params": {"ifsc": "SBIN0000001"}},
+        ]})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [500, 200]
+        assert results[0]["detail"] == "Internal Server Error"
+
+    def test_lookup_rejects_malformed_ifsc(self, client: TestClient):
+        """Lookups get the same format and Bloom filter checks as GET /branches/{ifsc}"""
+        metrics.reset()
+        response = client.post("/api/v1/batch", json={"requests": [
+            {"op": "lookup", "params": {"ifsc": "NOT-AN-IFSC"}},
+        ]})
+
+        assert response.json()["results"] == [{"status": 404, "body": None, "detail": "Branch not found"}]
+        assert metrics.get_counter("ifsc.rejected_format") == 1
+
+    def test_rejects_malformed_batches(self, client: TestClient):
+        """Unknown operations and empty batches are rejected outright"""
+        assert client.post("/api/v1/batch", json={"requests": []}).status_code == 422
+        response = client.post("/api/v1/batch", json={"requests": [{"op": "drop_tables"}]})
+        assert response.status_code == 422
+
+    def test_concurrent_sub_requests(self, client: TestClient, tmp_path, monkeypatch):
+        """With BATCH_MAX_CONCURRENCY > 1 sub-requests overlap, each on its own session"""
+        # A file database gives every session its own connection
+        path = tmp_path / "batch.db"
+        sync_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(sync_engine)
+        with Session(sync_engine) as session:
+            session.add_all([Bank(id=bank.id, name=bank.name) for bank in self.banks])
+            session.add_all([
+                Branch(**{column: getattr(branch, column) for column in ("ifsc", "bank_id", "branch", "city", "state")})
+                for branch in self.branches
+            ])
+            session.commit()
+        sync_engine.dispose()
+
+        session_factory = create_session_factory(
+            create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        )
+        open_sessions = peak = 0
+
+        @asynccontextmanager
+        async def counting_factory():
+            nonlocal open_sessions, peak
+            async with session_factory() as session:
+                open_sessions += 1
+                peak = max(peak, open_sessions)
+                try:
+                    await asyncio.sleep(0.01)
+                    yield session
+                finally:
+                    open_sessions -= 1
+
+        monkeypatch.setattr(settings, "batch_max_concurrency", 3)
+        app.dependency_overrides[get_session_factory] = lambda: counting_factory
+        ifscs = [branch.ifsc for branch in self.branches]
+        response = client.post("/api/v1/batch", json={"requests": [
+            {"op": "lookup", "params": {"ifsc": ifsc}} for ifsc in ifscs
+        ] + [{"op": "search", "params": {"city": "MUMBAI"}}] * 2})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [200] * 6
+        assert [r["body"]["ifsc"] for r in results[:4]] == ifscs
+        assert all(r["body"]["total"] == 2 for r in results[4:])
+        assert 1 < peak <= 3
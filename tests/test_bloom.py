@@ -0,0 +1,124 @@
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics, result_cache
+from app.core.config import settings
+from app.core.dataset import bump_dataset_version, get_dataset_version
+from app.core.ifsc_filter import build_ifsc_filter, clear_ifsc_filter, might_exist
+from app.core.result_cache import clear_result_cache
+from app.utils.bloom import BloomFilter
+from app.utils.ifsc import is_valid_ifsc
+
+class TestBloomFilter:
+    """Test the Bloom filter itself"""
+
+    def test_no_false_negatives(self):
+        keys = [f"TEST{i:07d}" for i in range(5000)]
+        bloom = BloomFilter.from_keys(keys, capacity=len(keys))
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter.from_keys((f"TEST{i:07d}" for i in range(5000)), capacity=5000, fp_rate=0.01)
+        probes = [f"MISS{i:07d}" for i in range(20000)]
+        false_positives = sum(probe in bloom for probe in probes)
+        assert false_positives / len(probes) < 0.03
+
+    def test_invalid_fp_rate(self):
+        with pytest.raises(ValueError):
+            BloomFilter(10, fp_rate=1.5)
+
+    @pytest.mark.parametrize("ifsc,valid", [
+        ("SBIN0000001", True),
+        ("sbin0000001", True),
+        ("HDFC0ABC123", True),
+        ("SBIN1000001", False),
+        ("SBIN000001", False),
+        ("1234056789A", False),
+        ("SBIN0000001X", False),
+    ])
+    def test_ifsc_format(self, ifsc, valid):
+        assert is_valid_ifsc(ifsc) is valid
+
+class TestIfscRejection:
+    """Test that unknown IFSC codes are rejected before the database"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, client: TestClient, test_db: AsyncSession, sample_banks, sample_branches):
+        """Publish a filter built from the test data once the app has started"""
+        publish = await build_ifsc_filter(test_db)
+        publish(get_dataset_version())
+        assert not might_exist("ZZZZ0999999")
+        metrics.reset()
+        yield
+        clear_ifsc_filter()
+
+    def test_malformed_code_rejected(self, client: TestClient):
+        response = client.get("/api/v1/branches/NOT-AN-IFSC")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Branch not found"
+        assert metrics.get_counter("ifsc.rejected_format") == 1
+
+    def test_unknown_code_rejected_by_filter(self, client: TestClient):
+        assert not might_exist("ZZZZ0999999")
+        response = client.get("/api/v1/branches/ZZZZ0999999")
+        assert response.status_code == 404
+        assert metrics.get_counter("ifsc.rejected_bloom") == 1
+
+    @pytest.mark.parametrize("ifsc", ["SBIN0000001", "sbin0000002", "HDFC0000001"])
+    def test_known_codes_pass(self, client: TestClient, ifsc):
+        response = client.get(f"/api/v1/branches/{ifsc}")
+        assert response.status_code == 200
+        assert response.json()["ifsc"] == ifsc.upper()
+
+    def test_stale_filter_is_ignored(self):
+        bump_dataset_version()
+        assert might_exist("ZZZZ0999999")
+
+    def test_inserted_code_is_served(self, client: TestClient):
+        """A branch written through the API is found right away"""
+        assert not might_exist("HDFC0000042")
+        response = client.post("/api/v1/branches/bulk", json=[{"ifsc": "HDFC0000042", "bank_id": 3, "city": "PUNE"}])
+        assert response.status_code == 200
+
+        response = client.get("/api/v1/branches/HDFC0000042")
+        assert response.status_code == 200
+        assert response.json()["city"] == "PUNE"
+        assert metrics.get_counter("ifsc.rejected_bloom") == 0
+
+    async def test_write_by_another_worker_is_served(self, test_db: AsyncSession, tmp_path, monkeypatch):
+        """A change to the shared database file makes the filter stale in every worker"""
+        database_file = tmp_path / "data.db"
+        database_file.write_bytes(b"v1")
+        monkeypatch.setattr(result_cache, "_database_file", database_file)
+        monkeypatch.setattr(settings, "result_cache_stat_interval", 0)
+        clear_result_cache()
+        try:
+            publish = await build_ifsc_filter(test_db)
+            publish(get_dataset_version())
+            assert not might_exist("ZZZZ0999999")
+
+            database_file.write_bytes(b"version 2")
+            assert might_exist("ZZZZ0999999")
+        finally:
+            clear_result_cache()
+
+    async def test_write_by_another_worker_is_served_before_the_next_poll(
+        self, test_db: AsyncSession, tmp_path, monkeypatch
+    ):
+        """A negative answer re-reads the database file's identity before rejecting"""
+        database_file = tmp_path / "data.db"
+        database_file.write_bytes(b"v1")
+        monkeypatch.setattr(result_cache, "_database_file", database_file)
+        monkeypatch.setattr(settings, "result_cache_stat_interval", 3600)
+        clear_result_cache()
+        try:
+            publish = await build_ifsc_filter(test_db)
+            publish(get_dataset_version())
+            assert not might_exist("ZZZZ0999999")
+
+            database_file.write_bytes(b"version 2")
+            assert might_exist("ZZZZ0999999")
+        finally:
+            clear_result_cache()
@@ -173,3 +173,57 @@ class TestBranchEndpoints:
         for branch in data["items"]:
             assert "MUMBAI" in branch["city"].upper()
             assert branch["bank_id"] == 1
+
+class TestSparseFieldsets:
+    """Test the fields= parameter on branch endpoints"""
+    
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, sample_banks, sample_branches):
+        """Setup test data"""
+        self.banks = sample_banks
+        self.branches = sample_branches
+    
+    def test_search_with_fields(self, client: TestClient):
+        """Test GET /api/v1/branches/?fields= trims every item"""
+        response = client.get("/api/v1/branches/?city=MUMBAI&fields=ifsc,bank_name,city")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert data["has_next"] == False
+        for branch in data["items"]:
+            assert list(branch) == ["ifsc", "bank_name", "city"]
+            assert branch["city"] == "MUMBAI"
+        assert {b["bank_name"] for b in data["items"]} == {"STATE BANK OF INDIA", "HDFC BANK"}
+    
+    def test_search_with_query_and_fields(self, client: TestClient):
+        """Test fields= combined with a bank-name search"""
+        response = client.get("/api/v1/branches/?q=HDFC BANK&fields=ifsc")
+        
+        assert response.status_code == 200
+        assert response.json()["items"] == [{"ifsc": "HDFC0000001"}]
+    
+    def test_branch_by_ifsc_with_fields(self, client: TestClient):
+        """Test GET /api/v1/branches/{ifsc}?fields="""
+        response = client.get("/api/v1/branches/SBIN0000001?fields=ifsc,state")
+        
+        assert response.status_code == 200
+        assert response.json() == {"ifsc": "SBIN0000001", "state": "DELHI"}
+        
+        response = client.get("/api/v1/branches/SBIN0000009?fields=ifsc")
+        assert response.status_code == 404
+    
+    def test_branches_by_bank_with_fields(self, client: TestClient):
+        """Test GET /api/v1/branches/bank/{bank_id}?fields="""
+        response = client.get("/api/v1/branches/bank/1?fields=branch,ifsc,branch")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert {tuple(item) for item in data["items"]} == {("branch", "ifsc")}
+    
+    def test_invalid_fields(self, client: TestClient):
+        """Test unknown or empty fieldsets are rejected"""
+        assert client.get("/api/v1/branches/?fields=ifsc,password").status_code == 422
+        assert client.get("/api/v1/branches/?fields=,").status_code == 422
+        assert client.get("/api/v1/branches/SBIN0000001?fields=__dict__").status_code == 422
@@ -0,0 +1,152 @@
+import json
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dataset import get_dataset_version
+from app.schemas.branch import BranchCreate
+from app.services.branch_service import BranchService
+
+def _ndjson(records):
+    return "\n".join(json.dumps(record) for record in records) + "\n"
+
+class TestBulkBanks:
+    """Test POST /api/v1/banks/bulk"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks):
+        pass
+
+    def test_json_array_upsert(self, client: TestClient):
+        """New ids are inserted and existing ids updated"""
+        response = client.post("/api/v1/banks/bulk", json=[
+            {"id": 1, "name": "STATE BANK OF INDIA LTD"},
+            {"id": 10, "name": "NEW BANK"},
+        ])
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["inserted"], data["updated"], data["errors"]) == (1, 1, 0)
+        assert [r["status"] for r in data["results"]] == ["updated", "inserted"]
+        assert [r["key"] for r in data["results"]] == [1, 10]
+
+        banks = client.get("/api/v1/banks/").json()["items"]
+        names = {bank["id"]: bank["name"] for bank in banks}
+        assert names[1] == "STATE BANK OF INDIA LTD"
+        assert names[10] == "NEW BANK"
+
+    def test_per_row_validation(self, client: TestClient):
+        """Invalid and duplicate rows are reported without failing the others"""
+        response = client.post("/api/v1/banks/bulk", json=[
+            {"id": 20, "name": "GOOD BANK"},
+            {"id": "abc", "name": "BAD ID"},
+            {"name": "NO ID"},
+            {"id": 20, "name": "DUPLICATE"},
+        ])
+        data = response.json()
+        assert [r["status"] for r in data["results"]] == ["inserted", "error", "error", "error"]
+        assert data["results"][3]["detail"] == "Duplicate bank id in request"
+        assert data["inserted"] == 1 and data["errors"] == 3
+
+    def test_rejects_non_array(self, client: TestClient):
+        response = client.post("/api/v1/banks/bulk", json={"id": 1, "name": "X"})
+        assert response.status_code == 400
+
+class TestBulkBranches:
+    """Test POST /api/v1/branches/bulk"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        pass
+
+    def test_ndjson_stream(self, client: TestClient):
+        """NDJSON bodies are accepted; bad lines become per-row errors"""
+        version = get_dataset_version()
+        body = _ndjson([
+            {"ifsc": "sbin0000009", "bank_id": 1, "branch": "NEW BRANCH", "city": "PUNE"},
+            {"ifsc": "SBIN0000001", "bank_id": 1, "branch": "RENAMED", "city": "MUMBAI"},
+        ]) + "{not json\n" + _ndjson([
+            {"ifsc": "BAD", "bank_id": 1},
+            {"ifsc": "ZZZZ0000001", "bank_id": 999},
+        ])
+        response = client.post(
+            "/api/v1/branches/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["inserted", "updated", "error", "error", "error"]
+        assert results[0]["key"] == "SBIN0000009"
+        assert [r["detail"] for r in results[2:]] == ["Invalid JSON", "Invalid IFSC format", "Bank not found"]
+        assert get_dataset_version() > version
+
+        assert client.get("/api/v1/branches/SBIN0000009").json()["city"] == "PUNE"
+        assert client.get("/api/v1/branches/SBIN0000001").json()["branch"] == "RENAMED"
+
+    def test_row_limit(self, client: TestClient, monkeypatch):
+        monkeypatch.setattr("app.core.config.settings.bulk_max_rows", 2)
+        records = [{"ifsc": f"SBIN000010{i}", "bank_id": 1} for i in range(3)]
+        assert client.post("/api/v1/branches/bulk", json=records).status_code == 413
+        response = client.post(
+            "/api/v1/branches/bulk",
+            content=_ndjson(records),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 413
+
+    def test_row_limit_after_written_chunks(self, client: TestClient, monkeypatch):
+        """Going over the limit mid-stream reports the rows already written"""
+        monkeypatch.setattr("app.core.config.settings.bulk_max_rows", 3)
+        monkeypatch.setattr("app.core.config.settings.bulk_chunk_rows", 2)
+        records = [{"ifsc": f"SBIN000020{i}", "bank_id": 1} for i in range(5)]
+        response = client.post(
+            "/api/v1/branches/bulk",
+            content=_ndjson(records),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["inserted"], data["updated"], data["errors"]) == (3, 0, 1)
+        assert [r["status"] for r in data["results"]] == ["inserted"] * 3 + ["error"]
+        assert data["results"][3]["index"] == 3
+        assert "At most 3 records" in data["results"][3]["detail"]
+        assert client.get("/api/v1/branches/SBIN0000202").status_code == 200
+        assert client.get("/api/v1/branches/SBIN0000203").status_code == 404
+
+    def test_ndjson_written_in_chunks(self, client: TestClient, monkeypatch):
+        """NDJSON records are written a chunk at a time, with indexes across the whole stream"""
+        monkeypatch.setattr("app.core.config.settings.bulk_chunk_rows", 2)
+        version = get_dataset_version()
+        body = _ndjson([
+            {"ifsc": "SBIN0000101", "bank_id": 1},
+            {"ifsc": "SBIN0000001", "bank_id": 1, "city": "AGRA"},
+            {"ifsc": "BAD", "bank_id": 1},
+            {"ifsc": "SBIN0000102", "bank_id": 1},
+            {"ifsc": "SBIN0000103", "bank_id": 1},
+        ])
+        response = client.post(
+            "/api/v1/branches/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["inserted"], data["updated"], data["errors"]) == (3, 1, 1)
+        assert [r["index"] for r in data["results"]] == [0, 1, 2, 3, 4]
+        assert [r["status"] for r in data["results"]] == ["inserted", "updated", "error", "inserted", "inserted"]
+        # One committed transaction per chunk
+        assert get_dataset_version() == version + 3
+
+    def test_unsupported_content_type(self, client: TestClient):
+        response = client.post("/api/v1/branches/bulk", content="x", headers={"Content-Type": "text/csv"})
+        assert response.status_code == 415
+
+    async def test_service_upserts_many_rows(self, test_db: AsyncSession):
+        """Thousands of rows go through one executemany"""
+        before = await BranchService.get_branch_count(test_db)
+        branches = [BranchCreate(ifsc=f"PUNB0{i:06d}", bank_id=2, city="DELHI") for i in range(1000, 3000)]
+        outcomes = await BranchService.bulk_upsert_branches(test_db, branches)
+        assert outcomes.count(("inserted", None)) == 2000
+        assert await BranchService.get_branch_count(test_db) == before + 2000
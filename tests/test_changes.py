@@ -0,0 +1,81 @@
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.branch import Branch
+from app.schemas.branch import BranchCreate
+from app.services.branch_service import BranchService
+from app.services.change_service import ChangeService, DELETE
+
+class TestChangeFeed:
+    """Test the branch change log and GET /api/v1/changes"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        self.db = test_db
+
+    def test_empty_log(self, client: TestClient):
+        response = client.get("/api/v1/changes?since=0")
+        assert response.status_code == 200
+        assert response.json() == {
+            "since": 0, "version": 0, "resync": False, "has_more": False, "upserted": [], "deleted": []
+        }
+
+    async def test_create_and_bulk_writes_are_logged(self, client: TestClient):
+        await BranchService.create_branch(self.db, BranchCreate(ifsc="SBIN0000010", bank_id=1, city="PUNE"))
+        client.post("/api/v1/branches/bulk", json=[
+            {"ifsc": "SBIN0000001", "bank_id": 1, "branch": "RENAMED"},
+            {"ifsc": "HDFC0000010", "bank_id": 3},
+        ])
+
+        data = client.get("/api/v1/changes?since=0").json()
+        assert data["version"] == 3
+        assert [b["ifsc"] for b in data["upserted"]] == ["SBIN0000010", "SBIN0000001", "HDFC0000010"]
+        assert data["upserted"][1]["branch"] == "RENAMED"
+        assert data["upserted"][1]["bank_name"] == "STATE BANK OF INDIA"
+
+        assert client.get("/api/v1/changes?since=3").json()["upserted"] == []
+
+    async def test_deletes_and_compact_delta(self, client: TestClient):
+        """Each IFSC appears once with its latest state"""
+        await ChangeService.record_many(self.db, [("SBIN0000002", "update"), ("SBIN0000002", DELETE)])
+        await self.db.execute(delete(Branch).where(Branch.ifsc == "SBIN0000002"))
+        await self.db.commit()
+
+        data = client.get("/api/v1/changes?since=0").json()
+        assert data["upserted"] == []
+        assert data["deleted"] == ["SBIN0000002"]
+        assert data["version"] == 2
+
+    def test_bank_rename_updates_its_branches(self, client: TestClient):
+        client.post("/api/v1/banks/bulk", json=[
+            {"id": 1, "name": "SBI"},
+            {"id": 2, "name": "PUNJAB NATIONAL BANK"},
+        ])
+        data = client.get("/api/v1/changes?since=0").json()
+        assert sorted(b["ifsc"] for b in data["upserted"]) == ["SBIN0000001", "SBIN0000002"]
+        assert {b["bank_name"] for b in data["upserted"]} == {"SBI"}
+
+    async def test_paging(self, client: TestClient):
+        await ChangeService.record_many(self.db, [(f"HDFC000000{i}", "update") for i in range(1, 4)])
+        await self.db.commit()
+
+        page = client.get("/api/v1/changes?since=0&limit=2").json()
+        assert page["has_more"] and page["version"] == 2
+        page = client.get(f"/api/v1/changes?since={page['version']}&limit=2").json()
+        assert not page["has_more"] and page["version"] == 3
+
+    async def test_resync_after_compaction(self, client: TestClient):
+        await ChangeService.record_many(self.db, [("SBIN0000001", "update")] * 5)
+        await self.db.commit()
+        assert await ChangeService.compact(self.db, keep=2) == 3
+
+        assert client.get("/api/v1/changes?since=1").json()["resync"] is True
+        data = client.get("/api/v1/changes?since=3").json()
+        assert data["resync"] is False and data["version"] == 5
+        # A version from another database (or the future) also needs a resync
+        assert client.get("/api/v1/changes?since=99").json() == {
+            "since": 99, "version": 5, "resync": True, "has_more": False, "upserted": [], "deleted": []
+        }
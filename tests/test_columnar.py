@@ -0,0 +1,79 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.columnar import build_columnar_index, clear_columnar_index, get_columnar_index
+from app.core.dataset import bump_dataset_version, get_dataset_version
+from app.models.branch import Branch
+from app.services.branch_service import BranchService
+
+np = pytest.importorskip("numpy")
+
+FILTER_COMBINATIONS = [
+    {},
+    {"city": "MUMBAI"},
+    {"city": "delhi"},
+    {"state": "MAHARASHTRA"},
+    {"state": "del"},
+    {"district": "GREATER"},
+    {"bank_id": 1},
+    {"bank_id": 3, "city": "MUMBAI"},
+    {"bank_id": 2, "state": "DELHI", "district": "NEW DELHI"},
+    {"city": "NOWHERE"},
+    {"bank_id": 999},
+]
+
+def _rows(branches):
+    return sorted(
+        (b.ifsc, b.bank_id, b.bank_name, b.branch, b.address, b.city, b.district, b.state)
+        for b in branches
+    )
+
+class TestColumnarEngine:
+    """Cross-check the columnar engine against the SQL path"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        """Add a branch without location data and build the index"""
+        test_db.add(Branch(ifsc="HDFC0000002", bank_id=3, branch="HEAD OFFICE"))
+        await test_db.commit()
+        publish = await build_columnar_index(test_db)
+        publish(get_dataset_version())
+        self.columnar = get_columnar_index()
+        yield
+        clear_columnar_index()
+
+    @pytest.mark.parametrize("filters", FILTER_COMBINATIONS)
+    async def test_consistent_with_sql(self, test_db: AsyncSession, filters):
+        """Every filter combination returns the same rows as SQL"""
+        clear_columnar_index()
+        sql_branches, sql_total = await BranchService.search_branches(test_db, limit=1000, **filters)
+        col_branches, col_total = self.columnar.search(limit=1000, **filters)
+
+        assert col_total == sql_total
+        assert _rows(col_branches) == _rows(sql_branches)
+
+    def test_pages_are_slices_in_ifsc_order(self):
+        """Pages are consecutive slices of the IFSC-ordered matches"""
+        everything, total = self.columnar.search(limit=1000)
+        assert total == 5
+        assert [b.ifsc for b in everything] == sorted(b.ifsc for b in everything)
+
+        page, total = self.columnar.search(skip=2, limit=2)
+        assert total == 5
+        assert [b.ifsc for b in page] == [b.ifsc for b in everything[2:4]]
+
+    async def test_service_dispatch(self, test_db: AsyncSession):
+        """search_branches uses the index for structured filters only"""
+        branches, total = await BranchService.search_branches(test_db, state="DELHI")
+        assert total == 2
+
+        # Free-text queries always go to SQL
+        branches, total = await BranchService.search_branches(test_db, query="HEAD")
+        assert [b.ifsc for b in branches] == ["HDFC0000002"]
+
+    async def test_stale_after_dataset_change(self):
+        """The index stops answering once the dataset version moves on"""
+        assert get_columnar_index() is self.columnar
+        bump_dataset_version()
+        assert get_columnar_index() is None
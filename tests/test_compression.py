@@ -0,0 +1,129 @@
+import gzip
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core import result_cache
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.config import settings
+from app.core.dataset import bump_dataset_version
+from app.core.result_cache import clear_result_cache
+from app.main import app
+
+class TestNegotiation:
+    """Test Accept-Encoding negotiation"""
+
+    def test_prefers_server_order_on_ties(self):
+        assert negotiate_encoding("gzip, br, zstd", ["br", "zstd", "gzip"]) == "br"
+
+    def test_honours_q_values(self):
+        assert negotiate_encoding("br;q=0.5, gzip;q=0.9", ["br", "gzip"]) == "gzip"
+        assert negotiate_encoding("*;q=0.1, br;q=0", ["br", "gzip"]) == "gzip"
+
+    def test_identity_only(self):
+        assert negotiate_encoding("", ["br", "gzip"]) is None
+        assert negotiate_encoding("identity", ["br", "gzip"]) is None
+        assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+
+class TestCompressionMiddleware:
+    """Test compression and the pre-compressed cache"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, client, sample_banks, sample_branches):
+        """Wrap the app (with its test DB override) with a low threshold"""
+        self.middleware = CompressionMiddleware(
+            app, minimum_size=200, cacheable=[r"^/api/v1/banks/$"]
+        )
+        self.client = TestClient(self.middleware)
+
+    def test_gzip_response(self):
+        """Large JSON bodies are compressed with an accepted encoding"""
+        response = self.client.get("/api/v1/branches/", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()["total"] == 4
+
+    def test_brotli_preferred_when_available(self):
+        """brotli wins over gzip when both are accepted"""
+        pytest.importorskip("brotli")
+        response = self.client.get("/api/v1/branches/", headers={"Accept-Encoding": "gzip, br"})
+
+        assert response.headers["content-encoding"] == "br"
+        assert response.json()["total"] == 4
+
+    def test_identity_when_not_accepted(self):
+        """Clients without Accept-Encoding get plain bodies"""
+        response = self.client.get("/api/v1/branches/", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert response.json()["total"] == 4
+
+    def test_small_bodies_not_compressed(self):
+        """Bodies under the threshold are sent as-is"""
+        response = self.client.get("/api/v1/branches/SBIN0000001", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+
+    async def test_cacheable_routes_served_precompressed(self, test_db):
+        """Repeated hits reuse cached bytes until the dataset version changes"""
+        headers = {"Accept-Encoding": "gzip"}
+        first = self.client.get("/api/v1/banks/", headers=headers)
+        assert first.headers["content-encoding"] == "gzip"
+        assert first.json()["total"] == 3
+
+        await test_db.execute(text("DELETE FROM branches WHERE bank_id = 3"))
+        await test_db.execute(text("DELETE FROM banks WHERE id = 3"))
+        await test_db.commit()
+
+        cached = self.client.get("/api/v1/banks/", headers=headers)
+        assert cached.content == first.content  # handler was not run
+
+        bump_dataset_version()
+        fresh = self.client.get("/api/v1/banks/", headers=headers)
+        assert fresh.json()["total"] == 2
+
+    async def test_write_by_another_worker_invalidates(self, test_db, tmp_path, monkeypatch):
+        """A change to the shared database file drops the cached variants in every worker"""
+        database_file = tmp_path / "data.db"
+        database_file.write_bytes(b"v1")
+        monkeypatch.setattr(result_cache, "_database_file", database_file)
+        monkeypatch.setattr(settings, "result_cache_stat_interval", 0)
+        clear_result_cache()
+        try:
+            headers = {"Accept-Encoding": "gzip"}
+            first = self.client.get("/api/v1/banks/", headers=headers)
+            assert first.json()["total"] == 3
+            assert self.client.get("/api/v1/banks/", headers=headers).content == first.content
+
+            await test_db.execute(text("DELETE FROM branches WHERE bank_id = 3"))
+            await test_db.execute(text("DELETE FROM banks WHERE id = 3"))
+            await test_db.commit()
+            database_file.write_bytes(b"version 2")
+
+            assert self.client.get("/api/v1/banks/", headers=headers).json()["total"] == 2
+        finally:
+            clear_result_cache()
+
+    def test_cached_variants_expire(self):
+        headers = {"Accept-Encoding": "gzip"}
+        self.middleware.cache_ttl = 0
+        self.client.get("/api/v1/banks/", headers=headers)
+        key, = self.middleware._cache
+        assert self.middleware._cache_get(key) is None
+        assert not self.middleware._cache and self.middleware._cache_bytes == 0
+
+        self.middleware.cache_ttl = 60
+        self.client.get("/api/v1/banks/", headers=headers)
+        assert self.middleware._cache_get(key) is not None
+
+    def test_cached_variant_decodes(self):
+        """Cached payloads are valid gzip streams"""
+        self.client.get("/api/v1/banks/", headers={"Accept-Encoding": "gzip"})
+        (_, _, body, _), = self.middleware._cache.values()
+
+        assert b"STATE BANK OF INDIA" in gzip.decompress(body)
@@ -0,0 +1,80 @@
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+
+from app.utils.formats import ARROW_STREAM_TYPE, MSGPACK_TYPE, negotiate_format
+
+msgpack = pytest.importorskip("msgpack")
+pa = pytest.importorskip("pyarrow")
+
+class TestBinaryFormats:
+    """Test MessagePack and Arrow responses of branch listings"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, client: TestClient, sample_banks, sample_branches):
+        self.client = client
+
+    def _arrow(self, response):
+        return pa.ipc.open_stream(response.content).read_all()
+
+    @pytest.mark.parametrize("accept,expected", [
+        ("", None),
+        ("*/*", None),
+        ("application/json", None),
+        (MSGPACK_TYPE, MSGPACK_TYPE),
+        (f"{ARROW_STREAM_TYPE}, application/json;q=0.5", ARROW_STREAM_TYPE),
+        (f"application/json, {MSGPACK_TYPE};q=0.5", None),
+        ("text/csv", None),
+    ])
+    def test_negotiate_format(self, accept, expected):
+        assert negotiate_format(accept) == expected
+
+    def test_msgpack_page(self):
+        json_page = self.client.get("/api/v1/branches/?city=MUMBAI").json()
+        response = self.client.get("/api/v1/branches/?city=MUMBAI", headers={"Accept": MSGPACK_TYPE})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == MSGPACK_TYPE
+        assert "Accept" in response.headers["vary"]
+        page = msgpack.unpackb(response.content)
+        assert page["total"] == json_page["total"] == 2
+        assert sorted(page["items"], key=lambda item: item["ifsc"]) == sorted(
+            json_page["items"], key=lambda item: item["ifsc"]
+        )
+
+    def test_arrow_page(self):
+        response = self.client.get(
+            "/api/v1/branches/bank/1?sort=city", headers={"Accept": ARROW_STREAM_TYPE}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == ARROW_STREAM_TYPE
+        table = self._arrow(response)
+        assert table.schema.field("bank_id").type == pa.int64()
+        assert table.schema.field("city").type == pa.string()
+        assert table.column("ifsc").to_pylist() == ["SBIN0000002", "SBIN0000001"]
+        assert set(table.column("bank_name").to_pylist()) == {"STATE BANK OF INDIA"}
+        assert table.schema.metadata[b"total"] == b"2"
+        assert table.schema.metadata[b"has_next"] == b"0"
+
+    def test_arrow_sparse_fields(self):
+        response = self.client.get(
+            "/api/v1/branches/?state=DELHI&fields=ifsc,city", headers={"Accept": ARROW_STREAM_TYPE}
+        )
+        table = self._arrow(response)
+        assert table.column_names == ["ifsc", "city"]
+        assert table.to_pydict() == {
+            "ifsc": ["PUNB0000001", "SBIN0000001"], "city": ["NEW DELHI", "NEW DELHI"]
+        }
+
+    def test_empty_arrow_page(self):
+        response = self.client.get(
+            "/api/v1/branches/?city=NOWHERE", headers={"Accept": ARROW_STREAM_TYPE}
+        )
+        table = self._arrow(response)
+        assert table.num_rows == 0
+        assert table.schema.field("bank_id").type == pa.int64()
+
+    def test_json_by_default(self):
+        response = self.client.get("/api/v1/branches/", headers={"Accept": "*/*"})
+        assert response.headers["content-type"] == "application/json"
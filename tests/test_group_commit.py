@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import group_commit, metrics
+from app.core.config import settings
+from app.core.dataset import get_dataset_version
+from app.core.group_commit import reset_group_commit
+from app.models.bank import Bank
+from app.schemas.bank import BankCreate
+from app.schemas.branch import BranchCreate
+from app.services.bank_service import BankService
+from app.services.branch_service import BranchService
+from tests.conftest import TestSessionLocal
+
+async def _create_bank(bank: BankCreate):
+    async with TestSessionLocal() as db:
+        return await BankService.create_bank(db, bank)
+
+class TestGroupCommit:
+    """Test grouping of concurrent single-row writes"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks):
+        metrics.reset()
+
+    async def test_concurrent_creates_share_one_commit(self, test_db: AsyncSession):
+        """Concurrent writers are flushed in a single transaction"""
+        version = get_dataset_version()
+        banks = await asyncio.gather(
+            *(_create_bank(BankCreate(id=100 + i, name=f"BANK {i}")) for i in range(20))
+        )
+
+        assert [bank.id for bank in banks] == [100 + i for i in range(20)]
+        assert metrics.get_counter("group_commit.flushes") == 1
+        assert metrics.get_counter("group_commit.rows") == 20
+        assert get_dataset_version() == version + 1
+        count = len((await test_db.execute(select(Bank.id).where(Bank.id >= 100))).all())
+        assert count == 20
+
+    async def test_flushes_when_group_is_full(self, monkeypatch):
+        """A full group is written without waiting for the delay"""
+        monkeypatch.setattr(settings, "group_commit_max_rows", 5)
+        monkeypatch.setattr(settings, "group_commit_max_delay_ms", 10000)
+        reset_group_commit()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(_create_bank(BankCreate(id=200 + i, name="B")) for i in range(10))),
+                timeout=5
+            )
+        finally:
+            reset_group_commit()
+        assert metrics.get_counter("group_commit.flushes") == 2
+
+    async def test_failing_row_does_not_fail_the_group(self):
+        """A duplicate key fails only its own caller"""
+        results = await asyncio.gather(
+            _create_bank(BankCreate(id=300, name="NEW BANK")),
+            _create_bank(BankCreate(id=1, name="DUPLICATE")),
+            _create_bank(BankCreate(id=301, name="OTHER BANK")),
+            return_exceptions=True
+        )
+
+        assert results[0].id == 300
+        assert isinstance(results[1], IntegrityError)
+        assert results[2].id == 301
+        assert metrics.get_counter("group_commit.fallbacks") == 1
+
+    async def test_failed_flush_fails_its_callers(self, monkeypatch):
+        """An error outside the row writes reaches every caller, and later writes still flush"""
+        def broken_session(*args, **kwargs):
+            raise RuntimeError("cannot open a session")
+
+        monkeypatch.setattr(group_commit, "AsyncSession", broken_session)
+        results = await asyncio.wait_for(asyncio.gather(
+            _create_bank(BankCreate(id=400, name="A")),
+            _create_bank(BankCreate(id=401, name="B")),
+            return_exceptions=True
+        ), timeout=5)
+        assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+        assert metrics.get_counter("group_commit.failures") == 1
+
+        monkeypatch.undo()
+        bank = await asyncio.wait_for(_create_bank(BankCreate(id=402, name="C")), timeout=5)
+        assert bank.id == 402
+
+    async def test_branch_create(self, test_db: AsyncSession):
+        branch = await BranchService.create_branch(
+            test_db, BranchCreate(ifsc="SBIN0000042", bank_id=1, city="PUNE")
+        )
+        assert branch.ifsc == "SBIN0000042"
+        assert metrics.get_counter("group_commit.flushes") == 1
+        assert (await BranchService.get_branch_by_ifsc(test_db, "SBIN0000042")).city == "PUNE"
+
+    async def test_grouped_row_belongs_to_callers_session(self, test_db: AsyncSession):
+        """A group-committed row is merged into the caller's session"""
+        bank = await BankService.create_bank(test_db, BankCreate(id=450, name="GROUPED"))
+        assert metrics.get_counter("group_commit.flushes") == 1
+        assert bank in test_db
+        assert await test_db.get(Bank, 450) is bank
+
+    async def test_disabled_per_call(self, test_db: AsyncSession):
+        """group_commit=False commits through the caller's session without touching settings"""
+        bank = await BankService.create_bank(test_db, BankCreate(id=460, name="DIRECT"), group_commit=False)
+        assert bank in test_db
+        assert metrics.get_counter("group_commit.flushes") == 0
+
+    async def test_disabled(self, test_db: AsyncSession, monkeypatch):
+        """With group commit off the caller's session commits directly"""
+        monkeypatch.setattr(settings, "group_commit_enabled", False)
+        bank = await BankService.create_bank(test_db, BankCreate(id=400, name="DIRECT"))
+        assert bank in test_db
+        assert metrics.get_counter("group_commit.flushes") == 0
+
+    async def test_pending_changes_commit_directly(self, test_db: AsyncSession):
+        """Unflushed changes in the caller's session are committed with the row"""
+        test_db.add(Bank(id=500, name="PENDING"))
+        await BankService.create_bank(test_db, BankCreate(id=501, name="CREATED"))
+        assert metrics.get_counter("group_commit.flushes") == 0
+        assert await test_db.get(Bank, 500) is not None
@@ -0,0 +1,245 @@
+import asyncio
+import math
+import os
+import sqlite3
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core import database, hot_swap, metrics, write_fence
+from app.core.config import settings
+from app.core.database import Base, create_database_engine, create_session_factory, get_db, sqlite_file
+from app.core.dataset import get_dataset_version, register_dataset_index, unregister_dataset_index
+from app.core.write_fence import DatabaseReplacedError
+from app.main import app
+from app.models.bank import Bank
+from scripts.load_data import DataLoader, max_change_version
+
+async def _make_database(path, bank_name):
+    engine = create_database_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with create_session_factory(engine)() as db:
+        db.add(Bank(id=1, name=bank_name))
+        await db.commit()
+    await engine.dispose()
+
+class TestHotSwap:
+    """Test switching the app to a reloaded database file"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, tmp_path, monkeypatch):
+        self.live = tmp_path / "live.db"
+        self.reloaded = tmp_path / "reloaded.db"
+        await _make_database(self.live, "OLD BANK")
+        await _make_database(self.reloaded, "NEW BANK")
+        engine = create_database_engine(f"sqlite+aiosqlite:///{self.live}")
+        monkeypatch.setattr(database, "engine", engine)
+        monkeypatch.setattr(database, "AsyncSessionLocal", create_session_factory(engine))
+        yield
+        await database.engine.dispose()
+
+    async def test_swap_builds_indexes_before_switching(self):
+        """Indexes are built from the new file and go live with the new engine"""
+        built = []
+
+        async def builder(db):
+            name = (await db.execute(select(Bank.name))).scalar()
+            # Still serving the old database while the new index is built
+            async with database.AsyncSessionLocal() as live:
+                built.append(((await live.execute(select(Bank.name))).scalar(), name))
+            return lambda version: built.append(version)
+
+        register_dataset_index("test", builder)
+        try:
+            version = await hot_swap.swap_database(f"sqlite+aiosqlite:///{self.reloaded}")
+        finally:
+            unregister_dataset_index("test")
+
+        assert built == [("OLD BANK", "NEW BANK"), version]
+        assert get_dataset_version() == version
+        async with database.AsyncSessionLocal() as db:
+            assert (await db.execute(select(Bank.name))).scalar() == "NEW BANK"
+
+    async def test_in_flight_session_finishes_on_old_file(self):
+        """A session holding a connection keeps reading the old file after the swap"""
+        async with database.AsyncSessionLocal() as db:
+            assert (await db.execute(select(Bank.name))).scalar() == "OLD BANK"
+            os.replace(self.reloaded, self.live)
+            await hot_swap.swap_database(f"sqlite+aiosqlite:///{self.live}")
+            assert (await db.execute(select(Bank.name))).scalar() == "OLD BANK"
+
+        async with database.AsyncSessionLocal() as db:
+            assert (await db.execute(select(Bank.name))).scalar() == "NEW BANK"
+
+    async def test_failed_build_keeps_old_database(self, monkeypatch):
+        async def failing(session_factory):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(hot_swap, "build_dataset_indexes", failing)
+        engine = database.engine
+        with pytest.raises(RuntimeError):
+            await hot_swap.swap_database(f"sqlite+aiosqlite:///{self.reloaded}")
+        assert database.engine is engine
+
+    async def test_watcher_swaps_on_rename(self, monkeypatch):
+        """Renaming a new file over the live one triggers exactly one swap"""
+        swaps = []
+
+        async def fake_swap(url=None):
+            swaps.append(url)
+
+        monkeypatch.setattr(hot_swap, "swap_database", fake_swap)
+        watcher = asyncio.create_task(hot_swap.watch_database_file(self.live, 0.01))
+        await asyncio.sleep(0.05)
+        assert swaps == []
+        os.replace(self.reloaded, self.live)
+        await asyncio.sleep(0.05)
+        watcher.cancel()
+        assert swaps == [None]
+
+class TestPublish:
+    """Test publishing a reloaded database over the live one"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, tmp_path, monkeypatch):
+        self.live = tmp_path / "live.db"
+        await _make_database(self.live, "OLD BANK")
+        monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{self.live}")
+        monkeypatch.setattr(settings, "snapshot_path", None)
+        self.loader = DataLoader()
+        self.loader.stage_database()
+
+    def _write_live(self, sql):
+        conn = sqlite3.connect(self.live)
+        with conn:
+            conn.execute(sql)
+        conn.close()
+
+    async def test_publish_replaces_live_file(self):
+        staged = sqlite3.connect(self.loader.staging_file)
+        with staged:
+            staged.execute("UPDATE banks SET name = 'NEW BANK'")
+        staged.close()
+
+        await self.loader.publish()
+        conn = sqlite3.connect(self.live)
+        assert conn.execute("SELECT name FROM banks").fetchall() == [("NEW BANK",)]
+        conn.close()
+        assert not self.loader.staging_file.exists()
+
+    async def test_publish_fails_after_live_write(self):
+        """An API write since the copy would be lost, so the publish is refused"""
+        self._write_live("INSERT INTO banks (id, name) VALUES (2, 'WRITTEN MEANWHILE')")
+
+        with pytest.raises(RuntimeError, match="written to after it was copied"):
+            await self.loader.publish()
+        conn = sqlite3.connect(self.live)
+        assert conn.execute("SELECT count(*) FROM banks").fetchone() == (2,)
+        conn.close()
+        assert self.loader.staging_file.exists()
+
+    async def test_versions_are_never_reused(self):
+        """The staged change log continues after every version the live file handed out"""
+        for _ in range(3):
+            self._write_live("INSERT INTO branch_changes (ifsc, op) VALUES ('SBIN0000001', 'update')")
+        live = sqlite3.connect(self.live)
+        assert max_change_version(live) == 3
+        live.close()
+
+        self.loader.reserve_versions(3)
+        staged = sqlite3.connect(self.loader.staging_file)
+        with staged:
+            staged.execute("INSERT INTO branch_changes (ifsc, op) VALUES ('SBIN0000002', 'insert')")
+        assert staged.execute("SELECT max(version) FROM branch_changes").fetchone() == (4,)
+        assert staged.execute("SELECT value FROM change_log_meta WHERE key = 'floor'").fetchone() == (3,)
+        staged.close()
+        await self.loader.engine.dispose()
+
+class TestWriteFence:
+    """Test that writes never commit into a database file that was replaced"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, tmp_path):
+        self.live = tmp_path / "live.db"
+        self.reloaded = tmp_path / "reloaded.db"
+        await _make_database(self.live, "OLD BANK")
+        await _make_database(self.reloaded, "NEW BANK")
+        self.engine = create_database_engine(f"sqlite+aiosqlite:///{self.live}")
+        self.sessions = create_session_factory(self.engine)
+        # Pool a connection to the current file
+        async with self.sessions() as db:
+            assert (await db.execute(select(Bank.name))).scalar() == "OLD BANK"
+        metrics.reset()
+        yield
+        await self.engine.dispose()
+
+    def _bank_ids(self):
+        conn = sqlite3.connect(self.live)
+        ids = [bank_id for bank_id, in conn.execute("SELECT id FROM banks ORDER BY id")]
+        conn.close()
+        return ids
+
+    async def test_write_to_replaced_file_is_refused(self):
+        os.replace(self.reloaded, self.live)
+        async with self.sessions() as db:
+            # Reads on the old file still work
+            assert (await db.execute(select(Bank.name))).scalar() == "OLD BANK"
+            db.add(Bank(id=2, name="LOST"))
+            with pytest.raises(DatabaseReplacedError):
+                await db.commit()
+        assert metrics.get_counter("database.fenced_writes") == 1
+        assert self._bank_ids() == [1]
+
+        # A connection opened after the rename writes to the new file
+        await self.engine.dispose()
+        async with self.sessions() as db:
+            db.add(Bank(id=2, name="KEPT"))
+            await db.commit()
+        assert self._bank_ids() == [1, 2]
+
+    async def test_file_replaced_after_the_check(self, monkeypatch):
+        """SQLite's own refusal to write to a moved file is reported the same way"""
+        old_inode = os.stat(self.live).st_ino
+        os.replace(self.reloaded, self.live)
+        inodes = [old_inode]
+        monkeypatch.setattr(write_fence, "_inode", lambda path: inodes.pop() if inodes else os.stat(path).st_ino)
+        async with self.sessions() as db:
+            db.add(Bank(id=2, name="LOST"))
+            with pytest.raises(DatabaseReplacedError):
+                await db.commit()
+        assert self._bank_ids() == [1]
+
+    async def test_writes_to_live_file_commit(self):
+        async with self.sessions() as db:
+            db.add(Bank(id=2, name="KEPT"))
+            await db.commit()
+        assert self._bank_ids() == [1, 2]
+        assert metrics.get_counter("database.fenced_writes") == 0
+
+    def test_api_answers_503(self):
+        async def override_get_db():
+            async with self.sessions() as session:
+                yield session
+
+        os.replace(self.reloaded, self.live)
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            response = TestClient(app).post("/api/v1/banks/bulk", json=[{"id": 2, "name": "LOST"}])
+        finally:
+            app.dependency_overrides.clear()
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(math.ceil(settings.database_watch_interval))
+        assert self._bank_ids() == [1]
+
+@pytest.mark.parametrize("url,path", [
+    ("sqlite+aiosqlite:///./indian_banks.db", "indian_banks.db"),
+    ("sqlite+aiosqlite:////var/data/banks.db", "/var/data/banks.db"),
+    ("sqlite+aiosqlite:///:memory:", None),
+    ("postgresql+asyncpg://user@host/db", None),
+])
+def test_sqlite_file(url, path):
+    result = sqlite_file(url)
+    assert (str(result) if result else None) == path
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core.database import Base, create_session_factory, get_db
+from app.main import app
+from app.models.bank import Bank
+from app.models.branch import Branch
+from scripts.loadgen import parse_mix, percentile, run
+
+class TestLoadgen:
+    """Smoke test the load generator's mix, percentiles and scheduler"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches, tmp_path):
+        """Serve the sample data from a file database
+
+        Concurrent requests on the shared in-memory test connection would tie
+        its lock to this test's event loop.
+        """
+        path = tmp_path / "loadgen.db"
+        sync_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(sync_engine)
+        with Session(sync_engine) as session:
+            session.add_all([Bank(id=bank.id, name=bank.name) for bank in sample_banks])
+            session.add_all([
+                Branch(**{column: getattr(branch, column) for column in ("ifsc", "bank_id", "branch", "city", "state")})
+                for branch in sample_branches
+            ])
+            session.commit()
+        sync_engine.dispose()
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        session_factory = create_session_factory(engine)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        yield
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    def test_parse_mix(self):
+        assert parse_mix("lookup=3, miss=1,search") == {"lookup": 3.0, "miss": 1.0, "search": 1.0}
+        with pytest.raises(ValueError, match="Unknown request kind"):
+            parse_mix("lookup=1,upload=1")
+        with pytest.raises(ValueError, match="positive weight"):
+            parse_mix("lookup=0")
+
+    def test_percentile(self):
+        values = [float(n) for n in range(1, 101)]
+        assert percentile(values, 0.50) == 51.0
+        assert percentile(values, 0.99) == 100.0
+        assert percentile(values, 1.0) == 100.0
+        assert percentile([], 0.95) == 0.0
+
+    async def test_run_in_process(self):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadgen") as client:
+            recorder = await run(
+                client, rate=100, duration=0.3, mix=parse_mix("lookup=3,miss=1,search=1,bank=1"),
+                interval=10, max_in_flight=100, sample_size=10, server_cores=1, seed=1,
+            )
+        completed = sum(len(latencies) for latencies in recorder.by_kind.values())
+        assert completed > 0
+        assert recorder.dropped == 0
+        assert sum(recorder.errors_by_kind.values()) == 0
+        assert set(recorder.statuses) <= {200, 404}
+
+    async def test_latency_counts_from_schedule_and_drops_are_errors(self):
+        """A slow target is not allowed to slow the arrivals down"""
+        async def slow(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/api/v1/branches/" and "skip" not in request.url.params:
+                return httpx.Response(200, json={"items": [{"ifsc": "SBIN0000001", "city": "X", "state": "Y"}], "total": 1})
+            if request.url.path == "/api/v1/banks/":
+                return httpx.Response(200, json={"items": [{"id": 1}]})
+            # Blocks the event loop, like a stalled client would
+            time.sleep(0.05)
+            await asyncio.sleep(0)
+            return httpx.Response(200, json={})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(slow), base_url="http://loadgen") as client:
+            recorder = await run(
+                client, rate=200, duration=0.3, mix=parse_mix("lookup"),
+                interval=10, max_in_flight=2, sample_size=10, server_cores=1, seed=1,
+            )
+        latencies = recorder.by_kind["lookup"]
+        assert recorder.dropped > 0
+        assert recorder.dropped_by_kind["lookup"] == recorder.dropped
+        # Arrivals that queued behind the blocked loop waited longer than one request takes
+        assert max(latencies) > 0.1
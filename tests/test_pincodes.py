@@ -0,0 +1,120 @@
+import sqlite3
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import schema
+from app.core.database import create_database_engine, create_session_factory
+from app.core.schema import backfill_pincodes, upgrade_schema
+from app.models.branch import Branch
+from app.schemas.branch import BranchCreate
+from app.services.branch_service import BranchService
+from app.utils.pincode import extract_pincode
+
+class TestExtractPincode:
+    """Test PIN code extraction from addresses"""
+
+    @pytest.mark.parametrize("address,expected", [
+        ("KORAMANGALA, BANGALORE 560034", "560034"),
+        ("KORAMANGALA, BANGALORE - 560 034", "560034"),
+        ("PLOT 12, SECTOR 110001, NOIDA 201301", "201301"),
+        ("11, SANSAD MARG, NEW DELHI", None),
+        ("PHONE 0802345678", None),
+        ("PIN 012345", None),
+        ("", None),
+        (None, None),
+    ])
+    def test_extract(self, address, expected):
+        assert extract_pincode(address) == expected
+
+class TestPincodeLookup:
+    """Test the pincode filter and GET /api/v1/pincodes/{pin}/branches"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        self.db = test_db
+        await BranchService.create_branch(
+            test_db, BranchCreate(ifsc="SBIN0000020", bank_id=1, address="MG ROAD, BANGALORE 560001")
+        )
+        await BranchService.create_branch(
+            test_db, BranchCreate(ifsc="HDFC0000020", bank_id=3, address="MG ROAD, BANGALORE - 560 001")
+        )
+
+    async def test_create_extracts_pincode(self):
+        branch = await self.db.get(Branch, "HDFC0000020")
+        assert branch.pincode == "560001"
+
+    def test_search_filter(self, client: TestClient):
+        data = client.get("/api/v1/branches/?pincode=560001").json()
+        assert data["total"] == 2
+        assert {b["ifsc"] for b in data["items"]} == {"SBIN0000020", "HDFC0000020"}
+
+        data = client.get("/api/v1/branches/?pincode=560001&bank_id=3&fields=ifsc,bank_name").json()
+        assert data["items"] == [{"ifsc": "HDFC0000020", "bank_name": "HDFC BANK"}]
+
+    def test_pincode_endpoint(self, client: TestClient):
+        response = client.get("/api/v1/pincodes/560001/branches?limit=1")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert len(data["items"]) == 1
+
+        assert client.get("/api/v1/pincodes/110001/branches").status_code == 404
+
+    def test_malformed_pincode(self, client: TestClient):
+        assert client.get("/api/v1/pincodes/56001/branches").status_code == 422
+        assert client.get("/api/v1/pincodes/060001/branches").status_code == 422
+        assert client.get("/api/v1/branches/?pincode=abcdef").status_code == 422
+
+    def test_bulk_upsert_sets_pincode(self, client: TestClient):
+        client.post("/api/v1/branches/bulk", json=[
+            {"ifsc": "SBIN0000001", "bank_id": 1, "address": "11, SANSAD MARG, NEW DELHI 110001"},
+        ])
+        data = client.get("/api/v1/pincodes/110001/branches").json()
+        assert [b["ifsc"] for b in data["items"]] == ["SBIN0000001"]
+
+class TestSchemaUpgrade:
+    """Test adding and backfilling the pincode column of an older database"""
+
+    async def test_upgrade_and_backfill(self, tmp_path, monkeypatch):
+        path = tmp_path / "old.db"
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE banks (id INTEGER PRIMARY KEY, name VARCHAR(49))")
+        conn.execute(
+            "CREATE TABLE branches (ifsc VARCHAR(11) PRIMARY KEY, bank_id INTEGER, branch VARCHAR(74), "
+            "address VARCHAR(195), city VARCHAR(50), district VARCHAR(50), state VARCHAR(26))"
+        )
+        conn.execute("INSERT INTO banks VALUES (1, 'STATE BANK OF INDIA')")
+        conn.executemany("INSERT INTO branches (ifsc, bank_id, address) VALUES (?, 1, ?)", [
+            (f"SBIN{i:07d}", f"BRANCH ROAD, CITY {560000 + i}") for i in range(1, 8)
+        ] + [("SBIN0000099", "NO PIN HERE")])
+        conn.commit()
+        conn.close()
+
+        engine = create_database_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with engine.begin() as connection:
+                assert await upgrade_schema(connection) == ["pincode"]
+            async with engine.begin() as connection:
+                assert await upgrade_schema(connection) == []
+
+            # Another worker added the column between this one's check and its ALTER TABLE
+            monkeypatch.setattr(schema, "_missing_columns", lambda sync_conn: ["pincode"])
+            async with engine.begin() as connection:
+                assert await upgrade_schema(connection) == []
+
+            async with create_session_factory(engine)() as db:
+                assert await backfill_pincodes(db, batch_size=3) == 7
+                assert await backfill_pincodes(db) == 0
+                pincode = await db.scalar(select(Branch.pincode).where(Branch.ifsc == "SBIN0000003"))
+                assert pincode == "560003"
+        finally:
+            await engine.dispose()
+
+        conn = sqlite3.connect(path)
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(branches)")]
+        conn.close()
+        assert "ix_branches_pincode" in indexes
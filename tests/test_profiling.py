@@ -0,0 +1,76 @@
+import json
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.bank_registry import get_bank_names
+from app.core.profiling import ProfilingMiddleware, install_db_timing, remove_db_timing
+from app.main import app
+from tests.conftest import test_engine
+
+class TestProfilingMiddleware:
+    """Test opt-in request profiling"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, client, test_db: AsyncSession, sample_banks, sample_branches, tmp_path):
+        """Wrap the app (with its test DB override) in the profiler"""
+        await get_bank_names(test_db)
+        self.output_dir = tmp_path / "profiles"
+        self.profiled = TestClient(
+            ProfilingMiddleware(app, token="secret", output_dir=str(self.output_dir))
+        )
+        install_db_timing(test_engine)
+        yield
+        remove_db_timing(test_engine)
+
+    def test_profile_written_and_reported(self):
+        """Authenticated X-Profile requests produce artifacts and Server-Timing"""
+        response = self.profiled.get(
+            "/api/v1/branches/?city=MUMBAI",
+            headers={"X-Profile": "1", "X-Profile-Token": "secret"},
+        )
+
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+        timing = response.headers["server-timing"]
+        for phase in ("route_handler", "service", "sqlalchemy_compile", "db_execute", "serialization"):
+            assert f"{phase};dur=" in timing
+
+        assert (self.output_dir / f"{profile_id}.pstats").exists()
+        summary = json.loads((self.output_dir / f"{profile_id}.json").read_text())
+        assert summary["path"] == "/api/v1/branches/"
+        assert summary["statements"] == 2
+        assert summary["breakdown_ms"]["db_execute"] > 0
+
+    def test_query_flag(self):
+        """The profile=1 query flag is accepted as well as the header"""
+        response = self.profiled.get(
+            "/api/v1/banks/?profile=1", headers={"X-Profile-Token": "secret"}
+        )
+
+        assert response.status_code == 200
+        assert "x-profile-id" in response.headers
+
+    def test_requires_token(self):
+        """Requests without the right token are served unprofiled"""
+        response = self.profiled.get(
+            "/api/v1/banks/", headers={"X-Profile": "1", "X-Profile-Token": "wrong"}
+        )
+
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+        assert not self.output_dir.exists()
+
+    def test_sample_rate_guard(self):
+        """A zero sample rate never profiles"""
+        guarded = TestClient(
+            ProfilingMiddleware(app, token="secret", sample_rate=0.0, output_dir=str(self.output_dir))
+        )
+        response = guarded.get(
+            "/api/v1/banks/", headers={"X-Profile": "1", "X-Profile-Token": "secret"}
+        )
+
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
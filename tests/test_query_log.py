@@ -0,0 +1,91 @@
+import json
+import logging
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.bank_registry import get_bank_names
+from app.core.query_log import SlowQueryLog
+from app.services.branch_service import BranchService
+from tests.conftest import test_engine
+
+class TestSlowQueryLog:
+    """Test the slow-query log listeners"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        """Setup test data"""
+        self.banks = sample_banks
+        self.branches = sample_branches
+        # Load bank names up front so only the branch queries are logged
+        await get_bank_names(test_db)
+
+    def _records(self, caplog):
+        return [
+            json.loads(record.getMessage())
+            for record in caplog.records
+            if record.name == "app.slow_query"
+        ]
+
+    async def test_slow_query_logged_with_plan(self, test_db: AsyncSession, caplog):
+        """Statements over the threshold are logged with operation and plan"""
+        slow_log = SlowQueryLog(threshold_ms=0)
+        slow_log.install(test_engine)
+        try:
+            with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+                await BranchService.search_branches(test_db, city="MUMBAI")
+        finally:
+            slow_log.remove(test_engine)
+
+        records = self._records(caplog)
+        assert len(records) == 2  # count query + page query
+        for record in records:
+            assert record["event"] == "slow_query"
+            assert record["operation"] == "BranchService.search_branches"
+            assert record["sql"].lstrip().upper().startswith("SELECT")
+            assert "%MUMBAI%" in record["params"]
+            assert record["duration_ms"] >= 0
+            assert record["plan"]
+
+    async def test_params_redacted(self, test_db: AsyncSession, caplog):
+        """Bound parameters are replaced by their type when redaction is on"""
+        slow_log = SlowQueryLog(threshold_ms=0, redact_params=True)
+        slow_log.install(test_engine)
+        try:
+            with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+                await BranchService.get_branch_by_ifsc(test_db, "SBIN0000001")
+        finally:
+            slow_log.remove(test_engine)
+
+        records = self._records(caplog)
+        assert records
+        assert "SBIN0000001" not in json.dumps(records)
+        assert records[0]["params"] == ["<str>"]
+
+    async def test_fast_queries_not_logged(self, test_db: AsyncSession, caplog):
+        """Statements under the threshold are not logged"""
+        slow_log = SlowQueryLog(threshold_ms=60_000)
+        slow_log.install(test_engine)
+        try:
+            with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+                await BranchService.get_branch_count(test_db)
+        finally:
+            slow_log.remove(test_engine)
+
+        assert self._records(caplog) == []
+
+    async def test_failed_statements_do_not_leak_start_times(self, test_db: AsyncSession):
+        """A statement that raises leaves no timing entry on its pooled connection"""
+        slow_log = SlowQueryLog(threshold_ms=60_000)
+        slow_log.install(test_engine)
+        try:
+            connection = await test_db.connection()
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    await test_db.execute(text("SELECT * FROM no_such_table"))
+            assert not connection.sync_connection.info.get("query_start_time")
+        finally:
+            slow_log.remove(test_engine)
@@ -0,0 +1,173 @@
+import pickle
+import threading
+import time
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics, result_cache
+from app.core.config import settings
+from app.core.dataset import bump_dataset_version
+from app.core.result_cache import DiskTier, MemoryTier, cached, clear_result_cache
+from app.services.bank_service import BankService
+from app.services.branch_service import BranchService
+
+class TestTiers:
+    """Test the cache tiers on their own"""
+
+    def test_memory_lru_byte_budget(self):
+        metrics.reset()
+        tier = MemoryTier(max_bytes=100, ttl=60)
+        tier.put("a", b"1" * 40)
+        tier.put("b", b"2" * 40)
+        tier.get("a")
+        tier.put("c", b"3" * 40)
+        assert tier.get("b") is None
+        assert (tier.get("a"), tier.get("c")) == (b"1" * 40, b"3" * 40)
+        assert tier.nbytes == 80
+        assert metrics.get_counter("result_cache.memory.evictions") == 1
+
+    def test_memory_ttl(self, monkeypatch):
+        tier = MemoryTier(max_bytes=100, ttl=10)
+        tier.put("a", b"x" * 10)
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+        assert tier.get("a") is None
+        assert tier.nbytes == 0
+
+    def test_memory_skips_oversized_values(self):
+        tier = MemoryTier(max_bytes=10, ttl=60)
+        tier.put("a", b"x" * 11)
+        assert len(tier) == 0
+
+    def test_disk_roundtrip_and_trim(self, tmp_path):
+        tier = DiskTier(str(tmp_path / "cache.db"), max_bytes=1000, ttl=60)
+        tier.put(b"old", "ns1", b"x" * 10)
+        for i in range(12):
+            tier.put(b"key%d" % i, "ns2", b"y" * 100)
+        # Other namespaces go first, then the oldest entries
+        assert tier.get(b"old") is None
+        assert tier.get(b"key11") == b"y" * 100
+        tier.trim("ns2")
+        total = tier._conn.execute("SELECT SUM(size) FROM results").fetchone()[0]
+        assert total <= 1000
+        tier.close()
+
+    def test_disk_shared_between_connections(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        writer, reader = DiskTier(path, 10_000, 60), DiskTier(path, 10_000, 60)
+        writer.put(b"k", "ns", b"value")
+        assert reader.get(b"k") == b"value"
+        writer.close()
+        reader.close()
+
+class TestCachedDecorator:
+    """Test @cached on a stub read method"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, monkeypatch):
+        self.database_file = tmp_path / "data.db"
+        self.database_file.write_bytes(b"v1")
+        monkeypatch.setattr(result_cache, "_database_file", self.database_file)
+        monkeypatch.setattr(settings, "result_cache_path", str(tmp_path / "cache.db"))
+        clear_result_cache()
+        metrics.reset()
+        self.calls = []
+
+        @cached
+        async def lookup(db, key, limit=10):
+            self.calls.append(key)
+            return {"key": key, "limit": limit}
+
+        self.lookup = lookup
+        yield
+        clear_result_cache()
+
+    async def test_memory_then_disk(self):
+        assert await self.lookup(None, "a") == {"key": "a", "limit": 10}
+        assert await self.lookup("other session", key="a", limit=10) == {"key": "a", "limit": 10}
+        assert self.calls == ["a"]
+        assert metrics.get_counter("result_cache.memory.hits") == 1
+
+        # A new worker (or a restart) starts with an empty memory tier
+        result_cache._memory.clear()
+        assert await self.lookup(None, "a") == {"key": "a", "limit": 10}
+        assert self.calls == ["a"]
+        assert metrics.get_counter("result_cache.disk.hits") == 1
+
+    async def test_hits_get_private_copies(self):
+        """Callers may modify what they got without affecting later hits"""
+        first = await self.lookup(None, "a")
+        first["key"] = "changed"
+        second = await self.lookup(None, "a")
+        second["limit"] = 0
+        assert await self.lookup(None, "a") == {"key": "a", "limit": 10}
+        assert second is not await self.lookup(None, "a")
+        assert self.calls == ["a"]
+
+    async def test_disk_tier_used_off_the_event_loop(self, monkeypatch):
+        """The disk tier's lock waits must not block other requests"""
+        loop_thread = threading.get_ident()
+        threads = set()
+        for name in ("generation", "advance_generation", "get", "put"):
+            method = getattr(DiskTier, name)
+
+            def spy(tier, *args, method=method):
+                threads.add(threading.get_ident())
+                return method(tier, *args)
+
+            monkeypatch.setattr(DiskTier, name, spy)
+
+        await self.lookup(None, "a")
+        bump_dataset_version()
+        result_cache._memory.clear()
+        await self.lookup(None, "a")
+        assert threads and loop_thread not in threads
+
+    async def test_dataset_version_invalidates(self):
+        await self.lookup(None, "a")
+        bump_dataset_version()
+        await self.lookup(None, "a")
+        assert self.calls == ["a", "a"]
+
+    async def test_database_file_change_invalidates(self, monkeypatch):
+        """A write by another process changes the file and so the namespace"""
+        await self.lookup(None, "a")
+        self.database_file.write_bytes(b"version 2")
+        monkeypatch.setattr(settings, "result_cache_stat_interval", 0)
+        await self.lookup(None, "a")
+        assert self.calls == ["a", "a"]
+
+    async def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "result_cache_enabled", False)
+        await self.lookup(None, "a")
+        await self.lookup(None, "a")
+        assert self.calls == ["a", "a"]
+
+class TestServiceCaching:
+    """Test that service results survive the pickle round trip"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        metrics.reset()
+
+    async def test_results_are_picklable(self, test_db: AsyncSession):
+        banks = await BankService.get_all_banks(test_db)
+        bank = await BankService.get_bank_by_id(test_db, 1)
+        branches, total = await BranchService.search_branches(test_db, city="MUMBAI")
+        assert metrics.get_counter("result_cache.unpicklable") == 0
+
+        restored = pickle.loads(pickle.dumps(banks))
+        assert [(b.name, count) for b, count in restored] == [(b.name, count) for b, count in banks]
+        assert [b.ifsc for b in pickle.loads(pickle.dumps(bank)).branches] == [b.ifsc for b in bank.branches]
+        assert [b.bank_name for b in pickle.loads(pickle.dumps(branches))] == [b.bank_name for b in branches]
+
+    def test_repeated_requests_hit_memory(self, client: TestClient):
+        first = client.get("/api/v1/branches/?city=MUMBAI").json()
+        second = client.get("/api/v1/branches/?city=MUMBAI").json()
+        assert first == second
+        assert metrics.get_counter("result_cache.memory.hits") >= 1
+        gauges = client.get("/metrics").json()["gauges"]
+        assert gauges["result_cache.memory.entries"] >= 1
@@ -0,0 +1,134 @@
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+from app.core import database
+from app.core.database import Base, create_database_engine, create_session_factory
+from app.core.dataset import bump_dataset_version
+from app.core.schema import analyze, create_indexes, drop_indexes, missing_indexes, upgrade_schema
+from app.models.bank import Bank
+from app.models.branch import Branch
+from app.main import app
+
+# Tables as the original loader created them: no change log, no pincode column
+BASELINE_SCHEMA = """
+CREATE TABLE banks (id BIGINT NOT NULL PRIMARY KEY, name VARCHAR(49) NOT NULL);
+CREATE TABLE branches (
+    ifsc VARCHAR(11) NOT NULL PRIMARY KEY,
+    bank_id BIGINT NOT NULL REFERENCES banks (id),
+    branch VARCHAR(74),
+    address VARCHAR(195),
+    city VARCHAR(50),
+    district VARCHAR(50),
+    state VARCHAR(26)
+);
+INSERT INTO banks VALUES (1, 'STATE BANK OF INDIA');
+INSERT INTO branches VALUES ('SBIN0000001', 1, 'MAIN', '11, SANSAD MARG, NEW DELHI 110001', 'NEW DELHI', 'NEW DELHI', 'DELHI');
+"""
+
+class TestDeclaredIndexes:
+    """Test the index set declared by the models and its bootstrap"""
+
+    def test_filter_columns_lead_an_index(self):
+        """Every column indian_bank_clean.sql indexes leads a declared index"""
+        leading = {index.columns.values()[0].name for index in Branch.__table__.indexes}
+        assert {"bank_id", "city", "state", "district", "pincode"} <= leading
+
+    async def test_bulk_load_cycle(self, tmp_path):
+        path = tmp_path / "bank.db"
+        engine = create_database_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                assert await missing_indexes(conn) == []
+                await drop_indexes(conn, [Bank.__table__, Branch.__table__])
+                absent = await missing_indexes(conn)
+                assert set(absent) == {index.name for index in Branch.__table__.indexes}
+
+                await conn.exec_driver_sql("INSERT INTO banks (id, name) VALUES (1, 'STATE BANK OF INDIA')")
+                await conn.exec_driver_sql(
+                    "INSERT INTO branches (ifsc, bank_id, city) VALUES ('SBIN0000001', 1, 'PUNE')"
+                )
+                assert sorted(await create_indexes(conn)) == sorted(absent)
+                assert await create_indexes(conn) == []
+                await analyze(conn, full=True)
+        finally:
+            await engine.dispose()
+
+        conn = sqlite3.connect(path)
+        analyzed = {row[0] for row in conn.execute("SELECT idx FROM sqlite_stat1 WHERE tbl = 'branches'")}
+        conn.close()
+        assert "ix_branches_bank_id_ifsc" in analyzed
+
+    async def test_absent_tables_are_reported_and_created(self, tmp_path):
+        """The index check covers tables the database lacks altogether"""
+        path = tmp_path / "bank.db"
+        engine = create_database_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.exec_driver_sql("DROP TABLE branch_changes")
+                assert await missing_indexes(conn) == ["ix_branch_changes_ifsc"]
+                assert await create_indexes(conn) == ["ix_branch_changes_ifsc"]
+                assert await missing_indexes(conn) == []
+        finally:
+            await engine.dispose()
+
+        conn = sqlite3.connect(path)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert "branch_changes" in tables
+
+    async def test_startup_check_creates_missing_indexes(self, tmp_path, caplog):
+        path = tmp_path / "bank.db"
+        engine = create_database_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.exec_driver_sql("DROP INDEX ix_branches_city_ifsc")
+            async with engine.begin() as conn:
+                assert await upgrade_schema(conn) == []
+                assert await missing_indexes(conn) == []
+        finally:
+            await engine.dispose()
+        assert "missing indexes ix_branches_city_ifsc" in caplog.text
+
+        conn = sqlite3.connect(path)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert "sqlite_stat1" in tables
+
+class TestBaselineUpgrade:
+    """Test starting the app on a database written by the original loader"""
+
+    def test_boots_on_baseline_schema(self, tmp_path, monkeypatch):
+        """Startup creates the change log tables, so writes and /changes work"""
+        path = tmp_path / "baseline.db"
+        conn = sqlite3.connect(path)
+        conn.executescript(BASELINE_SCHEMA)
+        conn.close()
+        engine = create_database_engine(f"sqlite+aiosqlite:///{path}")
+        monkeypatch.setattr(database, "engine", engine)
+        monkeypatch.setattr(database, "AsyncSessionLocal", create_session_factory(engine))
+        bump_dataset_version()
+
+        with TestClient(app) as client:
+            response = client.post("/api/v1/branches/bulk", json=[
+                {"ifsc": "SBIN0000002", "bank_id": 1, "city": "MUMBAI"},
+                {"ifsc": "SBIN0000001", "bank_id": 1, "city": "NEW DELHI", "branch": "RENAMED"},
+            ])
+            assert response.status_code == 200
+            assert (response.json()["inserted"], response.json()["updated"]) == (1, 1)
+
+            changes = client.get("/api/v1/changes?since=0")
+            assert changes.status_code == 200
+            assert [b["ifsc"] for b in changes.json()["upserted"]] == ["SBIN0000002", "SBIN0000001"]
+            assert client.get("/api/v1/branches/SBIN0000002").json()["city"] == "MUMBAI"
+            client.portal.call(engine.dispose)
+
+        conn = sqlite3.connect(path)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(branches)")}
+        conn.close()
+        assert {"branch_changes", "change_log_meta"} <= tables
+        assert "pincode" in columns
@@ -6,6 +6,8 @@ from app.services.bank_service import BankService
 from app.services.branch_service import BranchService
 from app.models.bank import Bank
 from app.models.branch import Branch
+from sqlalchemy import event
+from tests.conftest import test_engine
 
 class TestBankService:
     """Test bank service layer"""
@@ -153,6 +155,26 @@ class TestBranchService:
             assert branch.bank_id == 1
             assert hasattr(branch, 'bank_name')
     
+    async def test_search_branches_fields_projection(self, test_db: AsyncSession):
+        """Test BranchService.search_branches() selects only requested columns"""
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(test_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            rows, total = await BranchService.search_branches(
+                test_db, state="DELHI", fields=["ifsc", "city"]
+            )
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", capture)
+        
+        assert total == 2
+        assert sorted(rows) == [("PUNB0000001", "NEW DELHI"), ("SBIN0000001", "NEW DELHI")]
+        page_query = statements[-1]
+        assert "branches.ifsc" in page_query
+        assert "address" not in page_query
+        assert "banks" not in page_query
+    
     async def test_get_branch_count(self, test_db: AsyncSession):
         """Test BranchService.get_branch_count()"""
         count = await BranchService.get_branch_count(test_db)
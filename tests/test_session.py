@@ -0,0 +1,80 @@
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import database, metrics
+from app.core.query_log import track_operation
+from app.core.session import releases_connection
+from app.models.bank import Bank
+from app.services.bank_service import BankService
+from app.services.branch_service import BranchService
+from app.services.change_service import ChangeService, UPDATE
+from tests.conftest import TestSessionLocal
+
+class TestLazySession:
+    """Test that sessions hold a connection only while service calls run SQL"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        self.db = test_db
+        metrics.reset()
+
+    async def test_read_releases_connection(self):
+        async with TestSessionLocal() as db:
+            assert not db.used
+            branch = await BranchService.get_branch_by_ifsc(db, "SBIN0000001")
+            assert db.used
+            assert not db.in_transaction()
+            # Loaded objects survive the early release
+            assert branch.bank_name == "STATE BANK OF INDIA"
+            assert branch in db
+        assert metrics.get_counter("db.connections.released_early") == 1
+
+    async def test_only_releasing_calls_end_the_transaction(self):
+        """track_operation only tags statements; releases_connection ends the read"""
+        @track_operation
+        async def count_banks(db):
+            return (await db.execute(select(func.count(Bank.id)))).scalar()
+
+        async with TestSessionLocal() as db:
+            assert await count_banks(db) == 3
+            assert db.in_transaction()
+            assert await releases_connection(count_banks)(db) == 3
+            assert not db.in_transaction()
+
+    async def test_cache_hit_never_uses_a_connection(self):
+        async with TestSessionLocal() as db:
+            assert await BranchService.get_branch_count(db) == 4
+        async with TestSessionLocal() as db:
+            assert await BranchService.get_branch_count(db) == 4
+            assert not db.used
+
+    async def test_pending_changes_are_kept(self):
+        async with TestSessionLocal() as db:
+            db.add(Bank(id=9, name="NEW BANK"))
+            await BankService.get_bank_count(db)
+            assert db.in_transaction()
+            await db.commit()
+        async with TestSessionLocal() as db:
+            assert await db.get(Bank, 9) is not None
+
+    async def test_executed_writes_are_kept(self):
+        async with TestSessionLocal() as db:
+            await ChangeService.record_many(db, [("SBIN0000001", UPDATE)])
+            await BankService.get_bank_count(db)
+            assert db.in_transaction()
+            await db.rollback()
+            assert await ChangeService.get_version(db) == 0
+
+    async def test_unused_sessions_are_counted(self, monkeypatch):
+        monkeypatch.setattr(database, "AsyncSessionLocal", TestSessionLocal)
+        async with TestSessionLocal() as db:
+            await BranchService.get_branch_count(db)
+
+        for _ in range(2):
+            dependency = database.get_db()
+            db = await dependency.__anext__()
+            await BranchService.get_branch_count(db)
+            await dependency.aclose()
+        assert metrics.get_counter("db.sessions") == 2
+        assert metrics.get_counter("db.sessions.unused") == 2
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.singleflight import SingleFlight
+from app.services.bank_service import BankService
+from app.services.branch_service import BranchService
+
+class TestSingleFlight:
+    """Test the single-flight primitive"""
+
+    async def test_concurrent_calls_share_one_execution(self):
+        """Identical keys run once and every caller gets the result"""
+        group = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(group.do("key", load) for _ in range(10)))
+
+        assert results == ["result"] * 10
+        assert calls == 1
+        assert group.in_flight() == 0
+
+    async def test_distinct_keys_run_separately(self):
+        """Different keys are not coalesced"""
+        group = SingleFlight()
+        calls = []
+
+        async def load(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key
+
+        results = await asyncio.gather(*(group.do(k, lambda k=k: load(k)) for k in "abc"))
+
+        assert results == ["a", "b", "c"]
+        assert sorted(calls) == ["a", "b", "c"]
+
+    async def test_errors_reach_every_caller(self):
+        """A failing leader fails its followers too"""
+        group = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(group.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    async def test_followers_survive_leader_cancellation(self):
+        """If the leader is cancelled a follower runs the call itself"""
+        group = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        leader = asyncio.ensure_future(group.do("key", load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("key", load))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == 2
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+class TestServiceCoalescing:
+    """Test coalescing of service read methods"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, sample_banks, sample_branches):
+        """Setup test data"""
+        metrics.reset()
+
+    async def test_identical_searches_coalesced(self, test_db: AsyncSession):
+        """Concurrent identical searches issue one query"""
+        results = await asyncio.gather(
+            BranchService.search_branches(test_db, city="MUMBAI"),
+            BranchService.search_branches(test_db, city="MUMBAI"),
+            BranchService.search_branches(test_db, None, "MUMBAI"),
+        )
+
+        assert all(total == 2 for _, total in results)
+        name = "BranchService.search_branches"
+        assert metrics.get_counter(f"singleflight.{name}.executed") == 1
+        assert metrics.get_counter(f"singleflight.{name}.coalesced") == 2
+        assert metrics.get_counter("singleflight.coalesced") == 2
+
+    async def test_different_arguments_not_coalesced(self, test_db: AsyncSession):
+        """Calls with different arguments each run"""
+        await asyncio.gather(
+            BankService.get_bank_by_id(test_db, 1),
+            BankService.get_bank_by_id(test_db, 2),
+        )
+
+        assert metrics.get_counter("singleflight.BankService.get_bank_by_id.executed") == 2
+        assert metrics.get_counter("singleflight.coalesced") == 0
+
+    async def test_followers_get_detached_copies(self, test_db: AsyncSession):
+        """Followers do not share the leader's session-bound instances"""
+        leader, *followers = await asyncio.gather(
+            *(BranchService.get_branch_by_ifsc(test_db, "SBIN0000001") for _ in range(3))
+        )
+
+        assert inspect(leader).session is not None
+        for follower in followers:
+            assert follower is not leader
+            assert inspect(follower).detached
+            assert (follower.ifsc, follower.city, follower.bank_name) == ("SBIN0000001", "NEW DELHI", leader.bank_name)
+
+    async def test_ifsc_case_coalesced(self, test_db: AsyncSession):
+        """Lookups differing only in IFSC case share one execution"""
+        results = await asyncio.gather(
+            BranchService.get_branch_by_ifsc(test_db, "SBIN0000001"),
+            BranchService.get_branch_by_ifsc(test_db, "sbin0000001"),
+        )
+
+        assert [branch.ifsc for branch in results] == ["SBIN0000001"] * 2
+        name = "BranchService.get_branch_by_ifsc"
+        assert metrics.get_counter(f"singleflight.{name}.executed") == 1
+        assert metrics.get_counter(f"singleflight.{name}.coalesced") == 1
+
+    def test_metrics_endpoint(self, client: TestClient):
+        """GET /metrics exposes the counters"""
+        client.get("/api/v1/banks/")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["counters"]["singleflight.BankService.get_all_banks.executed"] == 1
+        assert data["gauges"]["singleflight.in_flight"] == 0
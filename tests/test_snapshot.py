@@ -0,0 +1,138 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import result_cache
+from app.core.config import settings
+from app.core.change_log import change_log_version
+from app.core.dataset import bump_dataset_version
+from app.core.result_cache import clear_result_cache
+from app.core.snapshot import (
+    DirectorySnapshot,
+    SnapshotError,
+    build_snapshot,
+    close_snapshot,
+    get_snapshot,
+    open_snapshot,
+)
+from app.services.branch_service import BranchService
+from app.services.change_service import ChangeService, UPDATE
+
+class TestDirectorySnapshot:
+    """Test the memory-mapped directory snapshot"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches, tmp_path):
+        """Write a snapshot of the sample data"""
+        self.path = str(tmp_path / "directory.snapshot")
+        assert await build_snapshot(test_db, self.path) == 4
+        self.snapshot = DirectorySnapshot(self.path)
+        yield
+        self.snapshot.close()
+        close_snapshot()
+
+    def test_get_branch(self):
+        """IFSC lookups hit the sorted key array"""
+        branch = self.snapshot.get_branch("sbin0000002")
+
+        assert branch is not None
+        assert branch.ifsc == "SBIN0000002"
+        assert branch.bank_id == 1
+        assert branch.bank_name == "STATE BANK OF INDIA"
+        assert branch.city == "MUMBAI"
+        assert branch.state == "MAHARASHTRA"
+
+    def test_get_branch_missing(self):
+        """Unknown, short and non-ASCII codes miss cleanly"""
+        assert self.snapshot.get_branch("SBIN0000009") is None
+        assert self.snapshot.get_branch("AAAA0000000") is None
+        assert self.snapshot.get_branch("ZZZZ9999999") is None
+        assert self.snapshot.get_branch("VERYLONGIFSCCODE12345") is None
+        assert self.snapshot.get_branch("ÜBER") is None
+
+    def test_bank_posting_list(self):
+        """Bank listings come from posting lists in IFSC order"""
+        branches, total = self.snapshot.search_branches(bank_id=1)
+
+        assert total == 2
+        assert [b.ifsc for b in branches] == ["SBIN0000001", "SBIN0000002"]
+
+        page, total = self.snapshot.search_branches(bank_id=1, skip=1, limit=5)
+        assert total == 2
+        assert [b.ifsc for b in page] == ["SBIN0000002"]
+
+        assert self.snapshot.search_branches(bank_id=999) == ([], 0)
+
+    def test_state_and_bank_filters(self):
+        """State filters match case-insensitive substrings like the SQL path"""
+        branches, total = self.snapshot.search_branches(state="delhi")
+        assert total == 2
+        assert {b.ifsc for b in branches} == {"SBIN0000001", "PUNB0000001"}
+
+        branches, total = self.snapshot.search_branches(state="DELHI", bank_id=2)
+        assert total == 1
+        assert branches[0].ifsc == "PUNB0000001"
+
+        branches, total = self.snapshot.search_branches(skip=3, limit=10)
+        assert total == 4
+        assert len(branches) == 1
+
+    async def test_matches_sql_path(self, test_db: AsyncSession):
+        """Snapshot listings agree with the SQL path"""
+        for filters in ({}, {"bank_id": 1}, {"state": "MAHARASHTRA"}, {"state": "DELHI", "bank_id": 1}):
+            sql_branches, sql_total = await BranchService.search_branches(test_db, **filters)
+            snap_branches, snap_total = self.snapshot.search_branches(**filters)
+            assert snap_total == sql_total
+            assert {b.ifsc for b in snap_branches} == {b.ifsc for b in sql_branches}
+
+    async def test_services_use_active_snapshot(self, test_db: AsyncSession):
+        """Services read from the snapshot until the dataset version moves on"""
+        open_snapshot(self.path)
+        assert get_snapshot() is not None
+
+        await test_db.execute(text("DELETE FROM branches WHERE ifsc = 'HDFC0000001'"))
+        await test_db.commit()
+
+        branch = await BranchService.get_branch_by_ifsc(test_db, "HDFC0000001")
+        assert branch is not None  # still served from the snapshot
+
+        bump_dataset_version()
+        assert get_snapshot() is None
+        branch = await BranchService.get_branch_by_ifsc(test_db, "HDFC0000001")
+        assert branch is None
+
+    async def test_rejects_stale_snapshot(self, test_db: AsyncSession):
+        """A snapshot built before later branch writes is refused at open"""
+        assert self.snapshot.change_version == await change_log_version(test_db)
+        open_snapshot(self.path, await change_log_version(test_db))
+        close_snapshot()
+
+        await ChangeService.record_many(test_db, [("SBIN0000001", UPDATE)])
+        await test_db.commit()
+        with pytest.raises(SnapshotError, match="Stale snapshot"):
+            open_snapshot(self.path, await change_log_version(test_db))
+        assert get_snapshot() is None
+
+    def test_write_by_another_worker_retires_snapshot(self, tmp_path, monkeypatch):
+        """A change to the shared database file retires the snapshot in every worker"""
+        database_file = tmp_path / "data.db"
+        database_file.write_bytes(b"v1")
+        monkeypatch.setattr(result_cache, "_database_file", database_file)
+        monkeypatch.setattr(settings, "result_cache_stat_interval", 0)
+        clear_result_cache()
+        try:
+            open_snapshot(self.path)
+            assert get_snapshot() is not None
+
+            database_file.write_bytes(b"version 2")
+            assert get_snapshot() is None
+        finally:
+            clear_result_cache()
+
+    def test_rejects_foreign_files(self, tmp_path):
+        """Files that are not snapshots are refused"""
+        path = tmp_path / "bogus.snapshot"
+        path.write_bytes(b"x" * 128)
+        with pytest.raises(SnapshotError):
+            DirectorySnapshot(str(path))
@@ -0,0 +1,98 @@
+import re
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.branch_service import BRANCH_SORTS, BranchService
+from tests.conftest import test_engine
+
+class TestBranchSorting:
+    """Test sort orders of branch listings and the indexes behind them"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        self.db = test_db
+
+    @pytest.mark.parametrize("sort,order,expected", [
+        ("ifsc", "asc", ["HDFC0000001", "PUNB0000001", "SBIN0000001", "SBIN0000002"]),
+        ("ifsc", "desc", ["SBIN0000002", "SBIN0000001", "PUNB0000001", "HDFC0000001"]),
+        ("branch", "asc", ["PUNB0000001", "HDFC0000001", "SBIN0000002", "SBIN0000001"]),
+        ("city", "asc", ["HDFC0000001", "SBIN0000002", "PUNB0000001", "SBIN0000001"]),
+        ("state", "desc", ["SBIN0000002", "HDFC0000001", "SBIN0000001", "PUNB0000001"]),
+    ])
+    def test_search_order(self, client: TestClient, sort, order, expected):
+        data = client.get(f"/api/v1/branches/?sort={sort}&order={order}").json()
+        assert [b["ifsc"] for b in data["items"]] == expected
+
+    def test_pages_are_stable(self, client: TestClient):
+        pages = [
+            client.get(f"/api/v1/branches/?sort=city&skip={skip}&limit=1&fields=ifsc").json()["items"]
+            for skip in range(4)
+        ]
+        assert [page[0]["ifsc"] for page in pages] == ["HDFC0000001", "SBIN0000002", "PUNB0000001", "SBIN0000001"]
+
+    def test_bank_listing_order(self, client: TestClient):
+        data = client.get("/api/v1/branches/bank/1?sort=city").json()
+        assert [b["ifsc"] for b in data["items"]] == ["SBIN0000002", "SBIN0000001"]
+        data = client.get("/api/v1/branches/bank/1?order=desc").json()
+        assert [b["ifsc"] for b in data["items"]] == ["SBIN0000002", "SBIN0000001"]
+
+    def test_invalid_sort(self, client: TestClient):
+        assert client.get("/api/v1/branches/?sort=address").status_code == 422
+        assert client.get("/api/v1/branches/bank/1?order=up").status_code == 422
+
+    async def _plans(self, call) -> list:
+        """EXPLAIN QUERY PLAN of every ordered statement ``call`` runs"""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if "ORDER BY" in statement:
+                statements.append((statement, parameters))
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            await call()
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", capture)
+        connection = await self.db.connection()
+        plans = []
+        for statement, parameters in statements:
+            rows = (await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            plans.append(" | ".join(row[-1] for row in rows))
+        return plans
+
+    @pytest.mark.parametrize("sort", list(BRANCH_SORTS))
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    async def test_sorts_use_an_index(self, sort, order):
+        """Scans and bank listings read every sort order from an index, without a temporary B-tree"""
+        plans = await self._plans(lambda: BranchService.search_branches(
+            self.db, city="MUMBAI", sort=sort, order=order
+        ))
+        plans += await self._plans(lambda: BranchService.get_branches_by_bank_id(
+            self.db, 1, sort=sort, order=order
+        ))
+        plans += await self._plans(lambda: BranchService.search_branches(
+            self.db, bank_id=1, state="DELHI", fields=["ifsc", "city"], sort=sort, order=order
+        ))
+        assert len(plans) == 3
+        for plan in plans:
+            assert "TEMP B-TREE" not in plan
+            assert re.search(r"USING (COVERING )?INDEX", plan)
+
+    @pytest.mark.parametrize("sort", list(BRANCH_SORTS))
+    async def test_seeks_sort_their_matches(self, sort):
+        """PIN code and IFSC prefix seeks only avoid a sort step when it is the seek's own order"""
+        pincode_plans = await self._plans(lambda: BranchService.search_branches(
+            self.db, pincode="400001", sort=sort
+        ))
+        prefix_plans = await self._plans(lambda: BranchService.search_branches(
+            self.db, ifsc_prefix="SBIN", sort=sort
+        ))
+        assert len(pincode_plans) == len(prefix_plans) == 1
+        assert "ix_branches_pincode" in pincode_plans[0]
+        assert "USE TEMP B-TREE FOR ORDER BY" in pincode_plans[0]
+        assert "(ifsc>? AND ifsc<?)" in prefix_plans[0]
+        assert ("USE TEMP B-TREE FOR ORDER BY" in prefix_plans[0]) == (sort != "ifsc")
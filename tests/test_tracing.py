@@ -0,0 +1,143 @@
+import io
+import json
+import threading
+
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.bank_registry import get_bank_names
+from app.core.tracing import (
+    Span,
+    SpanExporter,
+    Trace,
+    TracingMiddleware,
+    install_serialization_spans,
+    install_sql_spans,
+    remove_sql_spans,
+    uninstall_serialization_spans,
+)
+from app.main import app
+from tests.conftest import test_engine
+
+class TestTracing:
+    """Test sampled request traces"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, client, test_db: AsyncSession, sample_banks, sample_branches):
+        """Wrap the app (with its test DB override) in the tracer"""
+        await get_bank_names(test_db)
+        install_sql_spans(test_engine)
+        install_serialization_spans()
+        metrics.reset()
+        self.output = io.StringIO()
+        self.exporter = SpanExporter(stream=self.output)
+        yield
+        self.exporter.shutdown()
+        uninstall_serialization_spans()
+        remove_sql_spans(test_engine)
+
+    def _client(self, sample_rate: float, honor_traceparent: bool = False) -> TestClient:
+        return TestClient(TracingMiddleware(
+            app, sample_rate=sample_rate, exporter=self.exporter, honor_traceparent=honor_traceparent,
+        ))
+
+    def _spans(self):
+        self.exporter.flush()
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+    def test_spans_form_one_tree(self):
+        response = self._client(1.0).get("/api/v1/branches/?city=MUMBAI&sort=city")
+        assert response.status_code == 200
+
+        spans = self._spans()
+        by_name = {}
+        for span in spans:
+            by_name.setdefault(span["name"], []).append(span)
+        root, = by_name["GET /api/v1/branches/"]
+        assert root["parent_span_id"] is None
+        assert root["attributes"]["http.status_code"] == 200
+        assert {span["trace_id"] for span in spans} == {root["trace_id"]}
+        assert response.headers["traceparent"] == f"00-{root['trace_id']}-{root['span_id']}-01"
+
+        service, = by_name["BranchService.search_branches"]
+        sql = by_name["sql"]
+        assert len(sql) == 2  # count query + page query
+        for statement in sql:
+            assert statement["parent_span_id"] == service["span_id"]
+            assert statement["attributes"]["db.statement"].lstrip().upper().startswith("SELECT")
+            assert statement["attributes"]["db.compile_ms"] >= 0
+            assert statement["attributes"]["db.execute_ms"] >= 0
+        serialize, = by_name["serialize_response"]
+        assert serialize["parent_span_id"] == root["span_id"]
+
+        # Every span except the root has its parent in the trace
+        span_ids = {span["span_id"] for span in spans}
+        assert all(span["parent_span_id"] in span_ids for span in spans if span is not root)
+
+    def test_json_response_encoding(self):
+        """Sparse fieldsets are rendered as a JSONResponse inside json_encode"""
+        self._client(1.0).get("/api/v1/branches/?city=MUMBAI&fields=ifsc,city")
+        encode, = [span for span in self._spans() if span["name"] == "json_encode"]
+        assert encode["attributes"]["http.response_content_length"] > 0
+
+    def test_unsampled_requests_export_nothing(self):
+        assert self._client(0.0).get("/api/v1/banks/").status_code == 200
+        assert self._spans() == []
+
+    def test_traceparent_flag_ignored_by_default(self):
+        """Clients cannot force tracing, but sampled requests join their trace"""
+        trace_id, parent_id = "ab" * 16, "cd" * 8
+        self._client(0.0).get("/api/v1/banks/", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+        assert self._spans() == []
+
+        self._client(1.0).get("/api/v1/banks/", headers={"traceparent": f"00-{trace_id}-{parent_id}-00"})
+        spans = self._spans()
+        assert spans and {span["trace_id"] for span in spans} == {trace_id}
+        root = next(span for span in spans if span["name"] == "GET /api/v1/banks/")
+        assert root["parent_span_id"] == parent_id
+
+    def test_traceparent_decides_sampling_when_honored(self):
+        trace_id, parent_id = "ab" * 16, "cd" * 8
+        client = self._client(0.0, honor_traceparent=True)
+        client.get("/api/v1/banks/", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+        spans = self._spans()
+        assert spans and {span["trace_id"] for span in spans} == {trace_id}
+        root = next(span for span in spans if span["name"] == "GET /api/v1/banks/")
+        assert root["parent_span_id"] == parent_id
+
+        self.output.truncate(0)
+        self.output.seek(0)
+        client = self._client(1.0, honor_traceparent=True)
+        client.get("/api/v1/banks/", headers={"traceparent": f"00-{trace_id}-{parent_id}-00"})
+        assert self._spans() == []
+
+    def test_file_exporter(self, tmp_path):
+        self.exporter = SpanExporter(path=str(tmp_path / "traces.jsonl"))
+        self._client(1.0).get("/api/v1/branches/SBIN0000001")
+        self.exporter.shutdown()
+        lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+        assert any(json.loads(line)["name"] == "BranchService.get_branch_by_ifsc" for line in lines)
+
+    def test_export_only_queues(self):
+        """Traces are written in the background; a full queue drops them"""
+        exporter = SpanExporter(stream=self.output, max_queue=1)
+        blocked = threading.Event()
+        exporter._write = lambda traces: blocked.wait(5)
+        traces = [Trace() for _ in range(4)]
+        for trace in traces:
+            Span(trace, "GET /", None, {}).end()
+            exporter.export(trace)
+        assert metrics.get_counter("tracing.traces_dropped") >= 2
+        blocked.set()
+        exporter.shutdown()
+
+    def test_hooks_are_removed(self):
+        uninstall_serialization_spans()
+        remove_sql_spans(test_engine)
+        assert self._client(1.0).get("/api/v1/branches/?city=MUMBAI").status_code == 200
+        names = {span["name"] for span in self._spans()}
+        assert "sql" not in names and "serialize_response" not in names
+        install_sql_spans(test_engine)
+        install_serialization_spans()
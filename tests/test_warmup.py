@@ -0,0 +1,52 @@
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.database import create_database_engine, create_session_factory
+from app.core.warmup import is_ready, reset_readiness, warm_up, warmup_duration
+from app.services.branch_service import BranchService
+from tests.conftest import TestSessionLocal
+
+class TestWarmup:
+    """Test the startup warm-up and GET /ready"""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def setup(self, test_db: AsyncSession, sample_banks, sample_branches):
+        metrics.reset()
+        reset_readiness()
+        yield
+        reset_readiness()
+
+    async def test_warm_up_fills_caches(self):
+        duration = await warm_up(TestSessionLocal)
+        assert is_ready()
+        assert warmup_duration() == duration > 0
+        assert metrics.get_counter("warmup.failures") == 0
+
+        # The bank of the first IFSC (HDFC0000001) is answered from the result cache
+        async with TestSessionLocal() as db:
+            branches, total = await BranchService.get_branches_by_bank_id(db, 3, sort="city")
+            assert total == 1
+            assert not db.used
+
+    async def test_failed_steps_still_become_ready(self):
+        engine = create_database_engine("sqlite+aiosqlite:///:memory:")
+        try:
+            await warm_up(create_session_factory(engine))
+        finally:
+            await engine.dispose()
+        assert is_ready()
+        assert metrics.get_counter("warmup.failures") == 2
+
+    def test_ready_endpoint(self, client: TestClient):
+        # Warm-up is disabled in tests, so the app is ready once started
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready", "warmup_seconds": None}
+
+        reset_readiness()
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"status": "warming_up"}
+        assert client.get("/health").status_code == 200